@@ -0,0 +1,120 @@
+"""
+Benchmark the fast paths of ``fast_paths.specialize`` against the generic expressions.
+
+Every formula is built twice: as ``polars_expr_transformer`` builds it, and
+rewritten by ``specialize``. Both are evaluated on the synthetic people schema,
+with and without nulls, and checked to give the same result.
+
+Ladders below the branch counts where the rewrite starts to pay off are
+included too, ``specialize`` leaves those as they are.
+
+Usage:
+    python benchmarks/bench_fast_paths.py --scales 1e5 1e6 5e6 --repeat 5
+"""
+import argparse
+import json
+import statistics
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "streamlit_app"))
+
+from polars_expr_transformer.process.polars_expr_transformer import build_func  # noqa: E402
+
+from bench_formulas import time_call, environment_metadata, RESULTS_DIR  # noqa: E402
+from streamlit_pages.fast_paths import specialize  # noqa: E402
+from streamlit_pages.synthetic_data import CITIES, generate_people_frame  # noqa: E402
+
+DEFAULT_SCALES = [100_000, 1_000_000, 5_000_000]
+
+NULL_RATES = [0.0, 0.1]
+
+# The synthetic cities, with a numbered second generation so that long lookup ladders match rows
+LOOKUP_CITIES = CITIES + [f"{city} 2" for city in CITIES]
+
+
+def _threshold_ladder(branches):
+    thresholds = range(120_000, 0, -80_000 // branches)[:branches]
+    conditions = " elseif ".join(f"[salary] > {t} then 'band {i}'" for i, t in enumerate(thresholds))
+    return f"if {conditions} else 'other' endif"
+
+
+def _lookup_ladder(branches):
+    cities = LOOKUP_CITIES[:branches]
+    conditions = " elseif ".join(f"[city] = '{city}' then {i}" for i, city in enumerate(cities, 1))
+    return f"if {conditions} else 0 endif"
+
+
+FORMULAS = [
+    "contains([city], 'York')",
+    "contains([name], 'Kim')",
+    "to_date([joined_date], '%Y-%m-%d')",
+    *(_threshold_ladder(branches) for branches in (2, 3, 4, 6, 8)),
+    *(_lookup_ladder(branches) for branches in (4, 8, 16, 24, 32)),
+]
+
+
+def run_benchmarks(scales, repeat):
+    """
+    Time the generic and the specialized expression of every formula at every scale.
+
+    Args:
+        scales: Row counts to evaluate the formulas at
+        repeat: Number of samples per measurement
+
+    Returns:
+        dict: The results document, ready to be dumped as JSON
+    """
+    results = []
+    for n_rows in scales:
+        for null_rate in NULL_RATES:
+            df = generate_people_frame(n_rows, city_cardinality=len(LOOKUP_CITIES), null_rate=null_rate)
+            for formula in FORMULAS:
+                generic = build_func(formula).get_pl_func()
+                specialized, applied = specialize(generic)
+                entry = {"formula": formula, "rows": n_rows, "null_rate": null_rate, "applied": applied}
+                expected, entry["generic_s"] = time_call(lambda: df.select(generic.alias("result")), repeat)
+                actual, entry["specialized_s"] = time_call(lambda: df.select(specialized.alias("result")), repeat)
+                if not actual.equals(expected):
+                    raise AssertionError(f"Specialized result differs for {formula!r}")
+                results.append(entry)
+            del df
+
+    return {"metadata": environment_metadata(), "scales": scales, "repeat": repeat, "results": results}
+
+
+def print_summary(document):
+    """Print median timings in milliseconds, with the speedup of the specialized expression"""
+    header = f"{'formula':<48} {'rows':>10} {'nulls':>6} {'generic':>10} {'fast path':>10} {'speedup':>8}"
+    print(header)
+    print("-" * len(header))
+    for entry in document["results"]:
+        generic = statistics.median(entry["generic_s"]) * 1e3
+        specialized = statistics.median(entry["specialized_s"]) * 1e3
+        formula = entry["formula"] if len(entry["formula"]) <= 48 else entry["formula"][:45] + "..."
+        row = f"{formula:<48} {entry['rows']:>10} {entry['null_rate']:>6} {generic:>10.2f}"
+        if entry["applied"]:
+            row += f" {specialized:>10.2f} {generic / specialized:>7.2f}x"
+        print(row)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", nargs="+", type=float, default=DEFAULT_SCALES,
+                        help="Row counts to benchmark, e.g. 1e5 1e7")
+    parser.add_argument("--repeat", type=int, default=5, help="Samples per measurement")
+    parser.add_argument("--output", type=Path, default=None, help="Where to write the JSON results")
+    args = parser.parse_args(argv)
+
+    document = run_benchmarks([int(n) for n in args.scales], args.repeat)
+    metadata = document["metadata"]
+    output = args.output or RESULTS_DIR / f"fast_paths_polars-{metadata['polars']}_pet-{metadata['polars_expr_transformer']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(document, indent=2))
+
+    print_summary(document)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
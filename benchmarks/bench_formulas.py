@@ -0,0 +1,185 @@
+"""
+Benchmark every formula shipped with the app at several data scales.
+
+Each formula is timed in three separate stages:
+
+* parse   - ``build_func`` turning the formula string into a ``Func`` tree
+* build   - ``get_pl_func`` turning the tree into a Polars expression
+* execute - ``DataFrame.select`` evaluating the expression on synthetic data
+
+Results, including every raw sample, are written to a JSON file named after
+the installed polars and polars-expr-transformer versions so runs against
+different library versions can be compared side by side.
+
+Usage:
+    python benchmarks/bench_formulas.py --scales 1e3 1e5 1e7 --repeat 5
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from importlib.metadata import version
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "streamlit_app"))
+
+import polars as pl  # noqa: E402
+from polars_expr_transformer.process.polars_expr_transformer import build_func  # noqa: E402
+
+from streamlit_pages.formula_corpus import iter_corpus_formulas  # noqa: E402
+from streamlit_pages.formula_engine import split_partition_clause  # noqa: E402
+from streamlit_pages.window_functions import partitioned  # noqa: E402
+from streamlit_pages.synthetic_data import generate_people_frame  # noqa: E402
+
+DEFAULT_SCALES = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def time_call(func, repeat):
+    """Call ``func`` ``repeat`` times and return the last result and the durations in seconds"""
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - start)
+    return result, samples
+
+
+def environment_metadata():
+    """Describe the library versions and machine the benchmark ran on"""
+    return {
+        "polars": pl.__version__,
+        "polars_expr_transformer": version("polars-expr-transformer"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def default_output_path(metadata):
+    """Results file for the installed library versions"""
+    return RESULTS_DIR / f"formulas_polars-{metadata['polars']}_pet-{metadata['polars_expr_transformer']}.json"
+
+
+def time_rounds(calls, repeat):
+    """
+    Call every function of ``calls`` once per round, for ``repeat`` rounds.
+
+    Consecutive samples of one function share whatever else the machine is doing at
+    that moment. Spreading them over the whole run makes them vary as much as the
+    run does, which is what a comparison of two runs needs.
+
+    Args:
+        calls: Dict of key to function
+        repeat: Number of rounds
+
+    Returns:
+        tuple: ({key: last result}, {key: durations in seconds}, {key: exception}), a
+        function that raises is not called again
+    """
+    results, samples, errors = {}, {key: [] for key in calls}, {}
+    for _ in range(repeat):
+        for key, func in calls.items():
+            if key in errors:
+                continue
+            start = time.perf_counter()
+            try:
+                results[key] = func()
+            except Exception as e:
+                errors[key] = e
+                continue
+            samples[key].append(time.perf_counter() - start)
+    return results, {key: durations for key, durations in samples.items() if key not in errors}, errors
+
+
+def run_benchmarks(scales, repeat):
+    """
+    Run the corpus at every scale.
+
+    Every stage is sampled in rounds over the whole corpus, see ``time_rounds``.
+
+    Args:
+        scales: Row counts to evaluate the formulas at
+        repeat: Number of samples taken per stage
+
+    Returns:
+        dict: The results document, ready to be dumped as JSON
+    """
+    results = [dict(record) for record in iter_corpus_formulas()]
+    clauses = [split_partition_clause(entry["formula"]) for entry in results]
+
+    funcs, parse_samples, errors = time_rounds(
+        {i: lambda body=body: build_func(body) for i, (body, _) in enumerate(clauses)}, repeat)
+
+    def build(i):
+        with partitioned(clauses[i][1]):
+            return funcs[i].get_pl_func()
+
+    exprs, build_samples, build_errors = time_rounds({i: lambda i=i: build(i) for i in funcs}, repeat)
+    errors.update(build_errors)
+    for i, e in errors.items():
+        results[i]["error"] = f"parse: {type(e).__name__}: {e}"
+    for i in exprs:
+        results[i].update(parse_s=parse_samples[i], build_s=build_samples[i])
+
+    for n_rows in scales:
+        df = generate_people_frame(n_rows)
+        calls = {}
+        for i, expr in exprs.items():
+            missing = set(expr.meta.root_names()) - set(df.columns)
+            if missing:
+                results[i].setdefault("skipped", f"columns not in the sample schema: {sorted(missing)}")
+            elif "error" not in results[i]:
+                calls[i] = lambda expr=expr: df.select(expr.alias("result"))
+        _, samples, errors = time_rounds(calls, repeat)
+        for i, e in errors.items():
+            results[i]["error"] = f"execute: {type(e).__name__}: {e}"
+        for i, durations in samples.items():
+            results[i].setdefault("execute_s", {})[str(n_rows)] = durations
+        del df, calls
+
+    return {"metadata": environment_metadata(), "scales": scales, "repeat": repeat, "results": results}
+
+
+def print_summary(document):
+    """Print median timings per formula in milliseconds"""
+    scales = document["scales"]
+    header = f"{'formula':<60} {'parse':>8} {'build':>8}" + "".join(f" {n:>12}" for n in scales)
+    print(header)
+    print("-" * len(header))
+    for entry in document["results"]:
+        name = entry["formula"].replace("\n", " ")[:58]
+        if "parse_s" not in entry:
+            print(f"{name:<60} {entry['error']}")
+            continue
+        row = f"{name:<60} {statistics.median(entry['parse_s']) * 1e3:>8.2f} {statistics.median(entry['build_s']) * 1e3:>8.2f}"
+        for n_rows in scales:
+            samples = entry.get("execute_s", {}).get(str(n_rows))
+            row += f" {statistics.median(samples) * 1e3:>12.2f}" if samples else f" {'-':>12}"
+        print(row)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", nargs="+", type=float, default=DEFAULT_SCALES,
+                        help="Row counts to benchmark, e.g. 1e3 1e6")
+    parser.add_argument("--repeat", type=int, default=5, help="Samples per stage")
+    parser.add_argument("--output", type=Path, default=None, help="Where to write the JSON results")
+    args = parser.parse_args(argv)
+
+    document = run_benchmarks([int(n) for n in args.scales], args.repeat)
+    output = args.output or default_output_path(document["metadata"])
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(document, indent=2))
+
+    print_summary(document)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark window formulas (``... over [column]``) on the synthetic people schema.
+
+Every window formula is compiled with the formula engine and evaluated with
+Polars ``.over()``. Where one exists, the equivalent self-join is timed too:
+aggregating per group and joining the totals back, which is how these
+numbers were computed before the partition clause existed.
+
+Partitions are taken on a low cardinality column (city) and a high
+cardinality one (name), so both ends of the window engine are covered.
+
+Usage:
+    python benchmarks/bench_windows.py --scales 1e5 1e6 1e7 --repeat 5
+"""
+import argparse
+import json
+import statistics
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "streamlit_app"))
+
+import polars as pl  # noqa: E402
+
+from bench_formulas import time_call, environment_metadata, RESULTS_DIR  # noqa: E402
+from streamlit_pages.formula_engine import compile_formula  # noqa: E402
+from streamlit_pages.synthetic_data import generate_people_frame  # noqa: E402
+
+DEFAULT_SCALES = [100_000, 1_000_000, 10_000_000]
+
+
+def _join_back(df, key, aggregate, combine):
+    """Self-join baseline: aggregate per ``key``, join the result back and combine it with the row"""
+    totals = df.group_by(key).agg(aggregate.alias("_aggregate"))
+    return df.join(totals, on=key, how="left").select(combine(pl.col("_aggregate")).alias("result"))
+
+
+# (formula, self-join baseline or None), for every partition column
+WINDOW_CASES = [
+    ("[salary] / sum([salary]) over [{key}]",
+     lambda df, key: _join_back(df, key, pl.col("salary").sum(), lambda total: pl.col("salary") / total)),
+    ("[salary] - mean([salary]) over [{key}]",
+     lambda df, key: _join_back(df, key, pl.col("salary").mean(), lambda mean: pl.col("salary") - mean)),
+    ("count([name]) over [{key}]",
+     lambda df, key: _join_back(df, key, pl.col("name").count(), lambda count: count)),
+    ("[salary] = largest([salary]) over [{key}]",
+     lambda df, key: _join_back(df, key, pl.col("salary").max(), lambda top: pl.col("salary") == top)),
+    ("rank([salary]) over [{key}]", None),
+    ("cum_sum([salary]) over [{key}]", None),
+    ("row_number() over [{key}]", None),
+]
+
+PARTITION_KEYS = ["city", "name"]
+
+
+def run_benchmarks(scales, repeat):
+    """
+    Time every window formula, and its self-join baseline, at every scale.
+
+    Args:
+        scales: Row counts to evaluate the formulas at
+        repeat: Number of samples per measurement
+
+    Returns:
+        dict: The results document, ready to be dumped as JSON
+    """
+    results = []
+    for n_rows in scales:
+        df = generate_people_frame(n_rows)
+        for key in PARTITION_KEYS:
+            n_partitions = df[key].n_unique()
+            for template, baseline in WINDOW_CASES:
+                formula = template.format(key=key)
+                expr = compile_formula(formula, page="benchmark").expr
+                entry = {"formula": formula, "rows": n_rows, "partitions": n_partitions}
+                _, entry["over_s"] = time_call(lambda: df.select(expr.alias("result")), repeat)
+                if baseline is not None:
+                    _, entry["self_join_s"] = time_call(lambda: baseline(df, key), repeat)
+                results.append(entry)
+        del df
+
+    return {"metadata": environment_metadata(), "scales": scales, "repeat": repeat, "results": results}
+
+
+def print_summary(document):
+    """Print median timings in milliseconds, with the speedup over the self-join"""
+    header = f"{'formula':<46} {'rows':>10} {'groups':>8} {'over':>10} {'self-join':>10} {'speedup':>8}"
+    print(header)
+    print("-" * len(header))
+    for entry in document["results"]:
+        over = statistics.median(entry["over_s"]) * 1e3
+        row = f"{entry['formula']:<46} {entry['rows']:>10} {entry['partitions']:>8} {over:>10.2f}"
+        if "self_join_s" in entry:
+            self_join = statistics.median(entry["self_join_s"]) * 1e3
+            row += f" {self_join:>10.2f} {self_join / over:>7.1f}x"
+        print(row)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", nargs="+", type=float, default=DEFAULT_SCALES,
+                        help="Row counts to benchmark, e.g. 1e5 1e7")
+    parser.add_argument("--repeat", type=int, default=5, help="Samples per measurement")
+    parser.add_argument("--output", type=Path, default=None, help="Where to write the JSON results")
+    args = parser.parse_args(argv)
+
+    document = run_benchmarks([int(n) for n in args.scales], args.repeat)
+    metadata = document["metadata"]
+    output = args.output or RESULTS_DIR / f"windows_polars-{metadata['polars']}_pet-{metadata['polars_expr_transformer']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(document, indent=2))
+
+    print_summary(document)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
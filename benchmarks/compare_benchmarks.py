@@ -0,0 +1,220 @@
+"""
+Gate library upgrades on the speed of the formula corpus.
+
+Compares a baseline results file of ``bench_formulas.py``, recorded with the
+library versions in use, with a candidate run. Without a candidate file the
+corpus is run with the installed versions, at the scales and repeat count of
+the baseline, and saved next to it.
+
+Every stage of every formula (parse, build and execute per scale) is compared
+separately. A stage is a regression when its samples are significantly slower,
+one-sided Mann-Whitney U test below ``--alpha``, and its median slowed down by
+more than ``--threshold`` and ``--min-ms``. All are required: a small consistent
+slowdown is significant but not worth gating on, a large one on a noisy stage
+may not be significant, and stages of a few microseconds mostly time the timer.
+
+Timings of two runs are only comparable on the same, otherwise idle machine. A
+machine that is slower as a whole during one run shifts every stage, which the
+overall ratio per kind of stage in the report shows. Comparing two runs of the
+same versions first tells how much the machine varies: raise ``--threshold``
+until that comparison passes. A formula that ran in the baseline and fails in the candidate is a
+regression too.
+
+The script exits with status 1 when there is a regression, so an upgrade can be
+gated on it.
+
+Usage:
+    python benchmarks/bench_formulas.py --scales 1e3 1e5 --repeat 7
+    pip install -U polars polars-expr-transformer
+    python benchmarks/compare_benchmarks.py benchmarks/results/formulas_polars-1.25.2_pet-0.4.11.json
+"""
+import argparse
+import json
+import math
+import statistics
+import sys
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "streamlit_app"))
+
+from bench_formulas import run_benchmarks, environment_metadata, default_output_path  # noqa: E402
+
+# Metadata that makes timings of two runs incomparable when it differs
+MACHINE_KEYS = ["python", "platform", "processor"]
+
+# Sample sizes up to which the p-value is computed from the exact distribution of U
+EXACT_MAX_SAMPLES = 20
+
+
+@lru_cache(maxsize=None)
+def _u_counts(m, n):
+    """Number of orderings of ``m`` and ``n`` distinct samples giving each value of U"""
+    if m == 0 or n == 0:
+        return (1,)
+    # The largest sample is either one of the m, beating all n others, or one of the n
+    counts = [0] * (m * n + 1)
+    for u, count in enumerate(_u_counts(m - 1, n)):
+        counts[u + n] += count
+    for u, count in enumerate(_u_counts(m, n - 1)):
+        counts[u] += count
+    return tuple(counts)
+
+
+def slower_p_value(candidate, baseline):
+    """
+    One-sided Mann-Whitney U test that ``candidate`` samples are larger than ``baseline``.
+
+    Args:
+        candidate: Durations of the candidate run
+        baseline: Durations of the baseline run
+
+    Returns:
+        float: The p-value, exact for small samples without ties, else the normal approximation
+    """
+    m, n = len(candidate), len(baseline)
+    u = sum(1.0 if c > b else 0.5 if c == b else 0.0 for c in candidate for b in baseline)
+    ties = len(set(candidate) | set(baseline)) < m + n
+    if not ties and m <= EXACT_MAX_SAMPLES and n <= EXACT_MAX_SAMPLES:
+        counts = _u_counts(m, n)
+        return sum(counts[math.ceil(u):]) / sum(counts)
+
+    tie_term = sum(t ** 3 - t for t in Counter(candidate + baseline).values())
+    variance = m * n / 12 * ((m + n + 1) - tie_term / ((m + n) * (m + n - 1)))
+    if variance == 0:
+        return 1.0
+    # Continuity correction towards the mean
+    z = (u - m * n / 2 - 0.5) / math.sqrt(variance)
+    return statistics.NormalDist().cdf(-z)
+
+
+def _stages(entry):
+    """The sampled stages of a results entry as {stage name: samples}"""
+    stages = {}
+    if "parse_s" in entry:
+        stages["parse"] = entry["parse_s"]
+        stages["build"] = entry["build_s"]
+    for n_rows, samples in entry.get("execute_s", {}).items():
+        stages[f"execute {n_rows} rows"] = samples
+    return stages
+
+
+def _key(entry):
+    return entry["source"], entry["title"], entry["formula"]
+
+
+def compare(baseline, candidate, alpha, threshold, min_ms):
+    """
+    Compare every stage the two runs both measured.
+
+    Args:
+        baseline: Results document of the baseline run
+        candidate: Results document of the candidate run
+        alpha: Significance level of the one-sided test
+        threshold: Relative slowdown of the median a regression needs, 0.2 is 20%
+        min_ms: Absolute slowdown of the median a regression needs, in milliseconds
+
+    Returns:
+        dict: Lists of ``regressions``, ``improvements`` and ``failures``, the number of ``compared``
+        stages and the geometric mean ``ratios`` per kind of stage
+    """
+    candidate_entries = {_key(entry): entry for entry in candidate["results"]}
+    report = {"compared": 0, "regressions": [], "improvements": [], "failures": [], "ratios": {}}
+    log_ratios = {}
+    for entry in baseline["results"]:
+        other = candidate_entries.get(_key(entry))
+        if other is None or "error" in entry:
+            continue
+        if "error" in other:
+            report["failures"].append({"formula": entry["formula"], "error": other["error"]})
+            continue
+        other_stages = _stages(other)
+        for stage, samples in _stages(entry).items():
+            if stage not in other_stages:
+                continue
+            report["compared"] += 1
+            before, after = statistics.median(samples), statistics.median(other_stages[stage])
+            row = {"formula": entry["formula"], "stage": stage, "baseline_ms": before * 1e3,
+                   "candidate_ms": after * 1e3, "ratio": after / before if before else math.inf}
+            if before and after:
+                log_ratios.setdefault(stage, []).append(math.log(row["ratio"]))
+            if abs(after - before) * 1e3 < min_ms:
+                continue
+            if row["ratio"] > 1 + threshold:
+                row["p_value"] = slower_p_value(other_stages[stage], samples)
+                if row["p_value"] < alpha:
+                    report["regressions"].append(row)
+            elif row["ratio"] < 1 / (1 + threshold):
+                row["p_value"] = slower_p_value(samples, other_stages[stage])
+                if row["p_value"] < alpha:
+                    report["improvements"].append(row)
+    report["ratios"] = {stage: math.exp(statistics.fmean(values)) for stage, values in log_ratios.items()}
+    return report
+
+
+def print_report(report, baseline, candidate):
+    """Print the regressions, failures and improvements, worst first"""
+    before, after = baseline["metadata"], candidate["metadata"]
+    print(f"baseline:  polars {before['polars']}, polars-expr-transformer {before['polars_expr_transformer']}")
+    print(f"candidate: polars {after['polars']}, polars-expr-transformer {after['polars_expr_transformer']}")
+    for key in MACHINE_KEYS:
+        if before.get(key) != after.get(key):
+            print(f"warning: {key} differs ({before.get(key)} vs {after.get(key)}), timings may not be comparable")
+    print(f"{report['compared']} stages compared, overall candidate / baseline:")
+    for stage, ratio in report["ratios"].items():
+        print(f"  {stage:<22} {ratio:.2f}x")
+    print()
+
+    header = f"{'formula':<60} {'stage':<22} {'baseline':>10} {'candidate':>10} {'ratio':>7} {'p':>8}"
+    for title, rows in (("Regressions", report["regressions"]), ("Improvements", report["improvements"])):
+        if not rows:
+            continue
+        print(title)
+        print(header)
+        print("-" * len(header))
+        for row in sorted(rows, key=lambda row: row["ratio"], reverse=title == "Regressions"):
+            name = row["formula"].replace("\n", " ")[:58]
+            print(f"{name:<60} {row['stage']:<22} {row['baseline_ms']:>10.3f} {row['candidate_ms']:>10.3f} "
+                  f"{row['ratio']:>6.2f}x {row['p_value']:>8.4f}")
+        print()
+    for failure in report["failures"]:
+        print(f"Failing in the candidate: {failure['formula'][:58]!r}: {failure['error']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline", type=Path, help="Results file of the versions in use")
+    parser.add_argument("candidate", type=Path, nargs="?", default=None,
+                        help="Results file of the new versions, by default the installed versions are run")
+    parser.add_argument("--alpha", type=float, default=0.01, help="Significance level of a slowdown")
+    parser.add_argument("--threshold", type=float, default=0.20,
+                        help="Relative slowdown of the median a regression needs, 0.2 is 20%%")
+    parser.add_argument("--min-ms", type=float, default=0.1,
+                        help="Absolute slowdown of the median a regression needs, in milliseconds")
+    parser.add_argument("--output", type=Path, default=None, help="Where to write the candidate run")
+    args = parser.parse_args(argv)
+
+    baseline = json.loads(args.baseline.read_text())
+    if args.candidate is not None:
+        candidate = json.loads(args.candidate.read_text())
+    else:
+        output = args.output or default_output_path(environment_metadata())
+        if output.resolve() == args.baseline.resolve():
+            parser.error("the installed versions are the baseline versions, pass --output to keep the baseline")
+        candidate = run_benchmarks(baseline["scales"], baseline["repeat"])
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(candidate, indent=2))
+        print(f"Candidate results written to {output}\n")
+
+    report = compare(baseline, candidate, args.alpha, args.threshold, args.min_ms)
+    print_report(report, baseline, candidate)
+    if report["regressions"] or report["failures"]:
+        print(f"{len(report['regressions'])} regressions, {len(report['failures'])} failures")
+        return 1
+    print("No significant slowdown")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
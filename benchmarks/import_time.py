@@ -0,0 +1,110 @@
+"""
+Report the import time of the app entry point and of every page module.
+
+Every module is imported in a fresh interpreter with ``python -X importtime``,
+so the numbers are cold-start costs including the libraries a page pulls in.
+The startup row is what ``main.py`` imports before the first paint, the other
+rows are paid the first time a page is opened.
+
+Usage:
+    python benchmarks/import_time.py --repeat 3
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parents[1] / "streamlit_app"
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# Modules imported by main.py at startup
+STARTUP_MODULES = [
+    "streamlit",
+    "streamlit_pages.diagnostics",
+    "streamlit_pages.instrumentation",
+    "streamlit_pages.session_memory",
+]
+
+PAGE_MODULES = [
+    "streamlit_pages.readme",
+    "streamlit_pages.data_transform",
+    "streamlit_pages.documentation",
+    "streamlit_pages.examples",
+    "streamlit_pages.function_overview",
+    "streamlit_pages.tree_visualizer",
+]
+
+HEAVY_LIBRARIES = ["polars", "pandas", "pyarrow", "numpy", "streamlit_agraph", "polars_expr_transformer",
+                   "networkx", "matplotlib"]
+
+
+def import_profile(modules, preloaded=()):
+    """
+    Import ``modules`` in a fresh interpreter and parse the ``-X importtime`` output.
+
+    Args:
+        modules: Modules to import
+        preloaded: Modules imported before the measured ones, excluded from the profile
+
+    Returns:
+        tuple: (dict of top level module name to cumulative import time in microseconds,
+                set of every module imported)
+    """
+    code = "".join(f"import {m};" for m in preloaded) + "import sys; sys.stderr.write('--start--\\n');"
+    code += "".join(f"import {m};" for m in modules)
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=APP_DIR,
+                               capture_output=True, text=True, check=True)
+    lines = completed.stderr.split("--start--\n", 1)[1].splitlines()
+
+    top_level = {}
+    imported = set()
+    for line in lines:
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cum_us, name = line[len("import time:"):].split("|")
+        if not cum_us.strip().isdigit():
+            continue
+        imported.add(name.strip())
+        # Nested imports are indented below the module that triggered them
+        if not name[1:].startswith(" "):
+            top_level[name.strip()] = int(cum_us)
+    return top_level, imported
+
+
+def measure(modules, preloaded, repeat):
+    """Median total import time in milliseconds and the heavy libraries that were loaded"""
+    totals = []
+    loaded = set()
+    for _ in range(repeat):
+        top_level, imported = import_profile(modules, preloaded)
+        totals.append(sum(top_level.values()) / 1e3)
+        loaded |= {lib for lib in HEAVY_LIBRARIES if lib in imported}
+    return statistics.median(totals), sorted(loaded)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per measurement")
+    parser.add_argument("--output", type=Path, default=RESULTS_DIR / "import_time.json")
+    args = parser.parse_args(argv)
+
+    rows = []
+    total, loaded = measure(STARTUP_MODULES, (), args.repeat)
+    rows.append({"target": "startup (main.py)", "ms": total, "heavy_libraries": loaded})
+    for module in PAGE_MODULES:
+        total, loaded = measure([module], STARTUP_MODULES, args.repeat)
+        rows.append({"target": module, "ms": total, "heavy_libraries": loaded})
+
+    print(f"{'target':<36} {'ms':>10}  heavy libraries loaded")
+    for row in rows:
+        print(f"{row['target']:<36} {row['ms']:>10.1f}  {', '.join(row['heavy_libraries']) or '-'}")
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps({"python": sys.version, "results": rows}, indent=2))
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+Simulate concurrent users of the app and measure what one server process sustains.
+
+Every simulated user is a Streamlit ``AppTest`` session of ``main.py`` that runs
+a scripted visit: open the app, apply a formula in the Data Transformer, draw a
+tree in the Tree Visualizer and try an example. All sessions run as threads of
+this process, the way a Streamlit server runs the reruns of its sessions, so
+they share the compile cache, the memory budget and the GIL like real users do.
+
+For every concurrency level the report gives the rerun latency (p50, p95 and
+p99, overall and per step), the peak resident memory of the process and the
+throughput in reruns per second. Nothing is fetched over the network.
+
+Running many AppTest sessions in one process, and opening the pages that
+``st.navigation`` registers as callables, relies on private parts of Streamlit
+(see ``share_server_state`` and ``Session.goto``). They were checked against the
+Streamlit version in ``TESTED_STREAMLIT``, pinned by the optional ``bench``
+dependency group of pyproject.toml, and the script refuses to run on another
+one unless ``--any-streamlit`` is given.
+
+Usage:
+    python benchmarks/load_test.py --users 1 4 16 --iterations 3
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+import streamlit
+
+APP_DIR = Path(__file__).resolve().parents[1] / "streamlit_app"
+sys.path.insert(0, str(APP_DIR))
+
+from streamlit.runtime import Runtime  # noqa: E402
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache  # noqa: E402
+from streamlit.testing.v1 import AppTest, app_test, local_script_runner  # noqa: E402
+
+from bench_formulas import environment_metadata, RESULTS_DIR  # noqa: E402
+
+DEFAULT_USERS = [1, 4, 16]
+
+# Streamlit release (major.minor) whose private runtime parts this script was checked against
+TESTED_STREAMLIT = "1.66"
+
+# Seconds between samples of the resident memory
+RSS_INTERVAL = 0.05
+
+
+def share_server_state():
+    """
+    Make the AppTest sessions of this process run like the sessions of one server.
+
+    AppTest gives every run its own runtime and script cache, and removes the
+    runtime when the run ends, while a server has one of each for all its
+    sessions. The last runtime installed is kept, so a run that ends does not
+    pull it from under the others, and ``main.py`` is compiled once. Compiling it
+    in several threads at once also trips a CPython 3.11 parser bug.
+
+    Raises:
+        RuntimeError: If the Streamlit installed lacks the parts replaced here
+    """
+    missing = [name for owner, name in ((app_test, "ScriptCache"), (local_script_runner, "ScriptCache"),
+                                        (Runtime, "_instance"))
+               if not hasattr(owner, name)]
+    if missing:
+        raise RuntimeError(f"Streamlit {streamlit.__version__} has no {', '.join(missing)}, "
+                           f"the load test was written for Streamlit {TESTED_STREAMLIT}")
+    script_cache = ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: script_cache
+    latest = []
+
+    def instance(cls):
+        if cls._instance is not None:
+            latest[:] = [cls._instance]
+        if not latest:
+            raise RuntimeError("Runtime hasn't been created!")
+        return latest[0]
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: cls._instance is not None or bool(latest))
+
+
+class Session:
+    """One simulated user, a headless session of ``main.py``"""
+
+    def __init__(self, timeout):
+        self.app = AppTest.from_file(str(APP_DIR / "main.py"), default_timeout=timeout)
+
+    def open(self):
+        self.app.run()
+
+    def goto(self, url_path):
+        # Pages are callables registered by st.navigation, which AppTest.switch_page cannot select
+        self.app._page_hash = next(page_hash for page_hash, info in self.app._registered_pages.items()
+                                   if info.get("url_pathname") == url_path)
+        self.app.run()
+
+    def click(self, key=None, label=None):
+        button = self.app.button(key=key) if key else next(b for b in self.app.button if b.label == label)
+        button.click().run()
+
+    @property
+    def errors(self):
+        return len(self.app.exception) + len(self.app.error)
+
+
+# Steps of one visit after opening the app, every step is one rerun
+SCENARIO = [
+    ("data_transformer", lambda session: session.goto("data_transformer")),
+    ("calculate", lambda session: session.click(key="calculate_btn")),
+    ("tree_visualizer", lambda session: session.goto("tree_visualizer")),
+    ("visualize", lambda session: session.click(label="Visualize Expression")),
+    ("examples", lambda session: session.goto("examples")),
+    ("try_example", lambda session: session.click(key="try_Extract Year")),
+]
+
+
+def current_rss():
+    """Resident memory of this process in bytes"""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+class RssSampler(threading.Thread):
+    """Samples the resident memory until stopped and keeps the peak"""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.peak = current_rss()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(RSS_INTERVAL):
+            self.peak = max(self.peak, current_rss())
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        self.peak = max(self.peak, current_rss())
+
+
+def simulate_user(iterations, think_time, timeout, samples, lock):
+    """Run one session through ``iterations`` visits, appending (step, seconds, errors) to ``samples``"""
+    session = Session(timeout)
+    steps = [("open", Session.open)] + SCENARIO * iterations
+    for name, action in steps:
+        start = time.perf_counter()
+        try:
+            action(session)
+            errors = session.errors
+        except Exception:
+            # A timeout or a missing widget, the session cannot go on
+            errors = 1
+        with lock:
+            samples.append((name, time.perf_counter() - start, errors))
+        if errors and name == "open":
+            return
+        time.sleep(think_time)
+
+
+def percentiles(durations):
+    """p50, p95 and p99 of ``durations`` in milliseconds"""
+    if len(durations) == 1:
+        return {f"p{p}_ms": durations[0] * 1e3 for p in (50, 95, 99)}
+    cuts = statistics.quantiles(durations, n=100, method="inclusive")
+    return {f"p{p}_ms": cuts[p - 1] * 1e3 for p in (50, 95, 99)}
+
+
+def run_level(users, iterations, think_time, timeout):
+    """
+    Run ``users`` sessions at the same time.
+
+    Returns:
+        dict: Latency percentiles overall and per step, peak RSS, throughput and error count
+    """
+    samples, lock = [], threading.Lock()
+    threads = [threading.Thread(target=simulate_user, args=(iterations, think_time, timeout, samples, lock),
+                                name=f"user_{i}") for i in range(users)]
+    sampler = RssSampler()
+    sampler.start()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    sampler.stop()
+
+    durations = [seconds for _, seconds, _ in samples]
+    steps = {}
+    for name, seconds, _ in samples:
+        steps.setdefault(name, []).append(seconds)
+    return {
+        "users": users,
+        "reruns": len(samples),
+        "errors": sum(errors for _, _, errors in samples),
+        "wall_s": wall,
+        "throughput_per_s": len(samples) / wall,
+        "peak_rss_mb": sampler.peak / 2 ** 20,
+        **percentiles(durations),
+        "steps": {name: {"reruns": len(values), **percentiles(values)} for name, values in steps.items()},
+        "samples": samples,
+    }
+
+
+def print_summary(document):
+    """Print one row per concurrency level"""
+    header = (f"{'users':>6} {'reruns':>7} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+              f"{'reruns/s':>9} {'peak RSS MB':>12}")
+    print(header)
+    print("-" * len(header))
+    for level in document["levels"]:
+        print(f"{level['users']:>6} {level['reruns']:>7} {level['errors']:>7} {level['p50_ms']:>9.1f} "
+              f"{level['p95_ms']:>9.1f} {level['p99_ms']:>9.1f} {level['throughput_per_s']:>9.2f} "
+              f"{level['peak_rss_mb']:>12.1f}")
+
+
+def check_streamlit_version():
+    """
+    Stop when the Streamlit installed is not the release the script was checked against.
+
+    Raises:
+        SystemExit: If the major and minor version differ from ``TESTED_STREAMLIT``
+    """
+    installed = ".".join(streamlit.__version__.split(".")[:2])
+    if installed != TESTED_STREAMLIT:
+        raise SystemExit(f"The load test patches private parts of Streamlit {TESTED_STREAMLIT}, "
+                         f"Streamlit {streamlit.__version__} is installed. Install the pinned version with "
+                         f"'poetry install --with bench', or pass --any-streamlit to try anyway.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", nargs="+", type=int, default=DEFAULT_USERS,
+                        help="Concurrent sessions, one run per value")
+    parser.add_argument("--iterations", type=int, default=3, help="Visits per session")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Seconds a user waits between steps")
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds a rerun may take before it fails")
+    parser.add_argument("--no-warmup", action="store_true",
+                        help="Measure the first session too, including the imports of every page")
+    parser.add_argument("--output", type=Path, default=None, help="Where to write the JSON results")
+    parser.add_argument("--any-streamlit", action="store_true",
+                        help=f"Run on a Streamlit other than {TESTED_STREAMLIT}, the numbers may be wrong")
+    args = parser.parse_args(argv)
+
+    if not args.any_streamlit:
+        check_streamlit_version()
+
+    # Streamlit warns about every session that runs outside a server
+    logging.disable(logging.WARNING)
+    share_server_state()
+    if not args.no_warmup:
+        run_level(1, 1, 0.0, args.timeout)
+
+    levels = [run_level(users, args.iterations, args.think_time, args.timeout) for users in args.users]
+    document = {"metadata": environment_metadata(), "iterations": args.iterations,
+                "think_time": args.think_time, "steps": ["open"] + [name for name, _ in SCENARIO],
+                "levels": levels}
+    metadata = document["metadata"]
+    output = args.output or RESULTS_DIR / f"load_polars-{metadata['polars']}_pet-{metadata['polars_expr_transformer']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(document, indent=2))
+
+    print_summary(document)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
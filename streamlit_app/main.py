@@ -1,11 +1,32 @@
+import importlib
+
 import streamlit as st
 
-from streamlit_pages.data_transform import show_data_transform_page
-from streamlit_pages.documentation import show_docs_page
-from streamlit_pages.function_overview import show_functions_overview_page
-from streamlit_pages.examples import show_examples_page
-from streamlit_pages.tree_visualizer import show_tree_visualizer_page
-from streamlit_pages.readme import show_readme_page
+from streamlit_pages.diagnostics import show_diagnostics_panel, show_memory_panel
+from streamlit_pages.instrumentation import export_metrics, increment, timed
+from streamlit_pages.session_memory import enforce_memory_budget
+from streamlit_pages.warmup import warmup_enabled, start_warmup
+
+# Page title, module and entry point. Page modules, and the heavy libraries they
+# use (Polars, pyarrow, streamlit-agraph), are only imported when the page is opened.
+PAGES = [
+    ("Readme", "streamlit_pages.readme", "show_readme_page"),
+    ("Data Transformer", "streamlit_pages.data_transform", "show_data_transform_page"),
+    ("Documentation", "streamlit_pages.documentation", "show_docs_page"),
+    ("Examples", "streamlit_pages.examples", "show_examples_page"),
+    ("Functions Overview", "streamlit_pages.function_overview", "show_functions_overview_page"),
+    ("Tree visualizer", "streamlit_pages.tree_visualizer", "show_tree_visualizer_page"),
+]
+
+
+def lazy_page(module_name, function_name):
+    """Return a page callable that imports its module on first use"""
+    def show_page():
+        with timed("import", module_name.rsplit(".", 1)[-1]):
+            module = importlib.import_module(module_name)
+        getattr(module, function_name)()
+    return show_page
+
 
 # Set page configuration
 st.set_page_config(
@@ -14,33 +35,20 @@ st.set_page_config(
     layout="wide"
 )
 
-# Create tabs for different sections
-tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
-    "Readme",
-    "Data Transformer",
-    "Documentation",
-    "Examples",
-    "Functions Overview",
-    "Tree visualizer",
-])
-
-with tab1:
-    show_readme_page()
-
-with tab2:
-    show_data_transform_page()
-
-with tab3:
-    show_docs_page()
-
-with tab4:
-    show_examples_page()
-
-with tab5:
-    show_functions_overview_page()
-
-with tab6:
-    show_tree_visualizer_page()
+# Compile the example corpus in the background, once per process, when EXPR_DEMO_WARMUP is set
+if warmup_enabled():
+    start_warmup()
+
+# Only the selected page runs, unlike st.tabs which runs every tab on every rerun
+page = st.navigation(
+    [
+        st.Page(lazy_page(module_name, function_name), title=title,
+                url_path=title.lower().replace(" ", "_"), default=i == 0)
+        for i, (title, module_name, function_name) in enumerate(PAGES)
+    ],
+    position="top"
+)
+page.run()
 
 # Apply custom CSS for rounded image and sidebar styling
 st.markdown("""
@@ -106,4 +114,18 @@ st.sidebar.markdown(
     </div>
     """,
     unsafe_allow_html=True
-)
\ No newline at end of file
+)
+
+# Evict cached results of this session when it, or the server, is over its memory budget
+evicted = enforce_memory_budget()
+if evicted:
+    increment("evicted", amount=len(evicted))
+
+with st.sidebar.expander("Memory"):
+    show_memory_panel(evicted)
+
+# Per-stage latency of this server process
+with st.sidebar.expander("Diagnostics"):
+    show_diagnostics_panel()
+
+export_metrics()
@@ -0,0 +1,124 @@
+"""
+Apply formulas to a Parquet dataset without loading it into memory first.
+
+Derived columns and the filter are added to a ``scan_parquet`` query, so Polars
+pushes the filter into the scan: row groups whose statistics cannot match are
+skipped and only the columns the query needs are read.
+
+Usage, from the streamlit_app folder:
+    python -m streamlit_pages.batch_runner data/people.parquet --filter "[age] > 30 and [salary] < 90000" \\
+        --column "band=if [salary] > 100000 then 'High' else 'Standard' endif" --output filtered.parquet
+"""
+import argparse
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import polars as pl
+
+from streamlit_pages.formula_engine import compile_formula, compile_predicate
+from streamlit_pages.instrumentation import timed
+
+PAGE = "batch"
+
+
+@dataclass
+class BatchReport:
+    """
+    Outcome of a batch run.
+
+    Attributes:
+        source_rows: Rows in the source dataset, read from the Parquet metadata
+        kept_rows: Rows that passed the filter
+        seconds: Wall time of the query
+        plan: The optimized query plan, showing the filter pushed into the scan
+        result: The result, unless it was written to a file
+    """
+    source_rows: int
+    kept_rows: int
+    seconds: float
+    plan: str
+    result: Optional[pl.DataFrame] = None
+
+
+def build_query(source, filter_formula=None, columns=()):
+    """
+    Build the lazy query for a batch run.
+
+    Args:
+        source: Parquet file, glob or list of files
+        filter_formula: Boolean formula, rows for which it is not true are dropped
+        columns: (name, formula) pairs of columns to add
+
+    Returns:
+        pl.LazyFrame: The query
+    """
+    query = pl.scan_parquet(source)
+    for name, formula in columns:
+        query = query.with_columns(
+            compile_formula(formula, page=PAGE, schema=query.collect_schema()).expr.alias(name))
+    if filter_formula:
+        predicate = compile_predicate(filter_formula, query.collect_schema(), page=PAGE).expr
+        if not predicate.meta.root_names():
+            # A formula without columns keeps every row or none, no need to scan for it
+            return query if pl.select(predicate).item() else query.head(0)
+        # The optimizer moves the filter below the derived columns it does not use, into the scan
+        query = query.filter(predicate)
+    return query
+
+
+def run_batch(source, filter_formula=None, columns=(), output=None):
+    """
+    Run formulas over a Parquet dataset.
+
+    Args:
+        source: Parquet file, glob or list of files
+        filter_formula: Boolean formula, rows for which it is not true are dropped
+        columns: (name, formula) pairs of columns to add
+        output: Parquet file to stream the result to, the result is returned when not given
+
+    Returns:
+        BatchReport: Row counts, timing, plan and result
+    """
+    query = build_query(source, filter_formula, columns)
+    plan = query.explain()
+    # Answered from the Parquet footers, no data is read
+    source_rows = pl.scan_parquet(source).select(pl.len()).collect().item()
+
+    start = time.perf_counter()
+    with timed("execute", PAGE):
+        if output:
+            query.sink_parquet(output)
+            result = None
+            kept_rows = pl.scan_parquet(output).select(pl.len()).collect().item()
+        else:
+            result = query.collect()
+            kept_rows = result.height
+    return BatchReport(source_rows=source_rows, kept_rows=kept_rows, seconds=time.perf_counter() - start,
+                       plan=plan, result=result)
+
+
+def _column_argument(value):
+    name, sep, formula = value.partition("=")
+    if not sep or not name.strip():
+        raise argparse.ArgumentTypeError(f"expected name=formula, got {value!r}")
+    return name.strip(), formula.strip()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply formulas to a Parquet dataset")
+    parser.add_argument("source", help="Parquet file or glob")
+    parser.add_argument("--filter", dest="filter_formula", help="Keep the rows for which this formula is true")
+    parser.add_argument("--column", dest="columns", action="append", type=_column_argument, default=[],
+                        help="Add a column, as name=formula. Can be repeated")
+    parser.add_argument("--output", help="Parquet file to write the result to")
+    parser.add_argument("--explain", action="store_true", help="Print the optimized query plan")
+    args = parser.parse_args()
+
+    report = run_batch(args.source, args.filter_formula, args.columns, args.output)
+    if args.explain:
+        print(report.plan)
+    share = report.kept_rows / report.source_rows if report.source_rows else 0.0
+    print(f"Kept {report.kept_rows:,} of {report.source_rows:,} rows ({share:.2%}) in {report.seconds:.2f} s")
+    if report.result is not None:
+        print(report.result)
@@ -0,0 +1,484 @@
+"""
+Export a transformation recipe as a standalone Python module.
+
+The module holds one lazy Polars pipeline and needs neither the formula parser
+nor this app: the formulas are compiled here, once, and written out as Polars
+code. Nodes without a direct spelling in Python, such as most string and date
+functions, are embedded as serialized Polars expressions. Every written
+expression is read back and compared with the compiled one. Plugin functions
+are serialized with the path of their library, which is stored relative to its
+package and looked up in the packages installed where the module runs.
+
+The pipeline only reads the source columns the outputs depend on, leaves out
+steps whose column is never used, applies independent steps in a single
+``with_columns`` and computes subexpressions repeated within one of those once,
+as a helper column.
+
+Usage, from the streamlit_app folder, with the manifest of a session snapshot:
+    python -m streamlit_pages.codegen /tmp/expr_demo_snapshots/<token>/manifest.json \\
+        --source data/sample_data.csv --output pipeline.py
+"""
+import argparse
+import io
+import json
+import os
+import sys
+from dataclasses import dataclass
+
+import polars as pl
+
+from streamlit_pages.formula_engine import compile_formula
+
+# Readers of the source, by file extension
+scan_functions = {
+    ".csv": "scan_csv",
+    ".parquet": "scan_parquet",
+    ".arrow": "scan_ipc",
+    ".ipc": "scan_ipc",
+    ".feather": "scan_ipc",
+}
+
+# Binary operators with a Python operator, by their name in the serialized expression
+binary_operators = {
+    "Plus": "+",
+    "Minus": "-",
+    "Multiply": "*",
+    "TrueDivide": "/",
+    "FloorDivide": "//",
+    "Modulus": "%",
+    "Eq": "==",
+    "NotEq": "!=",
+    "Lt": "<",
+    "LtEq": "<=",
+    "Gt": ">",
+    "GtEq": ">=",
+    "And": "&",
+    "Or": "|",
+    "Xor": "^",
+}
+
+# Binary operators written as a method call
+binary_methods = {
+    "EqValidity": "eq_missing",
+    "NotEqValidity": "ne_missing",
+}
+
+# Aggregations written as a method call
+aggregation_methods = {
+    "Sum": "sum",
+    "Mean": "mean",
+    "Median": "median",
+    "Min": "min",
+    "Max": "max",
+    "NUnique": "n_unique",
+    "First": "first",
+    "Last": "last",
+}
+
+# Names of the helper columns holding shared subexpressions
+CSE_PREFIX = "_cse_"
+
+# Expression nodes worth computing once as a helper column
+hoistable_nodes = {"BinaryExpr", "Cast", "Function", "Ternary", "Agg", "Window"}
+
+
+@dataclass
+class RecipeStep:
+    """
+    One step of a recipe.
+
+    Attributes:
+        action: "Add column" or "Filter rows"
+        formula: The formula
+        column: Name of the added column, None for filters
+    """
+    action: str
+    formula: str
+    column: str = None
+
+
+def _tree(expr):
+    return json.loads(expr.meta.serialize(format="json"))
+
+
+def _expr(tree):
+    return pl.Expr.deserialize(io.StringIO(json.dumps(tree)), format="json")
+
+
+def _plugin_package(lib):
+    """
+    The installed package holding plugin library ``lib``.
+
+    Returns:
+        tuple: (package name, path of the library within the package)
+
+    Raises:
+        ValueError: If the library is not part of a package on ``sys.path``
+    """
+    lib = os.path.abspath(lib)
+    for entry in sorted((os.path.abspath(entry) for entry in sys.path if entry), key=len, reverse=True):
+        if lib.startswith(entry + os.sep):
+            package, _, name = os.path.relpath(lib, entry).partition(os.sep)
+            if name:
+                return package, name.replace(os.sep, "/")
+    raise ValueError(f"Plugin library {lib} is not part of an installed package")
+
+
+def _relocate_plugins(tree):
+    """
+    Replace the library path of every plugin in ``tree`` by ``package:path``, in place.
+
+    Returns:
+        bool: Whether ``tree`` calls a plugin
+    """
+    found = False
+    if isinstance(tree, dict):
+        plugin = tree.get("FfiPlugin")
+        if isinstance(plugin, dict) and "lib" in plugin:
+            plugin["lib"] = ":".join(_plugin_package(plugin["lib"]))
+            found = True
+        values = tree.values()
+    elif isinstance(tree, list):
+        values = tree
+    else:
+        return False
+    for value in values:
+        found = _relocate_plugins(value) or found
+    return found
+
+
+# Written into modules with plugin calls, finds the libraries relocated by _relocate_plugins
+_PLUGIN_LOADER = '''
+def _find_plugins(tree):
+    """Point the plugins of a serialized expression at the libraries installed here"""
+    if isinstance(tree, dict):
+        plugin = tree.get("FfiPlugin")
+        if isinstance(plugin, dict) and "lib" in plugin:
+            package, name = plugin["lib"].split(":", 1)
+            folder = os.path.dirname(importlib.util.find_spec(package).origin)
+            plugin["lib"] = os.path.join(folder, *name.split("/"))
+        for value in tree.values():
+            _find_plugins(value)
+    elif isinstance(tree, list):
+        for value in tree:
+            _find_plugins(value)
+    return tree
+
+
+def _deserialize(text):
+    return pl.Expr.deserialize(io.StringIO(json.dumps(_find_plugins(json.loads(text)))), format="json")
+'''
+
+
+def _key(tree):
+    return json.dumps(tree, sort_keys=True)
+
+
+class _Writer:
+    """Writes serialized expression trees as Python source"""
+
+    def __init__(self):
+        self.blobs = []
+
+    def blob(self, tree):
+        """Name of a module level variable holding ``tree`` as a serialized expression"""
+        name = f"_expr_{len(self.blobs) + 1}"
+        self.blobs.append((name, json.dumps(tree)))
+        return name
+
+    def code(self, tree):
+        if isinstance(tree, dict) and len(tree) == 1:
+            kind, value = next(iter(tree.items()))
+            written = self._code(kind, value)
+            if written is not None:
+                return written
+        return self.blob(tree)
+
+    def _code(self, kind, value):
+        if kind == "Column" and isinstance(value, str):
+            return f"pl.col({value!r})"
+        if kind == "Literal" and isinstance(value, dict) and len(value) == 1:
+            literal_type, literal = next(iter(value.items()))
+            if literal_type in ("Int", "Float", "String", "Boolean"):
+                return f"pl.lit({literal!r})"
+        if kind == "Literal" and value == "Null":
+            return "pl.lit(None)"
+        if kind == "Alias":
+            return f"{self.code(value[0])}.alias({value[1]!r})"
+        if kind == "BinaryExpr":
+            left, right = self.code(value["left"]), self.code(value["right"])
+            if value["op"] in binary_operators:
+                return f"({left} {binary_operators[value['op']]} {right})"
+            if value["op"] in binary_methods:
+                return f"{left}.{binary_methods[value['op']]}({right})"
+        if kind == "Ternary":
+            return (f"pl.when({self.code(value['predicate'])})"
+                    f".then({self.code(value['truthy'])})"
+                    f".otherwise({self.code(value['falsy'])})")
+        if kind == "Agg" and isinstance(value, dict) and len(value) == 1:
+            aggregation, inner = next(iter(value.items()))
+            if aggregation in aggregation_methods:
+                return f"{self.code(inner)}.{aggregation_methods[aggregation]}()"
+        if (kind == "Window" and value.get("order_by") is None
+                and value.get("options") == {"Over": "GroupsToRows"}):
+            partition_by = ", ".join(self.code(column) for column in value["partition_by"])
+            return f"{self.code(value['function'])}.over([{partition_by}])"
+        return None
+
+
+def write_expression(writer, tree):
+    """
+    Python source of one expression, checked against the expression itself.
+
+    Falls back to the serialized expression as a whole when the written code
+    does not build the same expression.
+    """
+    blobs = len(writer.blobs)
+    code = writer.code(tree)
+    namespace = {"pl": pl, **{name: _expr(json.loads(text)) for name, text in writer.blobs}}
+    if eval(code, namespace).meta.eq(_expr(tree)):
+        return code
+    del writer.blobs[blobs:]
+    return writer.blob(tree)
+
+
+def _is_window(tree):
+    return isinstance(tree, dict) and len(tree) == 1 and "Window" in tree
+
+
+def _subtrees(tree):
+    """
+    Nodes below and including ``tree`` that can become a helper column.
+
+    The inside of a window is evaluated per partition, not on the frame, so it is left alone.
+    """
+    if isinstance(tree, dict):
+        if len(tree) == 1 and next(iter(tree)) in hoistable_nodes:
+            yield tree
+        if not _is_window(tree):
+            for value in tree.values():
+                yield from _subtrees(value)
+    elif isinstance(tree, list):
+        for value in tree:
+            yield from _subtrees(value)
+
+
+def _replace(tree, key, replacement):
+    if isinstance(tree, dict):
+        if _key(tree) == key:
+            return replacement
+        if _is_window(tree):
+            return tree
+        return {name: _replace(value, key, replacement) for name, value in tree.items()}
+    if isinstance(tree, list):
+        return [_replace(value, key, replacement) for value in tree]
+    return tree
+
+
+def hoist_common_subexpressions(trees, counter):
+    """
+    Move subexpressions that occur more than once in ``trees`` into helper columns.
+
+    All trees are evaluated on the same frame, so a helper column computed just
+    before them has the same values as the subexpression it replaces.
+
+    Args:
+        trees: Expression trees of one ``with_columns`` or ``filter``
+        counter: Number of helper columns created so far
+
+    Returns:
+        tuple: (helper column trees, the trees using the helpers)
+    """
+    helpers = []
+    while True:
+        counts, subtrees = {}, {}
+        for tree in trees:
+            for subtree in _subtrees(tree):
+                key = _key(subtree)
+                counts[key] = counts.get(key, 0) + 1
+                subtrees[key] = subtree
+        repeated = [key for key, count in counts.items() if count > 1]
+        if not repeated:
+            return helpers, trees
+        # The largest repeated subexpression first, its parts go with it
+        key = max(repeated, key=len)
+        subtree = subtrees[key]
+        name = f"{CSE_PREFIX}{counter + len(helpers) + 1}"
+        helpers.append({"Alias": [subtree, name]})
+        trees = [_replace(tree, key, {"Column": name}) for tree in trees]
+
+
+def plan_pipeline(steps, schema, output_columns=None):
+    """
+    Compile a recipe into the stages of a lazy pipeline.
+
+    Args:
+        steps: RecipeStep of every step, in order
+        schema: Schema of the source
+        output_columns: Columns of the result, every column by default
+
+    Returns:
+        tuple: (source columns to read, stages, output columns), where a stage is
+        ("with_columns", trees) or ("filter", tree)
+    """
+    compiled = []
+    final_columns = list(schema)
+    for step in steps:
+        expr = compile_formula(step.formula, page="codegen").expr
+        if step.action == "Add column":
+            compiled.append((step, expr.alias(step.column), set(expr.meta.root_names())))
+            if step.column not in final_columns:
+                final_columns.append(step.column)
+        else:
+            compiled.append((step, expr, set(expr.meta.root_names())))
+    output_columns = list(output_columns or final_columns)
+
+    # Walk back from the outputs, keeping the steps whose column is used
+    needed = set(output_columns)
+    kept = []
+    for step, expr, roots in reversed(compiled):
+        if step.action == "Add column":
+            if step.column not in needed:
+                continue
+            needed.discard(step.column)
+        needed |= roots
+        kept.append((step, expr, roots))
+    kept.reverse()
+    source_columns = [name for name in schema if name in needed]
+
+    # Steps that do not use each other's columns go in one with_columns
+    stages = []
+    batch, batch_columns = [], set()
+    for step, expr, roots in kept:
+        if batch and (step.action != "Add column" or roots & batch_columns or step.column in batch_columns):
+            stages.append(("with_columns", batch))
+            batch, batch_columns = [], set()
+        if step.action == "Add column":
+            batch.append(_tree(expr))
+            batch_columns.add(step.column)
+        else:
+            stages.append(("filter", _tree(expr)))
+    if batch:
+        stages.append(("with_columns", batch))
+    return source_columns, stages, output_columns
+
+
+def _collect_call():
+    # The streaming engine is selected with engine= from Polars 1.25
+    major, minor = (int(part) for part in pl.__version__.split(".")[:2])
+    return 'collect(engine="streaming")' if (major, minor) >= (1, 25) else "collect(streaming=True)"
+
+
+def generate_module(steps, source, schema=None, output_columns=None):
+    """
+    Write a recipe as a standalone Python module.
+
+    Args:
+        steps: RecipeStep, or (action, formula, column) tuples, in order
+        source: Path of the data the pipeline reads by default
+        schema: Schema of the source, read from the source when not given
+        output_columns: Columns of the result, every column by default
+
+    Returns:
+        str: The module source
+
+    Raises:
+        ValueError: If the source has no known file extension
+    """
+    extension = os.path.splitext(source)[1].lower()
+    if extension not in scan_functions:
+        raise ValueError(f"Cannot read {source}, expected one of {', '.join(scan_functions)}")
+    scan = scan_functions[extension]
+    steps = [step if isinstance(step, RecipeStep) else RecipeStep(*step) for step in steps]
+    if schema is None:
+        schema = getattr(pl, scan)(source).collect_schema()
+
+    source_columns, stages, output_columns = plan_pipeline(steps, schema, output_columns)
+
+    writer = _Writer()
+    lines = [f"        pl.{scan}(source)", f"        .select({source_columns!r})"]
+    helpers = 0
+    for kind, trees in stages:
+        hoisted, trees = hoist_common_subexpressions(trees if kind == "with_columns" else [trees], helpers)
+        helpers += len(hoisted)
+        for stage, stage_trees in (("with_columns", hoisted), (kind, trees)):
+            if not stage_trees:
+                continue
+            lines.append(f"        .{stage}(")
+            lines += [f"            {write_expression(writer, tree)}," for tree in stage_trees]
+            lines.append("        )")
+    lines.append(f"        .select({output_columns!r})")
+
+    recipe = "\n".join(
+        f"    {i}. {step.action}{' ' + step.column if step.column else ''}: {step.formula}"
+        for i, step in enumerate(steps, start=1))
+    header = [
+        '"""',
+        "Generated by the Polars Expression Transformer demo from this recipe:",
+        "",
+        recipe,
+        "",
+        "Run it with: python <this file> [source]",
+        '"""',
+    ]
+    imports = ["import sys", "", "import polars as pl"]
+    blobs = []
+    if writer.blobs:
+        relocated = []
+        for name, text in writer.blobs:
+            tree = json.loads(text)
+            plugin = _relocate_plugins(tree)
+            relocated.append((name, json.dumps(tree), plugin))
+        plugins = any(plugin for _, _, plugin in relocated)
+        imports = (["import importlib.util", "import io", "import json", "import os", "import sys"] if plugins
+                   else ["import io", "import sys"]) + ["", "import polars as pl"]
+        blobs = [
+            *(["", "", *_PLUGIN_LOADER.strip("\n").split("\n"), ""] if plugins else []),
+            "",
+            f"# Serialized with Polars {pl.__version__}, other versions may not read them",
+            *[f"{name} = _deserialize({text!r})" if plugin
+              else f"{name} = pl.Expr.deserialize(io.StringIO({text!r}), format=\"json\")"
+              for name, text, plugin in relocated],
+        ]
+    body = [
+        "",
+        f"SOURCE = {source!r}",
+        *blobs,
+        "",
+        "",
+        "def build_query(source=SOURCE):",
+        '    """The lazy pipeline, nothing is read until it is collected"""',
+        "    return (",
+        *lines,
+        "    )",
+        "",
+        "",
+        "def run(source=SOURCE):",
+        f"    return build_query(source).{_collect_call()}",
+        "",
+        "",
+        'if __name__ == "__main__":',
+        "    print(run(*sys.argv[1:2]))",
+        "",
+    ]
+    return "\n".join(header + imports + body)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a recipe as a standalone Polars module")
+    parser.add_argument("manifest", help="manifest.json of a session snapshot")
+    parser.add_argument("--source", required=True, help="Data the pipeline reads by default")
+    parser.add_argument("--column", dest="columns", action="append", default=None,
+                        help="Column of the result, can be repeated. Every column by default")
+    parser.add_argument("--output", help="File to write the module to, printed when not given")
+    args = parser.parse_args()
+
+    with open(args.manifest) as f:
+        manifest = json.load(f)
+    recipe = [(step["action"], step["formula"], step["column"]) for step in manifest["steps"][:manifest["version"]]]
+    module = generate_module(recipe, args.source, output_columns=args.columns)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(module)
+    else:
+        print(module)
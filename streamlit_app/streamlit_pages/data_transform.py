@@ -1,20 +1,46 @@
 import streamlit as st
 import polars as pl
 import os
-import pandas as pd
-from polars_expr_transformer.process.polars_expr_transformer import simple_function_to_expr, build_func
+
+from streamlit_pages.codegen import generate_module
+from streamlit_pages.dictionary_encoding import encode_low_cardinality
+from streamlit_pages.display import show_dataframe
+from streamlit_pages.evaluation import evaluate, evaluate_many
+from streamlit_pages.formula_engine import (
+    compile_formula, compile_predicate, aggregate_formula, aggregations, collect_streaming
+)
+from streamlit_pages.instrumentation import timed, increment
+from streamlit_pages.live_evaluation import LiveEvaluation, SAMPLE_ROWS, POLL_SECONDS
+from streamlit_pages.parsed_columns import ParsedColumns, use_parsed_columns
+from streamlit_pages.session_memory import mark_cached, touch, ensure_capacity
+from streamlit_pages.session_snapshot import TOKEN_PARAM, load_snapshot, save_snapshot, new_token, prune_snapshots
+from streamlit_pages.transform_history import TransformationHistory
+
+PAGE = "data_transform"
+
+# Rows of the side-by-side variant outputs sent to the browser
+VARIANT_PREVIEW_ROWS = 100
+
+# Groups of an aggregation sent to the browser
+GROUP_PREVIEW_ROWS = 1000
+
+# Source read by exported pipelines unless another file is given
+EXPORT_SOURCE = "sample_data.csv"
 
 
 def load_sample_data():
-    """Load sample data from CSV or create a sample DataFrame if the file doesn't exist"""
+    """
+    Load sample data from CSV or create a sample DataFrame if the file doesn't exist.
+
+    Text columns with few distinct values are dictionary encoded.
+    """
     data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
     file_path = os.path.join(data_dir, 'sample_data.csv')
 
     try:
         if os.path.exists(file_path):
             df = pl.read_csv(file_path)
-            # Convert directly to pandas for safer Streamlit handling
-            return df
+            return encode_low_cardinality(df)
         else:
             # Create a sample DataFrame if the file doesn't exist
             df = pl.DataFrame({
@@ -26,7 +52,7 @@ def load_sample_data():
                 "purchase_date": ["2023-01-15", "2023-01-20", "2023-02-05", "2023-02-12", "2023-03-01"],
                 "is_member": [True, False, True, True, False]
             })
-            return df
+            return encode_low_cardinality(df)
     except Exception as e:
         st.error(f"Error loading data: {e}")
         return pl.DataFrame()
@@ -37,16 +63,27 @@ def show_data_transform_page():
     st.header("Data Transformer")
     st.write("Apply Polars Expression Transformer to real-world data.")
 
-    # Load the data - store both Polars and Pandas versions
-    if 'df_original_polars' not in st.session_state:
-        st.session_state.df_original_polars = load_sample_data()
-        # Keep a pandas copy for display
-        st.session_state.df_original_pandas = st.session_state.df_original_polars.to_pandas()
+    # Every applied formula is a step in the history, the current version is the data shown.
+    # A reconnecting session gets its history back from the snapshot named in the URL.
+    if 'transform_history' not in st.session_state:
+        token = st.query_params.get(TOKEN_PARAM)
+        history = load_snapshot(token, page=PAGE) if token else None
+        if history is not None:
+            st.session_state.df_original_polars = history.base
+            st.session_state.snapshot_revision = history.revision
+            st.toast(f"Restored {len(history.steps)} steps from your previous session")
+        else:
+            if 'df_original_polars' not in st.session_state:
+                st.session_state.df_original_polars = load_sample_data()
+            history = TransformationHistory(st.session_state.df_original_polars)
+        st.session_state.transform_history = history
+    history = st.session_state.transform_history
 
-    # Use session state to keep track of the DataFrame
-    if 'df_transformed_polars' not in st.session_state:
-        st.session_state.df_transformed_polars = st.session_state.df_original_polars.clone()
-        st.session_state.df_transformed_pandas = st.session_state.df_transformed_polars.to_pandas()
+    # Derive a new column, keep the rows for which a boolean formula is true, or summarize per group
+    mode = st.radio("Mode", ["Add column", "Filter rows", "Aggregate"], horizontal=True, key="transform_mode")
+    filter_mode = mode == "Filter rows"
+    aggregate_mode = mode == "Aggregate"
+    group_keys, aggregation = [], None
 
     # Simple expression input
     col1, col2 = st.columns([3, 1])
@@ -62,61 +99,354 @@ def show_data_transform_page():
         col_name = st.text_input(
             "Output Column",
             value="result",
-            help="Name for the output column"
+            help="Name for the output column",
+            disabled=filter_mode
         )
 
+    if aggregate_mode:
+        columns = history.current.columns
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            group_keys = st.multiselect(
+                "Group by",
+                options=columns,
+                default=["city"] if "city" in columns else None,
+                key="group_keys"
+            )
+        with col2:
+            aggregation = st.selectbox("Aggregation", options=list(aggregations), key="aggregation")
+
+    live_mode = st.checkbox(
+        "Live preview",
+        key="live_preview",
+        help=f"Check the expression after every change and preview it on the first {SAMPLE_ROWS} rows. "
+             "All rows are evaluated once the expression stops changing, Calculate still applies it."
+    )
+    if live_mode:
+        show_live_preview(mode, expression, col_name, group_keys, aggregation)
+
     # Calculate button
     if st.button("Calculate", key="calculate_btn"):
+        increment("calculate", PAGE)
         try:
-            # Create a fresh clone of the DataFrame to avoid mutable borrowing issues
-            df_clone = st.session_state.df_transformed_polars.clone()
+            # The current version itself, results computed on it before are reused
+            df = history.current
+
+            if aggregate_mode:
+                if not group_keys:
+                    raise ValueError("Select at least one column to group by")
+                compiled, grouped = aggregate_formula(df.lazy(), group_keys, expression, aggregation,
+                                                      col_name, readable=True, page=PAGE)
+
+                # Runs in Polars' parallel hash aggregation, the data itself is left unchanged
+                with timed("execute", PAGE):
+                    result_polars = collect_streaming(grouped)
+                st.info(f"{result_polars.height:,} groups from {df.height:,} rows")
+                show_dataframe(result_polars.head(GROUP_PREVIEW_ROWS), page=PAGE)
+
+                st.code(
+                    "#Polars code \nexpression = " + compiled.readable + "\ndf.group_by(" + repr(group_keys) + ").agg("
+                    "expression." + aggregation + "().alias('" + col_name + "'))",
+                    language="python")
+            elif filter_mode:
+                compiled = compile_predicate(expression, df.schema, readable=True, page=PAGE)
+                expr, frame = use_parsed_columns(compiled.expr, df, history, parsed_columns(), page=PAGE)
+
+                with timed("execute", PAGE):
+                    result_polars = frame.lazy().filter(expr).select(df.columns).collect()
+
+                # The kept rows are a new frame, refused like a new column when over the memory budget
+                ensure_capacity(result_polars.estimated_size())
+
+                history.filter_rows(expression, result_polars)
+                st.info(f"Kept {result_polars.height:,} of {df.height:,} rows")
 
-            # Apply the expression and add as a new column
-            expr_obj = simple_function_to_expr(expression)
-            result_polars = df_clone.with_columns(expr_obj.alias(col_name))
+                st.code("#Polars code \nexpression = " + compiled.readable + "\ndf.filter(expression)",
+                        language="python")
+            else:
+                # Parse once, and get both the expression and the Polars code for display
+                compiled = compile_formula(expression, readable=True, page=PAGE, schema=df.schema)
 
-            # Get the Polars code for display
-            func_obj = build_func(expression)
-            func_obj.get_pl_func()  # Validate the expression
-            polars_expr = func_obj.get_readable_pl_function()
+                # Evaluated once per version, the live preview or a comparison may have done so already.
+                # Dates parsed from text by an earlier formula are not parsed again.
+                result = evaluate(df, compiled, page=PAGE, prepare=parsed_column_reader(history))
 
-            # Update both the Polars and Pandas versions
-            st.session_state.df_transformed_polars = result_polars
-            st.session_state.df_transformed_pandas = result_polars.to_pandas()
+                # Refuse results that do not fit in the session's memory budget
+                ensure_capacity(result.estimated_size())
 
-            # Show the equivalent Polars code
-            st.code(
-                "#Polars code \nexpression = " + polars_expr + "\ndf.with_columns(expression.alias('" + col_name + "'))",
-                language="python")
+                # Only the new column is kept in the history, sharing its buffers with the result
+                history.add_column(expression, col_name, result.series.alias(col_name))
+
+                # Show the equivalent Polars code
+                st.code(
+                    "#Polars code \nexpression = " + compiled.readable + "\ndf.with_columns(expression.alias('" + col_name + "'))",
+                    language="python")
 
         except Exception as e:
+            increment("error", PAGE)
             st.error(f"Error applying expression: {str(e)}")
 
-    # Display the current data using Pandas DataFrame (safer for Streamlit)
-    st.dataframe(st.session_state.df_transformed_pandas)
+    # Display the current data, sent to the browser as Arrow without a pandas copy
+    show_dataframe(history.current, page=PAGE)
+
+    show_history(history)
+    persist_history(history)
+
+    show_variant_comparison()
+
+
+def parsed_columns():
+    """The session's parsed date columns, evicted like the other cached results"""
+    if 'parsed_columns' not in st.session_state:
+        st.session_state.parsed_columns = ParsedColumns()
+        mark_cached('parsed_columns')
+    else:
+        touch('parsed_columns')
+    return st.session_state.parsed_columns
+
+
+def parsed_column_reader(history):
+    """The ``prepare`` of ``evaluate`` that reads dates parsed by earlier formulas from the parsed columns"""
+    cache = parsed_columns()
+    return lambda expr, frame: use_parsed_columns(expr, frame, history, cache, page=PAGE)
+
+
+def persist_history(history):
+    """Save a snapshot of the history if it changed since the last one, creating the session token on first use"""
+    if st.session_state.get('snapshot_revision', 0) == history.revision:
+        return
+    try:
+        token = st.query_params.get(TOKEN_PARAM)
+        if not token:
+            prune_snapshots()
+            token = new_token()
+        save_snapshot(history, token, page=PAGE)
+        st.query_params[TOKEN_PARAM] = token
+        st.session_state.snapshot_revision = history.revision
+    except Exception as e:
+        increment("error", PAGE)
+        st.warning(f"Could not save a snapshot of the session: {str(e)}")
+
+
+def show_history(history):
+    """Show the undo, redo and reset buttons and the list of applied steps"""
+    col1, col2, col3, _ = st.columns([1, 1, 1, 3])
+    with col1:
+        if st.button("Undo", key="undo_btn", disabled=not history.can_undo, use_container_width=True):
+            history.undo()
+            st.rerun()
+    with col2:
+        if st.button("Redo", key="redo_btn", disabled=not history.can_redo, use_container_width=True):
+            history.redo()
+            st.rerun()
+    with col3:
+        # Back to the original data, the steps stay available to redo
+        if st.button("Reset Data", key="reset_btn", disabled=not history.can_undo, use_container_width=True):
+            history.goto(0)
+            st.rerun()
+
+    if history.steps:
+        with st.expander(f"History ({history.version} of {len(history.steps)} steps applied)"):
+            show_dataframe(pl.DataFrame({
+                "step": range(1, len(history.steps) + 1),
+                "applied": [i < history.version for i in range(len(history.steps))],
+                "action": [step.action for step in history.steps],
+                "formula": [step.formula for step in history.steps],
+                "column": [step.column for step in history.steps],
+                "rows": [step.frame.height for step in history.steps],
+            }, schema_overrides={"column": pl.String}), page=PAGE, hide_index=True)
+
+            # Follow undo and redo, the callback runs before the page so it shows the chosen version
+            st.session_state.history_version = history.version
+            st.selectbox(
+                "Go to step",
+                options=range(len(history.steps) + 1),
+                format_func=lambda v: f"{v}: {history.steps[v - 1].action} {history.steps[v - 1].formula}"
+                if v else "0: Original data",
+                key="history_version",
+                on_change=lambda: history.goto(st.session_state.history_version)
+            )
+
+            if history.version:
+                show_export(history)
+
+
+def show_export(history):
+    """Offer the applied steps as a standalone Polars module"""
+    try:
+        with timed("codegen", PAGE):
+            module = generate_module(
+                [(step.action, step.formula, step.column) for step in history.steps[:history.version]],
+                EXPORT_SOURCE, schema=history.base.schema)
+    except Exception as e:
+        increment("error", PAGE)
+        st.error(f"Error exporting the steps: {str(e)}")
+        return
+    st.download_button("Export as Python", data=module, file_name="pipeline.py", mime="text/x-python",
+                       key="export_btn", help="One lazy Polars pipeline that runs without the formula parser")
+    if st.toggle("Show exported code", key="show_export"):
+        st.code(module, language="python")
+
+
+def live_query(mode, expression, col_name, group_keys, aggregation, schema):
+    """
+    Compile the expression for the selected mode.
+
+    Returns:
+        callable: Applies the expression to a LazyFrame the way Calculate does, without collecting it
+    """
+    if mode == "Aggregate":
+        if not group_keys:
+            raise ValueError("Select at least one column to group by")
+        # Compile once, so a parse error is raised here rather than when the query runs
+        aggregate_formula(pl.LazyFrame(schema=schema), group_keys, expression, aggregation, col_name, page=PAGE)
+        return lambda lazy: aggregate_formula(lazy, group_keys, expression, aggregation, col_name, page=PAGE)[1]
+    if mode == "Filter rows":
+        predicate = compile_predicate(expression, schema, page=PAGE).expr
+        return lambda lazy: lazy.filter(predicate)
+    expr = compile_formula(expression, page=PAGE, schema=schema).expr.alias(col_name)
+    return lambda lazy: lazy.with_columns(expr)
+
+
+def show_live_preview(mode, expression, col_name, group_keys, aggregation):
+    """
+    Show the live evaluation of the expression below the inputs.
+
+    Every change is parsed and run on a sample at once. The preview then polls as a
+    fragment, so waiting for the evaluation on all rows does not rerun the page.
+    """
+    if 'live_evaluation' not in st.session_state:
+        st.session_state.live_evaluation = LiveEvaluation(PAGE)
+    live = st.session_state.live_evaluation
+    history = st.session_state.transform_history
+    df = history.current
+    full = None
+    if mode == "Add column":
+        # All rows through the shared results, so Calculate afterwards does not evaluate again
+        prepare = parsed_column_reader(history)
+
+        def full():
+            compiled = compile_formula(expression, page=PAGE, schema=df.schema)
+            return df.with_columns(evaluate(df, compiled, page=PAGE, prepare=prepare).series.alias(col_name))
+    live.update((mode, expression, col_name, tuple(group_keys), aggregation), df,
+                lambda: live_query(mode, expression, col_name, group_keys, aggregation, df.schema), full)
+
+    polling = not live.poll()
+    st.fragment(_live_preview, run_every=POLL_SECONDS if polling else None)(live, polling)
 
-    # Reset button
-    if st.button("Reset Data"):
-        # Make a fresh clone from the original data
-        st.session_state.df_transformed_polars = st.session_state.df_original_polars.clone()
-        st.session_state.df_transformed_pandas = st.session_state.df_transformed_polars.to_pandas()
-        st.experimental_rerun()  # Use experimental_rerun for more consistent behavior
 
+def _live_preview(live, polling):
+    complete = live.poll()
+    if live.error is not None:
+        st.error(f"Error applying expression: {live.error}")
+    elif live.result is not None:
+        st.caption(f"Live preview, {live.result_rows:,} rows")
+        show_dataframe(live.result, page=PAGE)
+    elif live.sample is not None:
+        st.caption(f"Live preview of the first {SAMPLE_ROWS} rows, all rows are evaluated once you stop typing")
+        show_dataframe(live.sample, page=PAGE)
+    if complete and polling:
+        # Rerun the page once to stop the polling
+        st.rerun()
+
+
+def compare_variants(df, formulas, prepare=None):
+    """
+    Evaluate several variants of a formula in a single pass over the DataFrame.
+
+    Every formula is compiled once. Variants evaluated on ``df`` before, by
+    Calculate, the live preview or an earlier comparison, are reused, the others
+    are evaluated together, so Polars scans the data once no matter how many
+    variants there are.
+
+    Args:
+        df: The Polars DataFrame to evaluate the variants on
+        formulas: List of formula strings, the first one is the baseline
+        prepare: Passed on to ``evaluate_many``
+
+    Returns:
+        tuple: (DataFrame with one column per variant, DataFrame with one summary row per variant)
+    """
+    compiled = [compile_formula(formula, page=PAGE, schema=df.schema) for formula in formulas]
+    names = [f"variant_{i + 1}" for i in range(len(compiled))]
+
+    shared = evaluate_many(df, compiled, page=PAGE, prepare=prepare)
+    results = pl.DataFrame([result.series.alias(name) for result, name in zip(shared, names)])
+
+    # Aggregate diffs against the baseline, computed in one pass over the (narrow) result
+    baseline = pl.col(names[0])
+    aggregations = []
+    for name in names:
+        column = pl.col(name)
+        if results.schema[name] == results.schema[names[0]]:
+            differs = column.ne_missing(baseline)
+        else:
+            # Variants of another type are compared on their text representation
+            differs = column.cast(pl.String).ne_missing(baseline.cast(pl.String))
+        aggregations += [
+            column.null_count().alias(f"{name}|nulls"),
+            column.n_unique().alias(f"{name}|distinct"),
+            differs.sum().alias(f"{name}|differs_from_baseline"),
+        ]
+        if results.schema[name].is_numeric() or results.schema[name] == pl.Boolean:
+            aggregations.append(column.cast(pl.Float64).mean().alias(f"{name}|mean"))
+    with timed("execute", PAGE):
+        stats = results.select(aggregations).row(0, named=True)
+
+    summary = pl.DataFrame([
+        {
+            "variant": name,
+            "formula": formula,
+            "dtype": str(results.schema[name]),
+            "nulls": stats[f"{name}|nulls"],
+            "distinct": stats[f"{name}|distinct"],
+            "differs_from_baseline": stats[f"{name}|differs_from_baseline"],
+            "mean": stats.get(f"{name}|mean"),
+        }
+        for name, formula in zip(names, formulas)
+    ])
+    return results, summary
+
+
+def show_variant_comparison():
+    """Show the what-if comparison of several formula variants"""
+    st.subheader("Compare Formula Variants")
+    st.write("Enter one formula per line. All variants are evaluated together and compared to the first one.")
+
+    variants_text = st.text_area(
+        "Variants",
+        value="if [purchase_amount] > 100 then 'High' else 'Standard' endif\n"
+              "if [purchase_amount] > 150 then 'High' else 'Standard' endif\n"
+              "if [purchase_amount] > 200 then 'High' else 'Standard' endif",
+        height=120,
+        key="variant_formulas"
+    )
+
+    if st.button("Compare", key="compare_btn"):
+        increment("compare", PAGE)
+        formulas = [line.strip() for line in variants_text.splitlines() if line.strip()]
+        try:
+            history = st.session_state.transform_history
+            df = history.current
+            results, summary = compare_variants(df, formulas, parsed_column_reader(history))
+            st.session_state.variant_summary = summary
+            st.session_state.variant_preview = pl.concat(
+                [df.head(VARIANT_PREVIEW_ROWS),
+                 results.head(VARIANT_PREVIEW_ROWS)],
+                how="horizontal"
+            )
+            mark_cached('variant_summary', 'variant_preview')
+        except Exception as e:
+            increment("error", PAGE)
+            st.error(f"Error comparing variants: {str(e)}")
 
-def initialize_session_state():
-    """Initialize the session state variables if they don't exist"""
-    if 'df_original_polars' not in st.session_state:
-        st.session_state.df_original_polars = None
-    if 'df_original_pandas' not in st.session_state:
-        st.session_state.df_original_pandas = None
-    if 'df_transformed_polars' not in st.session_state:
-        st.session_state.df_transformed_polars = None
-    if 'df_transformed_pandas' not in st.session_state:
-        st.session_state.df_transformed_pandas = None
+    if 'variant_summary' in st.session_state and 'variant_preview' in st.session_state:
+        touch('variant_summary', 'variant_preview')
+        show_dataframe(st.session_state.variant_summary, page=PAGE, hide_index=True)
+        show_dataframe(st.session_state.variant_preview, page=PAGE)
 
 
 if __name__ == "__main__":
     # This allows running this page directly for development
     st.set_page_config(page_title="Data Transformer", layout="wide")
-    initialize_session_state()
     show_data_transform_page()
\ No newline at end of file
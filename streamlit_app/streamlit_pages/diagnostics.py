@@ -0,0 +1,63 @@
+import sys
+
+import streamlit as st
+
+from streamlit_pages.instrumentation import get_stage_metrics, get_counters, reset_metrics
+from streamlit_pages.warmup import get_warmup_status
+from streamlit_pages.session_memory import (
+    session_memory_usage, get_session_budget, get_global_budget, get_global_memory_usage
+)
+
+
+def show_diagnostics_panel():
+    """Show where time went per stage and page, for every session of this server process"""
+    warmup = get_warmup_status()
+    if warmup["state"] == "running":
+        st.caption(f"Warm-up running: {warmup['compiled']} formulas compiled")
+    elif warmup["state"] == "done":
+        st.caption(f"Warm-up done in {warmup['seconds']:.1f} s: {warmup['compiled']} formulas compiled, "
+                   f"{warmup['executed']} executed, {warmup['failed']} failed")
+    elif warmup["state"] == "failed":
+        st.caption(f"Warm-up failed: {warmup['error']}")
+
+    stages = get_stage_metrics()
+    if not stages:
+        st.caption("No timings recorded yet. Run a Calculate, Visualize or Try it.")
+    else:
+        st.dataframe(
+            [{k: round(v, 2) if isinstance(v, float) else v for k, v in row.items()} for row in stages],
+            hide_index=True,
+            use_container_width=True
+        )
+
+    counters = get_counters()
+    if counters:
+        st.dataframe(counters, hide_index=True, use_container_width=True)
+
+    if st.button("Reset timings", key="reset_diagnostics"):
+        reset_metrics()
+        st.rerun()
+
+
+def show_memory_panel(evicted=()):
+    """Show the memory held by this session next to the session and server budgets"""
+    usage = session_memory_usage()
+    total = sum(usage.values())
+    budget = get_session_budget()
+
+    st.progress(min(total / budget, 1.0), text=f"Session: {total / 2 ** 20:.1f} MB of {budget / 2 ** 20:.0f} MB")
+    st.caption(f"Server: {get_global_memory_usage() / 2 ** 20:.1f} MB of {get_global_budget() / 2 ** 20:.0f} MB")
+    # Only once a page evaluated a formula, so that the panel does not import Polars at startup
+    evaluation = sys.modules.get("streamlit_pages.evaluation")
+    if evaluation is not None:
+        st.caption(f"Shared results: {evaluation.get_result_cache_usage() / 2 ** 20:.1f} MB of "
+                   f"{evaluation.get_result_cache_budget() / 2 ** 20:.0f} MB")
+    if evicted:
+        st.caption(f"Evicted to stay within budget: {', '.join(evicted)}")
+
+    largest = sorted(usage.items(), key=lambda item: item[1], reverse=True)[:10]
+    st.dataframe(
+        [{"key": key, "MB": round(size / 2 ** 20, 3)} for key, size in largest],
+        hide_index=True,
+        use_container_width=True
+    )
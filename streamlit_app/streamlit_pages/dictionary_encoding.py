@@ -0,0 +1,184 @@
+"""
+Dictionary encoding of text columns with few distinct values.
+
+Columns like ``city`` repeat a handful of values on every row. Loaders store them
+as ``pl.Enum``: the distinct values once, and a small integer code per row.
+
+Formulas are written for text, and most string functions refuse an Enum, so
+``on_dictionary`` adapts a built expression to the schema it runs on. Every part
+of the formula that depends on a single encoded column, like
+``contains([city], 'o')``, is evaluated once on the distinct values and picked
+per row by code. Other uses of an encoded column read it as text.
+"""
+import io
+import json
+
+import polars as pl
+
+# Text columns with at most this many distinct values are encoded
+MAX_CATEGORIES = 1000
+
+# and at most this many distinct values per row, so small frames stay as they are
+MAX_CATEGORY_RATIO = 0.5
+
+# Comparisons Polars evaluates on the codes of an Enum
+_CODE_COMPARISONS = {"Eq", "NotEq", "EqValidity", "NotEqValidity"}
+
+# Functions Polars answers from the validity of any column
+_NULL_CHECKS = [{"Boolean": "IsNull"}, {"Boolean": "IsNotNull"}]
+
+# Children of the expressions that are evaluated row by row
+_ROW_CHILDREN = {
+    "Column": lambda node: [],
+    "Literal": lambda node: [],
+    "BinaryExpr": lambda node: [node["left"], node["right"]],
+    "Ternary": lambda node: [node["predicate"], node["truthy"], node["falsy"]],
+    "Cast": lambda node: [node["expr"]],
+    "Function": lambda node: node["input"],
+}
+
+
+def encode_low_cardinality(df, max_categories=MAX_CATEGORIES, max_ratio=MAX_CATEGORY_RATIO):
+    """
+    Store the text columns of ``df`` with few distinct values as ``pl.Enum``.
+
+    Args:
+        df: The loaded Polars DataFrame
+        max_categories: Most distinct values of an encoded column
+        max_ratio: Most distinct values per row of an encoded column
+
+    Returns:
+        pl.DataFrame: ``df`` with its low cardinality text columns encoded
+    """
+    text_columns = [name for name, dtype in df.schema.items() if dtype == pl.String]
+    if not text_columns or df.height == 0:
+        return df
+    counts = df.select(pl.col(text_columns).drop_nulls().n_unique()).row(0, named=True)
+    encoded = [name for name in text_columns
+               if counts[name] <= max_categories and counts[name] <= max_ratio * df.height]
+    return df.with_columns(
+        pl.col(name).cast(pl.Enum(df.get_column(name).drop_nulls().unique().sort())) for name in encoded
+    )
+
+
+def _tree(expr):
+    return json.loads(expr.meta.serialize(format="json"))
+
+
+def _expr(tree):
+    return pl.Expr.deserialize(io.StringIO(json.dumps(tree)), format="json")
+
+
+def _kind(tree):
+    return next(iter(tree)) if isinstance(tree, dict) and len(tree) == 1 else None
+
+
+def _row_columns(tree):
+    """Columns a row-by-row expression reads, or None if it is not evaluated row by row"""
+    kind = _kind(tree)
+    if kind not in _ROW_CHILDREN:
+        return None
+    if kind == "Column":
+        return {tree["Column"]}
+    if kind == "Function" and tree["Function"]["options"]["collect_groups"] != "ElementWise":
+        return None
+    columns = set()
+    for child in _ROW_CHILDREN[kind](tree[kind]):
+        child_columns = _row_columns(child)
+        if child_columns is None:
+            return None
+        columns |= child_columns
+    return columns
+
+
+def _lookup(tree, column, categories):
+    """
+    Evaluate ``tree`` on the distinct values of ``column`` and pick the results by code.
+
+    Returns:
+        dict: The tree of the lookup, or None if the expression fails on the distinct values
+    """
+    dictionary = pl.DataFrame({column: pl.Series(categories + [None], dtype=pl.String)})
+    try:
+        values = dictionary.select(_expr(tree)).to_series()
+    except Exception:
+        # Possibly on a value no row has anymore, the rows decide whether the formula fails
+        return None
+    if len(values) != dictionary.height:
+        return None
+    # Null rows have no code and gather null, which is right unless the formula turns null into a value
+    lookup = pl.lit(values.head(len(categories))).gather(pl.col(column).to_physical())
+    if values[-1] is not None:
+        lookup = pl.when(pl.col(column).is_null()).then(pl.lit(values.tail(1)).first()).otherwise(lookup)
+    return _tree(lookup)
+
+
+def _native(tree, encoded):
+    """Whether Polars evaluates ``tree`` on an encoded column as fast as on its codes"""
+    function = tree.get("Function")
+    if function is not None:
+        return function["function"] in _NULL_CHECKS and _kind(function["input"][0]) == "Column"
+    comparison = tree.get("BinaryExpr")
+    if comparison is None or comparison["op"] not in _CODE_COMPARISONS:
+        return False
+    for column, literal in ((comparison["left"], comparison["right"]), (comparison["right"], comparison["left"])):
+        if _kind(column) == "Column" and column["Column"] in encoded and _kind(literal) == "Literal":
+            value = literal["Literal"]
+            return isinstance(value, dict) and value.get("String") in encoded[column["Column"]]
+    return False
+
+
+def _rewrite(tree, encoded, text_columns, grouped, used):
+    if isinstance(tree, list):
+        return [_rewrite(value, encoded, text_columns, grouped, used) for value in tree]
+    if not isinstance(tree, dict):
+        return tree
+
+    kind = _kind(tree)
+    if kind in ("Function", "BinaryExpr") and _native(tree, encoded):
+        return tree
+    # The lookup gathers from all distinct values, which only lines up with the rows outside groups.
+    # Looking up the column itself is still faster than casting it to text.
+    if not grouped and kind in _ROW_CHILDREN:
+        columns = _row_columns(tree)
+        if columns is not None and len(columns) == 1 and next(iter(columns)) in encoded:
+            column = next(iter(columns))
+            lookup = _lookup(tree, column, encoded[column])
+            if lookup is not None:
+                used.add(column)
+                return lookup
+    if kind == "Column":
+        return _tree(pl.col(tree["Column"]).cast(pl.String)) if tree["Column"] in text_columns else tree
+
+    grouped = grouped or kind in ("Agg", "Window") or (
+        kind == "Function" and tree["Function"]["options"]["collect_groups"] != "ElementWise")
+    return {name: _rewrite(value, encoded, text_columns, grouped, used) for name, value in tree.items()}
+
+
+def on_dictionary(expr, schema):
+    """
+    Adapt ``expr`` to the dictionary encoded columns of ``schema``.
+
+    Args:
+        expr: A Polars expression built from a formula
+        schema: Schema of the frame the expression runs on
+
+    Returns:
+        tuple: (the expression, names of the columns evaluated on their distinct values),
+        the expression is returned as is when ``schema`` has no encoded column
+    """
+    encoded = {name: dtype.categories.to_list() for name, dtype in schema.items() if isinstance(dtype, pl.Enum)}
+    text_columns = {name for name, dtype in schema.items() if isinstance(dtype, (pl.Enum, pl.Categorical))}
+    if not text_columns:
+        return expr, []
+    used = set()
+    tree = _tree(expr)
+    rewritten = _rewrite(tree, encoded, text_columns, False, used)
+    if rewritten == tree:
+        return expr, []
+    result = _expr(rewritten)
+    try:
+        result = result.alias(expr.meta.output_name())
+    except pl.exceptions.ComputeError:
+        pass
+    return result, sorted(used)
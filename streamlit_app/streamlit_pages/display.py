@@ -0,0 +1,79 @@
+import polars as pl
+import pyarrow as pa
+import streamlit as st
+
+from streamlit_pages.instrumentation import timed
+
+
+def _display_type(arrow_type):
+    """
+    Arrow type Streamlit's frontend renders for ``arrow_type``.
+
+    Polars exports strings and lists with 64-bit offsets and categoricals with
+    unsigned indices, older Streamlit frontends only read the 32-bit and signed
+    variants. Nested types are mapped field by field.
+    """
+    if pa.types.is_large_string(arrow_type) or pa.types.is_string_view(arrow_type):
+        return pa.string()
+    if pa.types.is_large_binary(arrow_type) or pa.types.is_binary_view(arrow_type):
+        return pa.binary()
+    if pa.types.is_dictionary(arrow_type):
+        return pa.dictionary(pa.int32(), _display_type(arrow_type.value_type), arrow_type.ordered)
+    if pa.types.is_large_list(arrow_type) or pa.types.is_list_view(arrow_type) or pa.types.is_list(arrow_type):
+        return pa.list_(arrow_type.value_field.with_type(_display_type(arrow_type.value_type)))
+    if pa.types.is_fixed_size_list(arrow_type):
+        return pa.list_(arrow_type.value_field.with_type(_display_type(arrow_type.value_type)),
+                        arrow_type.list_size)
+    if pa.types.is_struct(arrow_type):
+        return pa.struct([field.with_type(_display_type(field.type)) for field in arrow_type])
+    return arrow_type
+
+
+def to_display_table(df):
+    """
+    Convert a Polars DataFrame to an Arrow table that ``st.dataframe`` can show as is.
+
+    The buffers are shared with Polars where the types already match, so unlike
+    ``to_pandas()`` no Python object is created per string. Columns whose 64-bit
+    offsets do not fit in 32 bits, over 2 GB of text, keep their large type.
+
+    Args:
+        df: The Polars DataFrame
+
+    Returns:
+        pa.Table: The table to pass to ``st.dataframe``
+    """
+    # Object columns hold arbitrary Python values that Arrow cannot represent
+    objects = [name for name, dtype in df.schema.items() if dtype == pl.Object]
+    if objects:
+        df = df.with_columns(pl.col(objects).map_elements(str, return_dtype=pl.String))
+
+    # Exporting borrows the frame mutably, a clone shares the buffers and leaves the
+    # caller's frame free for the live evaluation reading it on another thread
+    table = df.clone().to_arrow(compat_level=pl.CompatLevel.oldest())
+    for i, field in enumerate(table.schema):
+        display_type = _display_type(field.type)
+        if display_type != field.type:
+            try:
+                table = table.set_column(i, field.with_type(display_type), table.column(i).cast(display_type))
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                pass
+    return table
+
+
+def show_dataframe(df, page="", **kwargs):
+    """
+    Show a Polars DataFrame through Streamlit's Arrow serializer, without a pandas copy.
+
+    Args:
+        df: The Polars DataFrame, or an Arrow table returned by ``to_display_table``
+        page: Page name used to label the timings
+        **kwargs: Passed on to ``st.dataframe``
+    """
+    if isinstance(df, pa.Table):
+        table = df
+    else:
+        with timed("to_arrow", page):
+            table = to_display_table(df)
+    with timed("render", page):
+        st.dataframe(table, **kwargs)
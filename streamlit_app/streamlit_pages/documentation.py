@@ -1,26 +1,11 @@
+import textwrap
+from functools import lru_cache
+
 import streamlit as st
 
 
-def show_docs_page():
-    """Show the documentation page with syntax and usage patterns"""
-    st.header("Polars Expression Transformer Syntax Guide")
-    st.write(
-        "Learn how to write expressions with Polars Expression Transformer. For a complete list of available functions, see the Functions Overview tab.")
-
-    # Create tabs for different documentation sections
-    doc_tabs = st.tabs([
-        "Basic Syntax",
-        "Column References",
-        "Conditional Logic",
-        "Expression Examples",
-        "Best Practices"
-    ])
-
-    # Basic Syntax
-    with doc_tabs[0]:
-        st.subheader("Basic Syntax")
-
-        st.markdown("""
+doc_sections = {
+    "Basic Syntax": """
         ## Introduction
 
         Polars Expression Transformer allows you to write expressions as strings that will be converted to Polars expressions.
@@ -35,7 +20,7 @@ def show_docs_page():
         ```
 
         For example:
-        ```
+        ```formula
         concat([first_name], " ", [last_name])
         ```
 
@@ -62,21 +47,16 @@ def show_docs_page():
 
         You can add comments to your expressions using `//`. Everything after `//` on a line is ignored.
 
-        ```
+        ```formula
         [price] * 0.9  // Apply 10% discount
         ```
-        """)
-
-    # Column References
-    with doc_tabs[1]:
-        st.subheader("Column References")
-
-        st.markdown("""
+        """,
+    "Column References": """
         ## Referencing Columns
 
         To reference a column in your DataFrame, use square brackets around the column name:
 
-        ```
+        ```formula
         [column_name]
         ```
 
@@ -104,7 +84,7 @@ def show_docs_page():
 
         Column references can be used anywhere in your expressions:
 
-        ```
+        ```formula
         // Arithmetic operations
         [price] * [quantity]
 
@@ -122,28 +102,23 @@ def show_docs_page():
 
         You can use the same column multiple times in an expression:
 
-        ```
+        ```formula
         // Calculate a discount based on quantity
         [price] - ([price] * 0.1 * [quantity])
         ```
-        """)
-
-    # Conditional Logic
-    with doc_tabs[2]:
-        st.subheader("Conditional Logic")
-
-        st.markdown("""
+        """,
+    "Conditional Logic": """
         ## If-Then-Else Statements
 
         You can use conditional logic with `if`, `then`, `else`, and `endif` keywords:
 
-        ```
+        ```formula
         if [condition] then [value_if_true] else [value_if_false] endif
         ```
 
         For example:
 
-        ```
+        ```formula
         if [age] >= 18 then "Adult" else "Minor" endif
         ```
 
@@ -151,7 +126,7 @@ def show_docs_page():
 
         For more complex conditions, you can use `elseif`:
 
-        ```
+        ```formula
         if [condition1] then
             [value1]
         elseif [condition2] then
@@ -165,7 +140,7 @@ def show_docs_page():
 
         For example:
 
-        ```
+        ```formula
         if [score] >= 90 then
             "A"
         elseif [score] >= 80 then
@@ -183,7 +158,7 @@ def show_docs_page():
 
         You can nest conditional statements:
 
-        ```
+        ```formula
         if [outer_condition] then
             if [inner_condition] then
                 [value1]
@@ -199,7 +174,7 @@ def show_docs_page():
 
         Use `and` and `or` to combine conditions:
 
-        ```
+        ```formula
         if [age] >= 18 and [has_id] == true then
             "Can enter"
         else
@@ -207,25 +182,75 @@ def show_docs_page():
         endif
         ```
 
-        ```
+        ```formula
         if [status] == "gold" or [lifetime_value] > 1000 then
             "Premium"
         else
             "Standard"
         endif
         ```
-        """)
+        """,
+    "Window Functions": """
+        ## Aggregates
+
+        Aggregate functions such as `sum`, `mean`, `median`, `smallest`, `largest`,
+        `count` and `n_unique` summarize a value over all rows. Combined with row values
+        the aggregate is repeated on every row:
+
+        ```formula
+        // Share of the total salary
+        [salary] / sum([salary])
+
+        // Difference with the average age
+        [age] - mean([age])
+        ```
+
+        ## Partitions with over
+
+        End a formula with `over` and one or more columns to compute it per group
+        of rows instead of over the whole table:
+
+        ```
+        [formula] over [column1], [column2]
+        ```
 
-    # Expression Examples
-    with doc_tabs[3]:
-        st.subheader("Expression Examples")
+        For example:
+
+        ```formula
+        // Share of the salary within the city
+        [salary] / sum([salary]) over [city]
+
+        // Top earner of every city
+        [salary] = largest([salary]) over [city]
+
+        // Number of people per city and age
+        count([name]) over [city], [age]
+        ```
+
+        ## Ranks, Running Totals and Neighbouring Rows
+
+        `rank`, `cum_sum`, `row_number`, `lag` and `lead` follow the order of the rows:
 
-        st.markdown("""
+        ```formula
+        // 1 for the lowest salary of each city
+        rank([salary]) over [city]
+
+        // Running total of salaries per city
+        cum_sum([salary]) over [city]
+
+        // Number the people of each city
+        row_number() over [city]
+
+        // Salary of the previous person in the same city
+        lag([salary], 1) over [city]
+        ```
+        """,
+    "Expression Examples": """
         ## Common Expression Patterns
 
         ### String Formatting
 
-        ```
+        ```formula
         // Combine first and last name
         concat([first_name], " ", [last_name])
 
@@ -238,7 +263,7 @@ def show_docs_page():
 
         ### Numeric Calculations
 
-        ```
+        ```formula
         // Calculate total price
         [quantity] * [price]
 
@@ -260,7 +285,7 @@ def show_docs_page():
 
         ### Classification
 
-        ```
+        ```formula
         // Age groups
         if [age] < 18 then
             "Minor"
@@ -282,7 +307,7 @@ def show_docs_page():
 
         ### Date Formatting and Calculations
 
-        ```
+        ```formula
         // Format date as Month Day, Year
         concat(to_string(month(to_date([purchase_date]))), " ", to_string(day(to_date([purchase_date]))), ", ", to_string(year(to_date([purchase_date]))))
         // Calculate days since purchase
@@ -291,20 +316,15 @@ def show_docs_page():
         // Calculate age from birth date
         year(today()) - year(to_date([birth_date]))
         ```
-        """)
-
-    # Best Practices
-    with doc_tabs[4]:
-        st.subheader("Best Practices")
-
-        st.markdown("""
+        """,
+    "Best Practices": """
         ## Tips for Writing Expressions
 
         ### 1. Use Parentheses for Clarity
 
         Even when not strictly required, parentheses can make your expressions easier to read and understand:
 
-        ```
+        ```formula
         // Less clear
         [price] * [quantity] + [shipping]
 
@@ -324,7 +344,7 @@ def show_docs_page():
 
         Use comments to explain complex logic:
 
-        ```
+        ```formula
         if [days_since_purchase] <= 30 then
             "Recent"  // Within last 30 days
         elseif [days_since_purchase] <= 90 then
@@ -338,7 +358,7 @@ def show_docs_page():
 
         Consider what happens with null values, zeros, or extreme values:
 
-        ```
+        ```formula
         // Check if a value is empty before using it
         if is_empty([discount]) then
             [price]
@@ -374,8 +394,41 @@ def show_docs_page():
         // Instead of "calculation"
         price_with_tax = [price] * 1.07
         ```
-        """)
+        """
+}
+
+
+@lru_cache(maxsize=1)
+def compile_docs_page():
+    """
+    Render the static documentation to markdown blobs, once per process.
+
+    Returns:
+        tuple: (intro markdown, tuple of (section title, section markdown))
+    """
+    intro = (
+        "## Polars Expression Transformer Syntax Guide\n\n"
+        "Learn how to write expressions with Polars Expression Transformer. "
+        "For a complete list of available functions, see the Functions Overview tab."
+    )
+    sections = tuple(
+        (section, f"### {section}\n" + textwrap.dedent(content).replace("```formula\n", "```\n"))
+        for section, content in doc_sections.items()
+    )
+    return intro, sections
+
+
+def show_docs_page():
+    """Show the documentation page with syntax and usage patterns"""
+    intro, sections = compile_docs_page()
+    st.markdown(intro)
+
+    # Create tabs for different documentation sections, each rendered with a single call
+    doc_tabs = st.tabs([section for section, _ in sections])
 
+    for tab, (_, content) in zip(doc_tabs, sections):
+        with tab:
+            st.markdown(content)
 
 if __name__ == "__main__":
     # This allows running this page directly for development
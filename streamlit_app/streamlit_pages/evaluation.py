@@ -0,0 +1,222 @@
+"""
+Results of formulas on a dataset, computed once and shared by every page.
+
+``evaluate`` takes a dataset, a Polars DataFrame that is never modified, and a
+compiled formula, and returns a ``SharedResult``: the formula's column, one value
+per row. The first call computes it, later calls for the same frame and formula,
+from any page or session, get the same object back. Pages keep a reference to
+the result rather than a copy; the Data Transformer adds the column to its data
+as it is, Polars shares the Arrow buffers with the new frame.
+
+The Tree Visualizer and the Examples page read the same ``sample_dataset``, so a
+formula tried in one and visualized in the other is evaluated once. In the Data
+Transformer a dataset is a version of the history: Calculate, the live preview
+and the variant comparison on the same version share their results.
+
+Results are kept while their frame is alive and evicted least recently used
+first when they take more than ``EXPR_DEMO_RESULT_CACHE_MB``. Results of formulas
+calling ``today()`` or ``now()`` are not kept.
+"""
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from functools import lru_cache
+
+import polars as pl
+
+from streamlit_pages.display import to_display_table
+from streamlit_pages.instrumentation import timed, increment
+from streamlit_pages.session_memory import estimate_size
+
+RESULT_CACHE_ENV = "EXPR_DEMO_RESULT_CACHE_MB"
+DEFAULT_RESULT_CACHE_MB = 256
+
+# Name of the result column, and prefix of the columns of results evaluated together
+RESULT_NAME = "result"
+
+# Reentrant, a frame collected while the lock is held forgets its results under it
+_lock = threading.RLock()
+_results = OrderedDict()
+_pending = {}
+
+
+@lru_cache(maxsize=None)
+def sample_dataset():
+    """The sample data of the Tree Visualizer and the Examples page, one frame per process"""
+    return pl.DataFrame({
+        "name": ["John Smith", "Jane Doe", "Robert Johnson", "Maria Garcia", "Wei Zhang"],
+        "age": [34, 42, 28, 55, 39],
+        "city": ["New York", "San Francisco", "Chicago", "Boston", "Seattle"],
+        "salary": [75000, 95000, 65000, 120000, 85000],
+        "joined_date": ["2020-03-15", "2019-07-22", "2021-01-05", "2018-05-30", "2020-11-11"]
+    })
+
+
+@lru_cache(maxsize=None)
+def sample_table():
+    """
+    ``sample_dataset`` as an Arrow table for ``st.dataframe``, converted once per process.
+
+    The pages show this table rather than the frame: converting a frame to Arrow
+    borrows it mutably, which fails when another session does the same at once.
+    """
+    return to_display_table(sample_dataset().clone())
+
+
+class SharedResult:
+    """
+    The column a formula computes on a dataset, shared by every page that uses it.
+
+    Attributes:
+        series: The result, one value per row of the dataset, named "result"
+    """
+    __slots__ = ("series", "_table")
+
+    def __init__(self, series):
+        self.series = series
+        self._table = None
+
+    @property
+    def table(self):
+        """The result as an Arrow table for ``st.dataframe``, converted on first use"""
+        if self._table is None:
+            self._table = to_display_table(self.series.to_frame())
+        return self._table
+
+    def estimated_size(self, seen=None):
+        seen = set() if seen is None else seen
+        return estimate_size(self.series, seen)
+
+
+def get_result_cache_budget():
+    """Budget in bytes for the shared results of the server process"""
+    return int(float(os.environ.get(RESULT_CACHE_ENV, DEFAULT_RESULT_CACHE_MB)) * 2 ** 20)
+
+
+def get_result_cache_usage():
+    """Memory held by the shared results, in bytes"""
+    with _lock:
+        return sum(result.estimated_size() for _, result in _results.values())
+
+
+def _forget(frame_id):
+    """Drop the results of a frame that no longer exists"""
+    with _lock:
+        for key in [key for key in _results if key[0] == frame_id]:
+            del _results[key]
+
+
+def _lookup(key, frame):
+    """The stored result of ``key`` if it was computed on ``frame``, marked as recently used"""
+    entry = _results.get(key)
+    if entry is None or entry[0]() is not frame:
+        return None
+    _results.move_to_end(key)
+    return entry[1]
+
+
+def _store(key, frame, result):
+    # A weak reference, so a dataset that is gone takes its results with it
+    ref = weakref.ref(frame, lambda _, frame_id=key[0]: _forget(frame_id))
+    _results[key] = (ref, result)
+    budget = get_result_cache_budget()
+    total = sum(stored.estimated_size() for _, stored in _results.values())
+    while total > budget and len(_results) > 1:
+        _, (_, evicted) = _results.popitem(last=False)
+        total -= evicted.estimated_size()
+
+
+def evaluate_many(frame, compiled, page="", prepare=None):
+    """
+    Results of several formulas on one dataset, the ones not computed yet in a single pass.
+
+    Args:
+        frame: The dataset, a Polars DataFrame that is not modified afterwards
+        compiled: CompiledFormula objects, compiled for the schema of ``frame``
+        page: Page name used to label the timings
+        prepare: Called as ``prepare(expr, frame)`` before evaluating, returns the expression and
+            the frame to evaluate it on, e.g. with columns it reads attached
+
+    Returns:
+        list: A SharedResult per formula, in the order of ``compiled``
+    """
+    keys = [(id(frame), c.formula) for c in compiled]
+    # Formulas of the current time are evaluated on every call and not kept
+    volatile = [key for key, c in dict(zip(keys, compiled)).items() if c.volatile]
+    results = {}
+    waiting = []
+    owned = {}
+    with _lock:
+        for key in dict.fromkeys(keys):
+            if key in volatile:
+                continue
+            result = _lookup(key, frame)
+            if result is not None:
+                results[key] = result
+            elif key in _pending:
+                # Being computed by another page or session, wait for it rather than compute it twice
+                waiting.append((key, _pending[key]))
+            else:
+                owned[key] = _pending[key] = threading.Event()
+    if results:
+        increment("result_cache_hit", page, len(results))
+
+    try:
+        if owned or volatile:
+            increment("result_cache_miss", page, len(owned) + len(volatile))
+            formulas = {c.formula: c for c in compiled}
+            names = {key: f"__{RESULT_NAME}_{i}" for i, key in enumerate([*owned, *volatile])}
+            exprs, source = [], frame
+            for key, name in names.items():
+                expr = formulas[key[1]].expr
+                if prepare is not None:
+                    expr, source = prepare(expr, source)
+                exprs.append(expr.alias(name))
+            # Added as columns, so a formula that aggregates still gives one value per row
+            with timed("execute", page):
+                columns = source.lazy().with_columns(exprs).select(list(names.values())).collect()
+            with _lock:
+                for key, name in names.items():
+                    results[key] = SharedResult(columns.get_column(name).alias(RESULT_NAME))
+                    if key in owned:
+                        _store(key, frame, results[key])
+    finally:
+        with _lock:
+            for key, event in owned.items():
+                _pending.pop(key, None)
+                event.set()
+
+    for key, event in waiting:
+        event.wait()
+        with _lock:
+            result = _lookup(key, frame)
+        if result is None:
+            # The other evaluation failed or was evicted already, compute it here
+            result = evaluate_many(frame, [c for c in compiled if c.formula == key[1]], page, prepare)[0]
+        else:
+            increment("result_cache_hit", page)
+        results[key] = result
+    return [results[key] for key in keys]
+
+
+def evaluate(frame, compiled, page="", prepare=None):
+    """
+    The result of a formula on a dataset, computed the first time it is asked for.
+
+    Args:
+        frame: The dataset, a Polars DataFrame that is not modified afterwards
+        compiled: The CompiledFormula, compiled for the schema of ``frame``
+        page: Page name used to label the timings
+        prepare: Called as ``prepare(expr, frame)`` before evaluating, see ``evaluate_many``
+
+    Returns:
+        SharedResult: The result, the same object for every page asking for it
+    """
+    return evaluate_many(frame, [compiled], page, prepare)[0]
+
+
+def clear_result_cache():
+    """Forget every shared result"""
+    with _lock:
+        _results.clear()
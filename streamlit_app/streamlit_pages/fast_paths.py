@@ -0,0 +1,215 @@
+"""
+Rewrites of common formula shapes into faster Polars expressions.
+
+The formula parser maps every function one to one onto Polars. Some shapes have
+a faster spelling with the same result, which ``specialize`` substitutes in the
+built expression:
+
+* contains   - a pattern without regex characters is searched as plain text
+* iso_date   - ``to_date``/``to_datetime`` with an ISO format parse without the
+               cache of unique strings, which costs more than the fixed width
+               parse it saves
+* threshold_ladder - an ``if`` ladder comparing one value against ordered
+               thresholds becomes ``cut``, one binary search instead of a
+               comparison per branch
+* lookup_ladder - an ``if`` ladder comparing one value with texts becomes
+               ``replace_strict``, one hash lookup instead of a comparison per
+               branch
+
+Ladders only pay off from a number of branches on, below that the comparisons
+are cheaper. Comparing texts for equality is cheap in Polars, so a lookup needs
+a lot more branches than a binary search to win.
+"""
+import io
+import json
+
+import polars as pl
+
+# Branches an if ladder needs before it is rewritten
+MIN_THRESHOLD_BRANCHES = 4
+MIN_LOOKUP_BRANCHES = 20
+
+# Formats with a fixed width parse that is faster than the cache lookup
+ISO_FORMATS = {"%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S"}
+
+_REGEX_CHARACTERS = set(".^$*+?{}[]\\|()")
+
+# Threshold comparisons: (thresholds descend along the ladder, cut intervals closed on the left)
+_LADDER_COMPARISONS = {
+    "Gt": (True, False),
+    "GtEq": (True, True),
+    "Lt": (False, True),
+    "LtEq": (False, False),
+}
+
+
+def _tree(expr):
+    return json.loads(expr.meta.serialize(format="json"))
+
+
+def _expr(tree):
+    return pl.Expr.deserialize(io.StringIO(json.dumps(tree)), format="json")
+
+
+def _key(tree):
+    return json.dumps(tree, sort_keys=True)
+
+
+def _literal(tree, *types):
+    """Value of a literal node of one of ``types``, or None"""
+    if isinstance(tree, dict) and isinstance(tree.get("Literal"), dict):
+        (literal_type, value), = tree["Literal"].items()
+        if literal_type in types:
+            return value
+    return None
+
+
+def _ladder(tree):
+    """
+    Unfold nested when/then/otherwise.
+
+    Returns:
+        tuple: ([(condition, value), ...], else value), or None if ``tree`` is no ternary
+    """
+    branches = []
+    while isinstance(tree, dict) and "Ternary" in tree:
+        ternary = tree["Ternary"]
+        branches.append((ternary["predicate"], ternary["truthy"]))
+        tree = ternary["falsy"]
+    return (branches, tree) if branches else None
+
+
+def _comparisons(branches):
+    """The (value, operator, literal) of every condition of the form ``value <op> literal``, or None"""
+    comparisons = []
+    for condition, _ in branches:
+        comparison = condition.get("BinaryExpr") if isinstance(condition, dict) else None
+        if comparison is None:
+            return None
+        comparisons.append((comparison["left"], comparison["op"], comparison["right"]))
+    return comparisons
+
+
+def _threshold_ladder(tree):
+    ladder = _ladder(tree)
+    if ladder is None or len(ladder[0]) < MIN_THRESHOLD_BRANCHES:
+        return None
+    branches, otherwise = ladder
+    comparisons = _comparisons(branches)
+    if comparisons is None:
+        return None
+
+    value = comparisons[0][0]
+    op = comparisons[0][1]
+    if op not in _LADDER_COMPARISONS or any(_key(v) != _key(value) or o != op for v, o, _ in comparisons):
+        return None
+    thresholds = [_literal(right, "Int", "Float") for _, _, right in comparisons]
+    labels = [_literal(then, "String") for _, then in branches] + [_literal(otherwise, "String")]
+    if None in thresholds or None in labels or len(set(labels)) != len(labels):
+        return None
+
+    descending, left_closed = _LADDER_COMPARISONS[op]
+    steps = list(zip(thresholds, thresholds[1:]))
+    if not all(a > b if descending else a < b for a, b in steps):
+        return None
+    if descending:
+        # cut wants the bins from low to high: the else value is the lowest
+        thresholds, labels = thresholds[::-1], [labels[-1]] + labels[-2::-1]
+    # The ladder puts NaN above every threshold and null in the else branch, cut maps both to null.
+    # NaN is filled with a value in the top bin (infinity does not survive the JSON round trip),
+    # and fill_nan raises on text, like the comparisons would.
+    return _tree(
+        _expr(value).fill_nan(max(thresholds) + 1)
+        .cut(thresholds, labels=labels, left_closed=left_closed)
+        .cast(pl.String)
+        .fill_null(labels[0] if descending else labels[-1])
+    )
+
+
+def _lookup_ladder(tree):
+    ladder = _ladder(tree)
+    if ladder is None or len(ladder[0]) < MIN_LOOKUP_BRANCHES:
+        return None
+    branches, otherwise = ladder
+    comparisons = _comparisons(branches)
+    if comparisons is None:
+        return None
+
+    value = comparisons[0][0]
+    if any(_key(v) != _key(value) or o != "Eq" for v, o, _ in comparisons):
+        return None
+    # Only texts: replace_strict casts the keys to the column type, where comparing a number with text fails
+    keys = [_literal(right, "String") for _, _, right in comparisons]
+    results = [then for _, then in branches]
+    if None in keys or len(set(keys)) != len(keys):
+        return None
+    if any(_literal(result, "Int", "Float", "String", "Boolean") is None for result in results + [otherwise]):
+        return None
+
+    # The type the ladder returns only depends on its literals
+    probe = pl.when(pl.lit(False)).then(_expr(results[0]))
+    for result in results[1:]:
+        probe = probe.when(pl.lit(False)).then(_expr(result))
+    return_dtype = pl.select(probe.otherwise(_expr(otherwise))).dtypes[0]
+    return _tree(_expr(value).replace_strict(
+        keys,
+        [_literal(result, "Int", "Float", "String", "Boolean") for result in results],
+        default=_expr(otherwise),
+        return_dtype=return_dtype,
+    ))
+
+
+def _string_function(tree, name):
+    """Options of the string function ``name`` if ``tree`` calls it, or None"""
+    function = tree.get("Function") if isinstance(tree, dict) else None
+    if function is None or not isinstance(function["function"], dict):
+        return None
+    string_function = function["function"].get("StringExpr")
+    if isinstance(string_function, dict) and name in string_function:
+        return string_function[name]
+    return None
+
+
+def _rewrite(tree, applied):
+    if isinstance(tree, list):
+        return [_rewrite(value, applied) for value in tree]
+    if not isinstance(tree, dict):
+        return tree
+
+    # Ladders are matched before their inner branches, which are ladders too
+    for name, rewrite in (("threshold_ladder", _threshold_ladder), ("lookup_ladder", _lookup_ladder)):
+        rewritten = rewrite(tree)
+        if rewritten is not None:
+            applied.append(name)
+            tree = rewritten
+            break
+    tree = {name: _rewrite(value, applied) for name, value in tree.items()}
+
+    contains = _string_function(tree, "Contains")
+    if contains is not None and not contains["literal"]:
+        pattern = _literal(tree["Function"]["input"][1], "String")
+        if pattern is not None and not _REGEX_CHARACTERS & set(pattern):
+            contains["literal"] = True
+            applied.append("contains")
+
+    strptime = _string_function(tree, "Strptime")
+    if strptime is not None and strptime[1]["cache"] and strptime[1]["format"] in ISO_FORMATS:
+        strptime[1]["cache"] = False
+        applied.append("iso_date")
+    return tree
+
+
+def specialize(expr):
+    """
+    Replace the shapes this module knows in ``expr`` by their faster equivalent.
+
+    Args:
+        expr: A Polars expression built from a formula
+
+    Returns:
+        tuple: (the expression, names of the rewrites applied), the expression is
+        returned as is when nothing applies
+    """
+    applied = []
+    tree = _rewrite(_tree(expr), applied)
+    return (_expr(tree), applied) if applied else (expr, applied)
@@ -0,0 +1,89 @@
+import re
+import sys
+
+from streamlit_pages.utils import tree_visualizer_example_categories
+from streamlit_pages.examples import example_categories
+from streamlit_pages.documentation import doc_sections
+from streamlit_pages.formula_engine import compile_formula
+
+# Fenced code blocks holding runnable formulas in the documentation markdown,
+# blocks showing syntax patterns are plain ``` blocks
+_FORMULA_BLOCK = re.compile(r"```formula\n(.*?)```", re.DOTALL)
+
+
+def extract_doc_snippets(markdown):
+    """
+    Extract the formulas from the ```formula code blocks of a markdown text.
+
+    Snippets inside a block are separated by blank lines or by lines that only
+    hold a comment, so a multi-line if/elseif ladder stays a single snippet.
+
+    Args:
+        markdown: The markdown text to scan
+
+    Returns:
+        list: The snippets in the order they appear
+    """
+    snippets = []
+    for block in _FORMULA_BLOCK.findall(markdown):
+        current = []
+        for line in block.splitlines() + [""]:
+            line = line.strip()
+            if line and not line.startswith("//"):
+                current.append(line)
+            elif current:
+                snippets.append("\n".join(current))
+                current = []
+    return snippets
+
+
+def iter_corpus_formulas():
+    """
+    Yield every formula shipped with the app.
+
+    This covers the Tree Visualizer examples, the Examples page dictionaries
+    and the runnable snippets in the Documentation page. Documentation
+    snippets reference columns that are not in the demo schemas.
+
+    Yields:
+        dict: A record with the source, category, title and formula
+    """
+    for category, formulas in tree_visualizer_example_categories.items():
+        for i, formula in enumerate(formulas):
+            yield {"source": "tree_visualizer", "category": category, "title": f"{category} #{i + 1}",
+                   "formula": formula}
+
+    for category, examples in example_categories.items():
+        for title, example in examples.items():
+            yield {"source": "examples", "category": category, "title": title, "formula": example["expr"]}
+
+    for section, content in doc_sections.items():
+        for i, snippet in enumerate(extract_doc_snippets(content)):
+            yield {"source": "documentation", "category": section, "title": f"{section} #{i + 1}",
+                   "formula": snippet}
+
+
+def validate_doc_snippets():
+    """
+    Compile every runnable documentation snippet with the formula engine.
+
+    Returns:
+        list: (section, snippet, error message) for every snippet that does not compile
+    """
+    failures = []
+    for section, content in doc_sections.items():
+        for snippet in extract_doc_snippets(content):
+            try:
+                compile_formula(snippet, page="validation")
+            except Exception as e:
+                failures.append((section, snippet, f"{type(e).__name__}: {e}"))
+    return failures
+
+
+if __name__ == "__main__":
+    # Run from the streamlit_app folder: python -m streamlit_pages.formula_corpus
+    failures = validate_doc_snippets()
+    for section, snippet, error in failures:
+        print(f"[{section}] {snippet!r}: {error}")
+    print(f"{len(failures)} documentation snippets failed to compile")
+    sys.exit(1 if failures else 0)
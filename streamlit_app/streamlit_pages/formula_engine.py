@@ -0,0 +1,302 @@
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from typing import Any, Optional
+
+import polars as pl
+from polars_expr_transformer.process.polars_expr_transformer import build_func
+
+from streamlit_pages.dictionary_encoding import on_dictionary
+from streamlit_pages.fast_paths import specialize
+from streamlit_pages.instrumentation import timed, increment
+from streamlit_pages.validation import Diagnostic, FormulaError, check_syntax, parse_failure, check_schema
+from streamlit_pages.window_functions import register_window_functions, partitioned
+
+register_window_functions()
+
+# Compiled formulas kept per process, shared by every session
+COMPILE_CACHE_SIZE = 1024
+
+# Schemas a compiled formula keeps the checked expression of
+SCHEMA_CHECKS_PER_FORMULA = 16
+
+# Functions the parser turns into the current time as a literal, formulas calling them are not cached
+TIME_FUNCTIONS = {"today", "now"}
+
+# Aggregations that reduce a row-wise formula to one value per group
+aggregations = {
+    "sum": pl.Expr.sum,
+    "mean": pl.Expr.mean,
+    "median": pl.Expr.median,
+    "min": pl.Expr.min,
+    "max": pl.Expr.max,
+    "count": pl.Expr.count,
+    "n_unique": pl.Expr.n_unique,
+    "first": pl.Expr.first,
+    "last": pl.Expr.last,
+}
+
+# Column list of a partition clause, e.g. "[city], [department]"
+_PARTITION_COLUMNS = re.compile(r"\s*\[[^\[\]]+\](?:\s*,\s*\[[^\[\]]+\])*\s*")
+_COLUMN = re.compile(r"\[([^\[\]]+)\]")
+
+# Name of the row-wise value of an aggregated formula, before grouping
+_ROW_VALUE = "__row_value"
+
+_lock = threading.Lock()
+_compiled = OrderedDict()
+
+
+@dataclass
+class CompiledFormula:
+    """
+    A formula together with its parsed tree and Polars expression.
+
+    Attributes:
+        formula: The formula as entered by the user
+        func: The ``Func`` tree returned by ``build_func``
+        expr: The Polars expression
+        readable: Readable Polars code, only filled when requested
+        partition_by: Columns of the "over" clause, the window functions are computed per partition when set
+        dtype: Type the expression returns, when compiled for a schema
+        checks: (expression, dtype, Diagnostic or None) per types of the columns the formula reads
+        volatile: Calls a function of ``TIME_FUNCTIONS``, the expression holds the time it was built at
+    """
+    formula: str
+    func: Any
+    expr: pl.Expr
+    readable: Optional[str] = None
+    partition_by: tuple = ()
+    dtype: Optional[pl.DataType] = None
+    checks: OrderedDict = field(default_factory=OrderedDict, repr=False, compare=False)
+    volatile: bool = False
+
+
+def split_partition_clause(formula):
+    """
+    Split a trailing partition clause off a formula.
+
+    ``[salary] / sum([salary]) over [city]`` gives ``("[salary] / sum([salary])", ("city",))``.
+    Only an ``over`` outside quotes, brackets and parentheses that is followed by
+    nothing but column references counts, other formulas are returned as they are.
+
+    Args:
+        formula: The formula string
+
+    Returns:
+        tuple: (formula without the clause, partition column names, empty when there is no clause)
+    """
+    quote = None
+    depth = 0
+    over_at = None
+    for i, char in enumerate(formula):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char in "([":
+            depth += 1
+        elif char in ")]":
+            depth -= 1
+        elif (depth == 0 and formula[i:i + 4].lower() == "over"
+              and (i == 0 or not (formula[i - 1].isalnum() or formula[i - 1] == "_"))
+              and formula[i + 4:i + 5] in (" ", "\t", "\n", "[")):
+            over_at = i
+
+    if over_at is None or not formula[:over_at].strip() or not _PARTITION_COLUMNS.fullmatch(formula[over_at + 4:]):
+        return formula, ()
+    return formula[:over_at].rstrip(), tuple(_COLUMN.findall(formula[over_at + 4:]))
+
+
+def _function_names(func_obj):
+    """Names of the functions called anywhere in a ``Func`` tree"""
+    stack = [func_obj]
+    while stack:
+        obj = stack.pop()
+        if obj is None:
+            continue
+        name = getattr(getattr(obj, "func_ref", None), "val", None)
+        if isinstance(name, str):
+            yield name
+        stack.extend(getattr(obj, "args", None) or [])
+        for condition in getattr(obj, "conditions", None) or []:
+            stack += [condition.condition, condition.val]
+        stack.append(getattr(obj, "else_val", None))
+
+
+def _compile(formula, page):
+    """Compile a formula that is not in the cache, or diagnose why it does not compile"""
+    body, partition_by = split_partition_clause(formula)
+    with timed("check_syntax", page):
+        diagnostic = check_syntax(body)
+    if diagnostic is None:
+        try:
+            with timed("build_func", page):
+                func_obj = build_func(body)
+            with timed("get_pl_func", page), partitioned(partition_by):
+                expr = func_obj.get_pl_func()
+        except Exception as e:
+            diagnostic = parse_failure(body, e)
+    if diagnostic is not None:
+        increment(f"diagnostic_{diagnostic.kind}", page)
+        return diagnostic
+
+    with timed("specialize", page):
+        expr, applied = specialize(expr)
+    for name in applied:
+        increment(f"fast_path_{name}", page)
+    return CompiledFormula(formula=formula, func=func_obj, expr=expr, partition_by=partition_by,
+                           volatile=not TIME_FUNCTIONS.isdisjoint(_function_names(func_obj)))
+
+
+def _on_schema(compiled, schema, page):
+    """
+    The expression of ``compiled`` adapted to ``schema`` and the type it returns.
+
+    Both only depend on the types of the columns the formula reads, and are
+    kept with the compiled formula for those types.
+    """
+    key = tuple((name, schema.get(name)) for name in compiled.expr.meta.root_names())
+    with _lock:
+        checked = compiled.checks.get(key)
+        if checked is not None:
+            compiled.checks.move_to_end(key)
+
+    if checked is None:
+        with timed("on_dictionary", page):
+            expr, _ = on_dictionary(compiled.expr, schema)
+        with timed("check_schema", page):
+            dtype, diagnostic = check_schema(compiled.formula, expr, schema)
+        if diagnostic is not None:
+            increment(f"diagnostic_{diagnostic.kind}", page)
+        checked = (expr, dtype, diagnostic)
+        with _lock:
+            compiled.checks[key] = checked
+            while len(compiled.checks) > SCHEMA_CHECKS_PER_FORMULA:
+                compiled.checks.popitem(last=False)
+
+    expr, dtype, diagnostic = checked
+    if diagnostic is not None:
+        raise FormulaError(diagnostic)
+    if expr is not compiled.expr:
+        increment("dictionary_evaluation", page)
+    # A copy, the cached formula stays independent of the data
+    return replace(compiled, expr=expr, dtype=dtype)
+
+
+def compile_formula(formula, readable=False, page="", schema=None):
+    """
+    Parse a formula and build its Polars expression, timing every stage.
+
+    A trailing ``over [column]`` clause computes the window functions of the
+    formula per partition with Polars ``.over()``. Shapes with a faster
+    equivalent are rewritten by ``fast_paths.specialize``.
+
+    Compiled formulas are cached per process, so a formula that was compiled
+    before, by any session or by the warm-up, is not parsed again. So are the
+    diagnostics of formulas that do not compile, and the checks against a schema.
+    Formulas calling ``today()`` or ``now()`` are compiled on every call, the
+    parser builds the current time into the expression.
+
+    Args:
+        formula: The formula string
+        readable: Also generate the readable Polars code
+        page: Page name used to label the timings
+        schema: Schema of the frame the formula runs on, checks the formula against
+            it and adapts the expression to its dictionary encoded columns when given
+
+    Returns:
+        CompiledFormula: The compiled formula, with its ``dtype`` when a schema was given
+
+    Raises:
+        FormulaError: If the formula does not parse, or does not fit ``schema``
+    """
+    with _lock:
+        compiled = _compiled.get(formula)
+        if compiled is not None:
+            _compiled.move_to_end(formula)
+
+    if compiled is None:
+        increment("compile_cache_miss", page)
+        compiled = _compile(formula, page)
+        if isinstance(compiled, Diagnostic) or not compiled.volatile:
+            with _lock:
+                _compiled[formula] = compiled
+                while len(_compiled) > COMPILE_CACHE_SIZE:
+                    _compiled.popitem(last=False)
+    else:
+        increment("compile_cache_hit", page)
+    if isinstance(compiled, Diagnostic):
+        raise FormulaError(compiled)
+
+    if readable and compiled.readable is None:
+        with timed("get_readable_pl_function", page):
+            compiled.readable = compiled.func.get_readable_pl_function()
+            if compiled.partition_by:
+                compiled.readable += f".over({list(compiled.partition_by)!r})"
+
+    if schema is not None:
+        compiled = _on_schema(compiled, schema, page)
+    return compiled
+
+
+def clear_compile_cache():
+    """Forget every compiled formula"""
+    with _lock:
+        _compiled.clear()
+
+
+def compile_predicate(formula, schema, readable=False, page=""):
+    """
+    Compile a boolean formula to use as a row filter.
+
+    Args:
+        formula: The formula string, e.g. "[age] > 30 and [salary] < 90000"
+        schema: Schema of the frame the filter is applied to
+        readable: Also generate the readable Polars code
+        page: Page name used to label the timings
+
+    Returns:
+        CompiledFormula: The compiled formula
+
+    Raises:
+        FormulaError: If the formula does not parse, or does not return true or false on ``schema``
+    """
+    compiled = compile_formula(formula, readable=readable, page=page, schema=schema)
+    if compiled.dtype != pl.Boolean:
+        raise FormulaError(Diagnostic(
+            kind="dtype_mismatch",
+            message=f"A filter formula must return true or false, this one returns {compiled.dtype}"))
+    return compiled
+
+
+def collect_streaming(query):
+    """Collect a lazy query with the streaming engine, ``streaming=True`` before Polars 1.25"""
+    if tuple(int(part) for part in pl.__version__.split(".")[:2]) >= (1, 25):
+        return query.collect(engine="streaming")
+    return query.collect(streaming=True)
+
+
+def aggregate_formula(query, keys, formula, aggregation, name, readable=False, page=""):
+    """
+    Group a lazy query by ``keys`` and aggregate a formula per group.
+
+    Args:
+        query: The LazyFrame to aggregate
+        keys: Columns to group by
+        formula: Row-wise formula evaluated before aggregating, e.g. "[salary] * 12"
+        aggregation: Key of ``aggregations``, e.g. "sum"
+        name: Name of the aggregated column
+        readable: Also generate the readable Polars code
+        page: Page name used to label the timings
+
+    Returns:
+        tuple: (CompiledFormula, LazyFrame with one row per group, sorted by the keys)
+    """
+    compiled = compile_formula(formula, readable=readable, page=page, schema=query.collect_schema())
+    # Evaluated before grouping, the lookups of dictionary encoded columns only work on whole columns
+    grouped = (query.with_columns(compiled.expr.alias(_ROW_VALUE)).group_by(keys)
+               .agg(aggregations[aggregation](pl.col(_ROW_VALUE)).alias(name)).sort(keys))
+    return compiled, grouped
@@ -0,0 +1,138 @@
+import bisect
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import islice
+from typing import Optional
+
+from polars_expr_transformer import get_expression_overview
+
+from streamlit_pages.window_functions import window_functions
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# Weight of a token depending on where it appears
+NAME_WEIGHT = 3.0
+CATEGORY_WEIGHT = 2.0
+DOC_WEIGHT = 1.0
+
+
+def tokenize(text):
+    """Lowercase words and numbers of a text, ``to_date`` gives ["to", "date"]"""
+    return _TOKEN.findall(text.lower())
+
+
+@dataclass(frozen=True)
+class FunctionEntry:
+    """
+    One function of the catalog.
+
+    Attributes:
+        name: Function name as used in formulas
+        category: Category title, e.g. "String"
+        doc: Docstring, stripped, or None when the function has none
+    """
+    name: str
+    category: str
+    doc: Optional[str]
+
+
+class FunctionIndex:
+    """
+    In-memory inverted index over the function names, categories and docs.
+
+    Lookups go through the inverted index only, so the cost of a search depends
+    on the number of query tokens and matches, not on the size of the library.
+    """
+
+    def __init__(self, entries):
+        self.entries = list(entries)
+        self.categories = sorted({entry.category for entry in self.entries})
+        self.by_category = defaultdict(list)
+        postings = defaultdict(lambda: defaultdict(float))
+
+        for i, entry in enumerate(self.entries):
+            self.by_category[entry.category].append(i)
+            for token in tokenize(entry.name):
+                postings[token][i] += NAME_WEIGHT
+            for token in tokenize(entry.category):
+                postings[token][i] += CATEGORY_WEIGHT
+            for token in tokenize(entry.doc or ""):
+                postings[token][i] += DOC_WEIGHT
+
+        self.postings = {token: dict(scores) for token, scores in postings.items()}
+        self.tokens = sorted(self.postings)
+        self.names = {entry.name.lower(): i for i, entry in enumerate(self.entries)}
+
+    def _matching_tokens(self, query_token):
+        """Index tokens starting with ``query_token``, found by binary search in the sorted vocabulary"""
+        start = bisect.bisect_left(self.tokens, query_token)
+        end = bisect.bisect_left(self.tokens, query_token + "\uffff")
+        return self.tokens[start:end]
+
+    def search(self, query, category=None, limit=None):
+        """
+        Rank the functions matching every word of ``query``.
+
+        Words match index tokens by prefix, exact token matches weigh more, and a
+        function whose name equals or starts with the query is ranked first.
+
+        Args:
+            query: Free text, e.g. "date diff" or "upper"
+            category: Only return functions of this category
+            limit: Maximum number of results
+
+        Returns:
+            list: Matching FunctionEntry objects, best first
+        """
+        query_tokens = tokenize(query)
+        if not query_tokens:
+            return self.list(category, limit)
+
+        scores = None
+        for query_token in query_tokens:
+            token_scores = defaultdict(float)
+            for token in self._matching_tokens(query_token):
+                factor = 1.0 if token == query_token else 0.5
+                for i, score in self.postings[token].items():
+                    token_scores[i] += score * factor
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {i: scores[i] + token_scores[i] for i in scores.keys() & token_scores.keys()}
+
+        normalized = "_".join(query_tokens)
+        exact = self.names.get(normalized)
+        if exact is not None and exact in scores:
+            scores[exact] += 100
+        for i in scores:
+            if self.entries[i].name.lower().startswith(normalized):
+                scores[i] += 10
+
+        ranked = sorted(scores, key=lambda i: (-scores[i], self.entries[i].name))
+        if category:
+            ranked = [i for i in ranked if self.entries[i].category == category]
+        return [self.entries[i] for i in ranked[:limit]]
+
+    def list(self, category=None, limit=None, offset=0):
+        """Functions of one category, or of all categories, in library order, from ``offset`` on"""
+        ids = self.by_category[category] if category else range(len(self.entries))
+        return [self.entries[i] for i in islice(ids, offset, None if limit is None else offset + limit)]
+
+    def count(self, category=None):
+        return len(self.by_category[category]) if category else len(self.entries)
+
+
+@lru_cache(maxsize=1)
+def get_function_index():
+    """Build the function index once per process from ``get_expression_overview`` and the window functions"""
+    entries = [
+        FunctionEntry(name=expr.name, category=overview.expression_type.title(),
+                      doc=expr.doc.strip() if expr.doc else None)
+        for overview in get_expression_overview()
+        for expr in overview.expressions
+    ]
+    entries += [FunctionEntry(name=name, category="Window", doc=func.__doc__.strip())
+                for name, func in window_functions.items()]
+    return FunctionIndex(entries)
@@ -1,5 +1,9 @@
 import streamlit as st
-from polars_expr_transformer import get_expression_overview
+
+from streamlit_pages.function_catalog import get_function_index
+
+# Functions rendered per page of results
+RESULTS_PER_PAGE = 20
 
 
 def show_functions_overview_page():
@@ -7,29 +11,49 @@ def show_functions_overview_page():
     st.header("Functions Overview")
     st.write("Browse all available functions in Polars Expression Transformer.")
 
-    # Get the expression overview data directly from the library
-    expressions_overview = [c for c in get_expression_overview() if len(c.expressions) > 0]
-
-    # Display categories in tabs
-    categories = [overview.expression_type.title() for overview in expressions_overview]
-    category_tabs = st.tabs(categories)
-    for i, tab in enumerate(category_tabs):
-        with tab:
-            category = expressions_overview[i]
-
-            st.write(f"**{len(category.expressions)} functions available**")
-
-            for expr in category.expressions:
-                with st.expander(expr.name):
-                    st.markdown(f"**Function:** `{expr.name}`")
-
-                    if expr.doc:
-                        st.markdown(f"**Description:**\n{expr.doc.strip()}")
-                    else:
-                        st.markdown("*No description available*")
+    # The index is built once per process, every rerun only queries it
+    index = get_function_index()
+
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        query = st.text_input(
+            "Search functions",
+            placeholder="e.g. date diff, upper, round",
+            key="function_search"
+        )
+    with col2:
+        category = st.selectbox("Category", ["All"] + index.categories, key="function_category")
+    category = None if category == "All" else category
+
+    # Only the functions of the current page are rendered, and without a query only those are listed
+    searching = bool(query.strip())
+    if searching:
+        matches = index.search(query, category)
+        total = len(matches)
+        st.write(f"**{total} matching functions**")
+    else:
+        total = index.count(category)
+        st.write(f"**{total} functions available**")
+    n_pages = max(1, -(-total // RESULTS_PER_PAGE))
+
+    page = 1
+    if n_pages > 1:
+        page = st.number_input("Page", min_value=1, max_value=n_pages, value=1, key="function_page")
+
+    start = (page - 1) * RESULTS_PER_PAGE
+    shown = (matches[start:start + RESULTS_PER_PAGE] if searching
+             else index.list(category, limit=RESULTS_PER_PAGE, offset=start))
+    for expr in shown:
+        with st.expander(expr.name):
+            st.markdown(f"**Function:** `{expr.name}` ({expr.category})")
+
+            if expr.doc:
+                st.markdown(f"**Description:**\n{expr.doc}")
+            else:
+                st.markdown("*No description available*")
 
 
 if __name__ == "__main__":
     # This allows running this page directly for development
     st.set_page_config(page_title="Functions Overview", layout="wide")
-    show_functions_overview_page()
\ No newline at end of file
+    show_functions_overview_page()
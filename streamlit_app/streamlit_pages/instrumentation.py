@@ -0,0 +1,193 @@
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Number of recent samples kept per stage for the percentiles
+SAMPLE_WINDOW = 1000
+
+METRICS_FILE_ENV = "EXPR_DEMO_METRICS_FILE"
+METRICS_PORT_ENV = "EXPR_DEMO_METRICS_PORT"
+METRICS_HOST_ENV = "EXPR_DEMO_METRICS_HOST"
+
+# The endpoint has no authentication, deployments that scrape it remotely opt in to a wider bind
+DEFAULT_METRICS_HOST = "127.0.0.1"
+
+_lock = threading.Lock()
+_stages = {}
+_counters = defaultdict(int)
+_server = None
+
+
+class _StageStats:
+    """Running totals and a window of recent samples for one (stage, page) pair"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+        self.samples = deque(maxlen=SAMPLE_WINDOW)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.last = seconds
+        self.samples.append(seconds)
+
+
+def record(stage, seconds, page=""):
+    """Record one duration in seconds for ``stage``"""
+    with _lock:
+        stats = _stages.get((stage, page))
+        if stats is None:
+            stats = _stages[(stage, page)] = _StageStats()
+        stats.add(seconds)
+
+
+@contextmanager
+def timed(stage, page=""):
+    """
+    Time the body of a ``with`` block and record it under ``stage``.
+
+    The duration is recorded even when the body raises, so failing formulas
+    still show up in the timings.
+
+    Args:
+        stage: Name of the stage, e.g. "build_func" or "execute"
+        page: Page the stage ran on
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start, page)
+
+
+def increment(counter, page="", amount=1):
+    """Increase a named counter"""
+    with _lock:
+        _counters[(counter, page)] += amount
+
+
+def _percentile(sorted_samples, q):
+    if not sorted_samples:
+        return 0.0
+    return sorted_samples[min(len(sorted_samples) - 1, int(q * len(sorted_samples)))]
+
+
+def get_stage_metrics():
+    """
+    Snapshot of the recorded stage timings.
+
+    Returns:
+        list: One dict per (stage, page) with count, totals and percentiles in milliseconds
+    """
+    with _lock:
+        items = [(key, stats.count, stats.total, stats.max, stats.last, sorted(stats.samples))
+                 for key, stats in _stages.items()]
+    return [
+        {
+            "stage": stage,
+            "page": page,
+            "count": count,
+            "total_ms": total * 1e3,
+            "mean_ms": total / count * 1e3,
+            "p50_ms": _percentile(samples, 0.50) * 1e3,
+            "p95_ms": _percentile(samples, 0.95) * 1e3,
+            "max_ms": maximum * 1e3,
+            "last_ms": last * 1e3,
+        }
+        for (stage, page), count, total, maximum, last, samples in sorted(items)
+    ]
+
+
+def get_counters():
+    """Snapshot of the counters as a list of dicts"""
+    with _lock:
+        return [{"counter": counter, "page": page, "value": value}
+                for (counter, page), value in sorted(_counters.items())]
+
+
+def reset_metrics():
+    """Forget every recorded timing and counter"""
+    with _lock:
+        _stages.clear()
+        _counters.clear()
+
+
+def format_prometheus():
+    """Render all metrics in the Prometheus text exposition format"""
+    with _lock:
+        stages = [(key, stats.count, stats.total, sorted(stats.samples)) for key, stats in sorted(_stages.items())]
+        counters = sorted(_counters.items())
+
+    lines = [
+        "# HELP expr_demo_stage_seconds Time spent per processing stage.",
+        "# TYPE expr_demo_stage_seconds summary",
+    ]
+    for (stage, page), count, total, samples in stages:
+        labels = f'stage="{stage}",page="{page}"'
+        for q in (0.5, 0.95, 0.99):
+            lines.append(f'expr_demo_stage_seconds{{{labels},quantile="{q}"}} {_percentile(samples, q):.9f}')
+        lines.append(f"expr_demo_stage_seconds_sum{{{labels}}} {total:.9f}")
+        lines.append(f"expr_demo_stage_seconds_count{{{labels}}} {count}")
+
+    lines += [
+        "# HELP expr_demo_events_total Number of events per page.",
+        "# TYPE expr_demo_events_total counter",
+    ]
+    for (counter, page), value in counters:
+        lines.append(f'expr_demo_events_total{{event="{counter}",page="{page}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics_file(path):
+    """Atomically write the Prometheus text metrics to ``path`` (node exporter textfile format)"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(format_prometheus())
+    os.replace(tmp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = format_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port, host=DEFAULT_METRICS_HOST):
+    """Serve the metrics over HTTP from a background thread, once per process"""
+    global _server
+    with _lock:
+        if _server is not None:
+            return _server
+        _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+    return _server
+
+
+def export_metrics():
+    """
+    Export the metrics to the targets configured through the environment.
+
+    ``EXPR_DEMO_METRICS_FILE`` is rewritten on every call and
+    ``EXPR_DEMO_METRICS_PORT`` starts a Prometheus endpoint on first call, on
+    ``EXPR_DEMO_METRICS_HOST`` (localhost by default).
+    """
+    path = os.environ.get(METRICS_FILE_ENV)
+    if path:
+        write_metrics_file(path)
+    port = os.environ.get(METRICS_PORT_ENV)
+    if port:
+        start_metrics_server(int(port), os.environ.get(METRICS_HOST_ENV, DEFAULT_METRICS_HOST))
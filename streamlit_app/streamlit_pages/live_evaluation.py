@@ -0,0 +1,157 @@
+"""
+Live evaluation of a formula while it is being edited.
+
+Every change is parsed straight away and evaluated on the first rows only, so
+parse errors and a preview show up at once. Once the formula has not changed for
+``SETTLE_SECONDS`` it is evaluated on all rows, in the background. A newer change
+cancels that evaluation if it has not started yet, and the generation counter
+makes sure the result of an older formula is never shown for a newer one.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from streamlit_pages.instrumentation import timed, increment
+from streamlit_pages.session_memory import estimate_size
+
+# Rows the formula is evaluated on while it is being edited
+SAMPLE_ROWS = 200
+
+# Seconds without changes after which all rows are evaluated
+SETTLE_SECONDS = 1.0
+
+# Seconds between checks for a settled formula or a finished evaluation
+POLL_SECONDS = 0.5
+
+# Rows of the full result kept for display
+PREVIEW_ROWS = 100
+
+# Evaluations on all rows run on these threads, shared by all sessions. Polars can
+# interrupt a background query, but aborts the process when its handle is dropped
+# before the query finishes, so superseded evaluations are left to finish instead.
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="live_evaluation")
+
+
+class LiveEvaluation:
+    """
+    State of the live evaluation of one formula input.
+
+    Attributes:
+        generation: Number of changes seen so far
+        sample: Result on the first ``SAMPLE_ROWS`` rows
+        result: First ``PREVIEW_ROWS`` rows of the result on all rows, once evaluated
+        result_rows: Rows in the result on all rows
+        error: Message of the parse or evaluation error
+    """
+
+    def __init__(self, page=""):
+        self.page = page
+        self.generation = 0
+        self.signature = None
+        self.source = None
+        self.changed_at = 0.0
+        self.sample = None
+        self.result = None
+        self.result_rows = 0
+        self.error = None
+        self._query_fn = None
+        self._full = None
+        self._future = None
+        self._future_generation = None
+
+    def update(self, signature, source, build, full=None):
+        """
+        Parse and sample the formula if it or the data changed since the last call.
+
+        Args:
+            signature: Everything the result depends on besides the data, e.g. (formula, column name)
+            source: The Polars DataFrame to evaluate on
+            build: Compiles the formula and returns a function that applies it to a LazyFrame,
+                raises when the formula does not parse
+            full: Evaluates the formula on all of ``source`` and returns the DataFrame, by default
+                the query of ``build`` is collected
+
+        Returns:
+            bool: Whether anything changed
+        """
+        if signature == self.signature and source is self.source:
+            return False
+        self.cancel()
+        self.generation += 1
+        self.signature, self.source = signature, source
+        self.changed_at = time.monotonic()
+        self.sample = self.result = self.error = self._query_fn = None
+        self._full = full
+        self.result_rows = 0
+        increment("live_change", self.page)
+        try:
+            with timed("live_parse", self.page):
+                self._query_fn = build()
+            with timed("live_sample", self.page):
+                self.sample = self._query_fn(source.head(SAMPLE_ROWS).lazy()).collect()
+        except Exception as e:
+            self.error = str(e)
+        return True
+
+    @property
+    def settled(self):
+        """Whether the formula went unchanged for ``SETTLE_SECONDS``"""
+        return time.monotonic() - self.changed_at >= SETTLE_SECONDS
+
+    @property
+    def full_evaluation_needed(self):
+        """Whether the data has more rows than the sample, otherwise the sample is the result"""
+        return self.source is not None and self.source.height > SAMPLE_ROWS
+
+    def poll(self):
+        """
+        Start the evaluation on all rows once settled, and pick up its result when it is done.
+
+        Returns:
+            bool: Whether the evaluation is complete, with a result or an error
+        """
+        if self.error is not None or self.result is not None:
+            return True
+        if self._query_fn is None:
+            return False
+        if not self.full_evaluation_needed:
+            self.result, self.result_rows = self.sample.head(PREVIEW_ROWS), self.sample.height
+            return True
+        if self._future is None:
+            if not self.settled:
+                return False
+            run = self._full or self._query_fn(self.source.lazy()).collect
+            self._future = _executor.submit(self._collect, run)
+            self._future_generation = self.generation
+            return False
+
+        if not self._future.done():
+            return False
+        future, self._future = self._future, None
+        try:
+            result = future.result()
+        except Exception as e:
+            self.error = str(e)
+            return True
+        if self._future_generation != self.generation:
+            # Finished after the formula changed again
+            increment("live_superseded", self.page)
+            return False
+        self.result, self.result_rows = result.head(PREVIEW_ROWS), result.height
+        return True
+
+    def _collect(self, run):
+        with timed("live_full", self.page):
+            return run()
+
+    def estimated_size(self, seen=None):
+        """Bytes held by the data and the results, see ``estimate_size`` for ``seen``"""
+        seen = set() if seen is None else seen
+        return sum(estimate_size(frame, seen) for frame in (self.source, self.sample, self.result)
+                   if frame is not None)
+
+    def cancel(self):
+        """Cancel the evaluation on all rows if it has not started, and drop its result otherwise"""
+        if self._future is not None:
+            if self._future.cancel():
+                increment("live_cancelled", self.page)
+            self._future = None
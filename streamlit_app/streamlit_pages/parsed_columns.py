@@ -0,0 +1,120 @@
+"""
+Text columns parsed to dates and times once, and reused by later formulas.
+
+Date formulas such as ``year(to_date([joined_date]))`` parse the same strings
+on every evaluation. ``use_parsed_columns`` replaces every parse of a column in a
+formula by a hidden column holding the parsed values, parsed the first time and
+kept in the session's ``ParsedColumns``.
+
+A parsed column is only reused for the dataset version it was parsed from: the
+frame in which the text column got its current values. Adding other columns
+keeps that frame, a filter or a new formula writing the column replaces it and
+the column is parsed again.
+"""
+import hashlib
+import io
+import json
+import weakref
+
+import polars as pl
+
+from streamlit_pages.instrumentation import timed, increment
+from streamlit_pages.session_memory import estimate_size
+
+# Prefix of the hidden columns attached to the frame while a formula is evaluated
+PARSED_PREFIX = "__parsed_"
+
+
+class ParsedColumns:
+    """
+    Parsed columns of a session, each kept for the dataset version it was parsed from.
+
+    Holds one version per parse, so the cache never grows beyond the parses in use.
+    """
+
+    def __init__(self):
+        self._entries = {}
+
+    def get(self, name, origin):
+        """The parsed column ``name``, or None if it was not parsed from ``origin``"""
+        entry = self._entries.get(name)
+        if entry is None or entry[0]() is not origin:
+            return None
+        return entry[1]
+
+    def put(self, name, origin, series):
+        """Keep ``series``, parsed from ``origin``, replacing what was parsed from an older version"""
+        # A weak reference, the versions the history dropped are not kept alive by the cache
+        self._entries[name] = (weakref.ref(origin), series)
+
+    def estimated_size(self, seen=None):
+        seen = set() if seen is None else seen
+        return sum(estimate_size(series, seen) for _, series in self._entries.values())
+
+
+def _tree(expr):
+    return json.loads(expr.meta.serialize(format="json"))
+
+
+def _expr(tree):
+    return pl.Expr.deserialize(io.StringIO(json.dumps(tree)), format="json")
+
+
+def _parsed_column(tree):
+    """The column ``tree`` parses to a date or time, or None if it is no such parse"""
+    function = tree.get("Function")
+    if function is None or not isinstance(function["function"], dict):
+        return None
+    string_function = function["function"].get("StringExpr")
+    if not isinstance(string_function, dict) or "Strptime" not in string_function:
+        return None
+    source = function["input"][0]
+    return source["Column"] if isinstance(source, dict) and "Column" in source else None
+
+
+def _rewrite(tree, parses):
+    if isinstance(tree, list):
+        return [_rewrite(value, parses) for value in tree]
+    if not isinstance(tree, dict):
+        return tree
+    column = _parsed_column(tree)
+    if column is not None:
+        name = PARSED_PREFIX + hashlib.blake2b(json.dumps(tree, sort_keys=True).encode(), digest_size=8).hexdigest()
+        parses[name] = (column, tree)
+        return {"Column": name}
+    return {key: _rewrite(value, parses) for key, value in tree.items()}
+
+
+def use_parsed_columns(expr, frame, history, cache, page=""):
+    """
+    Read the dates and times ``expr`` parses from text columns from parsed columns instead.
+
+    Args:
+        expr: A Polars expression built from a formula
+        frame: The current data of ``history``, the expression is evaluated on
+        history: The TransformationHistory, tells which version the text columns are from
+        cache: The session's ParsedColumns
+        page: Page name used to label the timings
+
+    Returns:
+        tuple: (the expression, ``frame`` with the parsed columns it reads attached), both as
+        they are when the expression parses no column
+    """
+    parses = {}
+    tree = _rewrite(_tree(expr), parses)
+    if not parses:
+        return expr, frame
+
+    columns = []
+    for name, (column, parse) in parses.items():
+        origin = history.column_origin(column)
+        series = cache.get(name, origin)
+        if series is None:
+            increment("parsed_column_miss", page)
+            with timed("parse_column", page):
+                series = frame.select(_expr(parse).alias(name)).to_series()
+            cache.put(name, origin, series)
+        else:
+            increment("parsed_column_hit", page)
+        columns.append(series)
+    return _expr(tree), frame.with_columns(columns)
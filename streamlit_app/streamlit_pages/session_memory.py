@@ -0,0 +1,205 @@
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+SESSION_BUDGET_ENV = "EXPR_DEMO_SESSION_MEMORY_MB"
+GLOBAL_BUDGET_ENV = "EXPR_DEMO_GLOBAL_MEMORY_MB"
+DEFAULT_SESSION_BUDGET_MB = 512
+DEFAULT_GLOBAL_BUDGET_MB = 4096
+
+# Sessions that did not rerun for this long no longer count towards the global usage
+SESSION_TTL_SECONDS = 3600
+
+_LRU_KEY = "_memory_lru"
+
+_lock = threading.Lock()
+_session_usage = {}
+_size_cache = {}
+
+
+class MemoryBudgetExceeded(Exception):
+    """Raised when a change would take the session or the server over its memory budget"""
+
+
+def get_session_budget():
+    """Per-session budget in bytes"""
+    return int(float(os.environ.get(SESSION_BUDGET_ENV, DEFAULT_SESSION_BUDGET_MB)) * 2 ** 20)
+
+
+def get_global_budget():
+    """Budget in bytes for all sessions of the server process together"""
+    return int(float(os.environ.get(GLOBAL_BUDGET_ENV, DEFAULT_GLOBAL_BUDGET_MB)) * 2 ** 20)
+
+
+def _is_polars_data(value):
+    # By module rather than isinstance, so that measuring does not import Polars
+    return type(value).__module__.startswith("polars") and hasattr(value, "estimated_size")
+
+
+def estimate_size(value, seen=None):
+    """
+    Estimate the memory held by a session state value in bytes.
+
+    Polars frames and series report their own size, pandas frames are measured
+    once (deep) and cached for as long as the object lives. Lists, such as the
+    agraph node lists, are summed element by element. Objects holding frames,
+    like the transformation history, count them through their own
+    ``estimated_size(seen)``.
+
+    Args:
+        value: The value to measure
+        seen: ids of the Polars frames and series counted already, updated with the ones
+            counted now, so a frame held by several values is counted once
+
+    Returns:
+        int: The estimated size, 0 for a frame in ``seen``
+    """
+    if seen is None:
+        seen = set()
+    if _is_polars_data(value):
+        if id(value) in seen:
+            return 0
+        seen.add(id(value))
+        return value.estimated_size()
+    if hasattr(value, "estimated_size"):
+        return value.estimated_size(seen)
+    if hasattr(value, "memory_usage") and hasattr(value, "columns"):
+        cached = _size_cache.get(id(value))
+        if cached is not None and cached[0]() is value:
+            return cached[1]
+        size = int(value.memory_usage(index=True, deep=True).sum())
+        ref = weakref.ref(value, lambda _, key=id(value): _size_cache.pop(key, None))
+        _size_cache[id(value)] = (ref, size)
+        return size
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(item, seen) for item in value)
+    if hasattr(value, "__dict__"):
+        return sys.getsizeof(value) + sys.getsizeof(value.__dict__)
+    return sys.getsizeof(value)
+
+
+def session_memory_usage():
+    """
+    Memory held by every value in the session state.
+
+    A frame held by several values, e.g. the original data and the first version of
+    the history, is counted once, for the first of them.
+
+    Returns:
+        dict: Session state key to estimated size in bytes
+    """
+    seen = set()
+    return {key: estimate_size(value, seen) for key, value in st.session_state.items() if key != _LRU_KEY}
+
+
+def _lru():
+    if _LRU_KEY not in st.session_state:
+        st.session_state[_LRU_KEY] = OrderedDict()
+    return st.session_state[_LRU_KEY]
+
+
+def mark_cached(*keys):
+    """
+    Register session state keys as a cached result that may be evicted.
+
+    Keys registered together are evicted together, so a page never sees half
+    of a result. Registering also counts as a use.
+    """
+    lru = _lru()
+    lru[keys] = time.time()
+    lru.move_to_end(keys)
+
+
+def touch(*keys):
+    """Mark a cached result as recently used"""
+    lru = _lru()
+    if keys in lru:
+        lru[keys] = time.time()
+        lru.move_to_end(keys)
+
+
+def _session_id():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else "local"
+
+
+def _record_session_usage(total):
+    """Store this session's usage and return the usage of all live sessions together"""
+    now = time.time()
+    with _lock:
+        _session_usage[_session_id()] = (total, now)
+        for session_id in [s for s, (_, seen) in _session_usage.items() if now - seen > SESSION_TTL_SECONDS]:
+            del _session_usage[session_id]
+        return sum(size for size, _ in _session_usage.values())
+
+
+def _evict_until(fits):
+    """Evict least recently used cached results until ``fits(session_total)`` holds"""
+    lru = _lru()
+    evicted = []
+    usage = session_memory_usage()
+    while not fits(sum(usage.values())) and lru:
+        keys, _ = lru.popitem(last=False)
+        for key in keys:
+            if key in st.session_state:
+                del st.session_state[key]
+                usage.pop(key, None)
+                evicted.append(key)
+    return evicted, sum(usage.values())
+
+
+def enforce_memory_budget():
+    """
+    Evict least recently used cached results while the session or the server is over budget.
+
+    Only the current session's cache can be evicted, so when the server as a whole
+    is over budget every session gives up cached results on its next rerun.
+
+    Returns:
+        list: The evicted session state keys
+    """
+    session_budget = get_session_budget()
+    global_budget = get_global_budget()
+    with _lock:
+        others = sum(size for s, (size, _) in _session_usage.items() if s != _session_id())
+
+    evicted, total = _evict_until(lambda total: total <= session_budget and others + total <= global_budget)
+    _record_session_usage(total)
+    return evicted
+
+
+def ensure_capacity(extra_bytes):
+    """
+    Make room for ``extra_bytes`` more, evicting cached results if needed.
+
+    Args:
+        extra_bytes: Size of the data about to be added to the session
+
+    Raises:
+        MemoryBudgetExceeded: If the data does not fit even with every cached result evicted
+    """
+    session_budget = get_session_budget()
+    global_budget = get_global_budget()
+    with _lock:
+        others = sum(size for s, (size, _) in _session_usage.items() if s != _session_id())
+
+    _, total = _evict_until(lambda total: total + extra_bytes <= session_budget
+                            and others + total + extra_bytes <= global_budget)
+    if total + extra_bytes > session_budget:
+        raise MemoryBudgetExceeded(
+            f"This would use {(total + extra_bytes) / 2 ** 20:.1f} MB, over the session budget of "
+            f"{session_budget / 2 ** 20:.0f} MB. Reset the data or work on fewer columns.")
+    if others + total + extra_bytes > global_budget:
+        raise MemoryBudgetExceeded("The server is out of memory budget, please try again later.")
+
+
+def get_global_memory_usage():
+    """Memory held by all live sessions of the server process, in bytes"""
+    with _lock:
+        return sum(size for size, _ in _session_usage.values())
@@ -0,0 +1,181 @@
+"""
+Snapshots of the Data Transformer history on local disk, restored after a reconnect.
+
+A snapshot is a folder per session token holding the original data and every
+step's output as uncompressed Arrow IPC files, plus a JSON manifest with the
+recipe: the formula, action and output column of each step and the current
+version. Step files are named after the recipe leading up to them, so a save
+only writes the steps that are new. Restoring memory-maps the files and attaches
+the columns again, no formula is recomputed.
+
+The token is kept in the ``session`` query parameter, so reloading the page or
+reconnecting with the same URL finds the snapshot again.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import secrets
+import shutil
+import tempfile
+import time
+
+import polars as pl
+
+from streamlit_pages.instrumentation import timed, increment
+from streamlit_pages.transform_history import TransformationHistory
+
+SNAPSHOT_DIR_ENV = "EXPR_DEMO_SNAPSHOT_DIR"
+
+# Query parameter holding the snapshot token
+TOKEN_PARAM = "session"
+
+# Snapshots not saved for this long are deleted
+SNAPSHOT_TTL_SECONDS = 7 * 24 * 3600
+
+MANIFEST = "manifest.json"
+MANIFEST_VERSION = 1
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"[A-Za-z0-9_-]{16,64}")
+
+
+def get_snapshot_dir():
+    """Folder holding the snapshots of all sessions"""
+    return os.environ.get(SNAPSHOT_DIR_ENV) or os.path.join(tempfile.gettempdir(), "expr_demo_snapshots")
+
+
+def new_token():
+    """A token for a new snapshot, safe to use as a folder name"""
+    return secrets.token_urlsafe(16)
+
+
+def _session_dir(token):
+    if not _TOKEN.fullmatch(token or ""):
+        raise ValueError(f"Invalid snapshot token {token!r}")
+    return os.path.join(get_snapshot_dir(), token)
+
+
+def _step_files(history):
+    """File name of every step, derived from the recipe up to and including the step"""
+    files = []
+    chain = hashlib.blake2b(digest_size=8)
+    for step in history.steps:
+        chain.update(json.dumps([step.action, step.formula, step.column]).encode())
+        files.append(f"step_{len(files) + 1}_{chain.hexdigest()}.arrow")
+    return files
+
+
+def _write_ipc(frame, path):
+    # Written next to the target and renamed, so a crash never leaves half a file behind
+    tmp_path = path + ".tmp"
+    frame.write_ipc(tmp_path, compression="uncompressed")
+    os.replace(tmp_path, path)
+
+
+def save_snapshot(history, token, page=""):
+    """
+    Write the history to the snapshot of ``token``, skipping files written before.
+
+    Uncompressed, so that restoring can memory-map the files.
+
+    Args:
+        history: The TransformationHistory to save
+        token: Snapshot token of the session
+        page: Page name used to label the timings
+    """
+    folder = _session_dir(token)
+    os.makedirs(folder, exist_ok=True)
+    files = _step_files(history)
+    with timed("snapshot_save", page):
+        if not os.path.exists(os.path.join(folder, "base.arrow")):
+            _write_ipc(history.base, os.path.join(folder, "base.arrow"))
+        for step, file_name in zip(history.steps, files):
+            path = os.path.join(folder, file_name)
+            if not os.path.exists(path):
+                _write_ipc(step.series.to_frame() if step.series is not None else step.frame, path)
+
+        manifest = {
+            "manifest_version": MANIFEST_VERSION,
+            "polars": pl.__version__,
+            "saved_at": time.time(),
+            "version": history.version,
+            "base": "base.arrow",
+            "steps": [{"action": step.action, "formula": step.formula, "column": step.column, "file": file_name}
+                      for step, file_name in zip(history.steps, files)],
+        }
+        tmp_path = os.path.join(folder, MANIFEST + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, os.path.join(folder, MANIFEST))
+
+        # Steps dropped by applying a new step after an undo
+        for file_name in set(os.listdir(folder)) - set(files) - {"base.arrow", MANIFEST}:
+            os.remove(os.path.join(folder, file_name))
+    increment("snapshot_save", page)
+
+
+def load_snapshot(token, page=""):
+    """
+    Restore the history saved under ``token``.
+
+    Args:
+        token: Snapshot token of the session
+        page: Page name used to label the timings
+
+    Returns:
+        TransformationHistory: The restored history, or None if there is no usable snapshot
+    """
+    try:
+        folder = _session_dir(token)
+        with open(os.path.join(folder, MANIFEST)) as f:
+            manifest = json.load(f)
+    except (ValueError, OSError):
+        return None
+    if manifest.get("manifest_version") != MANIFEST_VERSION:
+        return None
+
+    try:
+        with timed("snapshot_restore", page):
+            history = TransformationHistory(pl.read_ipc(os.path.join(folder, manifest["base"]), memory_map=True))
+            for step in manifest["steps"]:
+                data = pl.read_ipc(os.path.join(folder, step["file"]), memory_map=True)
+                if step["action"] == "Add column":
+                    history.add_column(step["formula"], step["column"], data.to_series())
+                else:
+                    history.filter_rows(step["formula"], data)
+            history.goto(manifest["version"])
+    except Exception as e:
+        # A snapshot of another version of the app, or a damaged one, is started over
+        increment("snapshot_restore_failed", page)
+        logger.warning("Could not restore snapshot %s: %s", token, e)
+        return None
+    increment("snapshot_restore", page)
+    return history
+
+
+def prune_snapshots(max_age=SNAPSHOT_TTL_SECONDS):
+    """
+    Delete the snapshots that were not saved for ``max_age`` seconds.
+
+    Returns:
+        int: The number of snapshots deleted
+    """
+    root = get_snapshot_dir()
+    if not os.path.isdir(root):
+        return 0
+    cutoff = time.time() - max_age
+    deleted = 0
+    for token in os.listdir(root):
+        folder = os.path.join(root, token)
+        manifest = os.path.join(folder, MANIFEST)
+        try:
+            saved_at = os.path.getmtime(manifest if os.path.exists(manifest) else folder)
+        except OSError:
+            continue
+        if saved_at < cutoff:
+            shutil.rmtree(folder, ignore_errors=True)
+            deleted += 1
+    return deleted
@@ -0,0 +1,170 @@
+import argparse
+from datetime import date
+
+import numpy as np
+import polars as pl
+
+FIRST_NAMES = ["John", "Jane", "Robert", "Maria", "Wei", "Aisha", "Carlos", "Emma", "Hiroshi", "Fatima",
+               "Liam", "Olivia", "Noah", "Sofia", "Mateo", "Chloe", "Ivan", "Priya", "Lucas", "Amara"]
+LAST_NAMES = ["Smith", "Doe", "Johnson", "Garcia", "Zhang", "Khan", "Silva", "Brown", "Tanaka", "Ali",
+              "Martin", "Rossi", "Müller", "Dubois", "Novak", "Kim", "Nguyen", "Patel", "Cohen", "Okafor"]
+CITIES = ["New York", "San Francisco", "Chicago", "Boston", "Seattle", "Austin", "Denver", "Miami",
+          "Portland", "Atlanta", "Toronto", "London", "Paris", "Berlin", "Amsterdam", "Madrid", "Tokyo",
+          "Sydney", "São Paulo", "Mumbai"]
+
+DATE_START = date(2015, 1, 1)
+
+
+def _vocabulary(base, cardinality, combine_with=None):
+    """
+    Build ``cardinality`` distinct strings from one or two word pools.
+
+    Values cycle through the pools first and get a numeric suffix once every
+    combination is used, so any cardinality is reachable.
+    """
+    idx = pl.int_range(cardinality, eager=True, dtype=pl.Int64)
+    words = pl.Series(base).gather(idx % len(base))
+    n_combinations = len(base)
+    if combine_with is not None:
+        words = words + " " + pl.Series(combine_with).gather((idx // len(base)) % len(combine_with))
+        n_combinations *= len(combine_with)
+    generation = idx // n_combinations
+    suffix = pl.when(generation > 0).then(" " + (generation + 1).cast(pl.String)).otherwise(pl.lit(""))
+    return pl.select(words + suffix).to_series()
+
+
+def _choice(rng, vocabulary, n_rows):
+    """Pick ``n_rows`` values from ``vocabulary`` uniformly at random"""
+    return vocabulary.gather(rng.integers(0, len(vocabulary), n_rows))
+
+
+def _date_strings(rng, n_rows, cardinality):
+    """ISO formatted date strings spread over ``cardinality`` consecutive days from ``DATE_START``"""
+    offsets = rng.integers(0, cardinality, n_rows, dtype=np.int32) + (DATE_START - date(1970, 1, 1)).days
+    return pl.Series(offsets).cast(pl.Date).dt.strftime("%Y-%m-%d")
+
+
+def _apply_nulls(rng, df, null_rate, exclude=()):
+    """Null out a random ``null_rate`` fraction of every column except those in ``exclude``"""
+    if not isinstance(null_rate, dict):
+        null_rate = {c: null_rate for c in df.columns if c not in exclude}
+    null_rate = {c: rate for c, rate in null_rate.items() if rate > 0}
+    if not null_rate:
+        return df
+    return df.with_columns(
+        pl.when(pl.lit(pl.Series(rng.random(df.height) < rate))).then(None).otherwise(pl.col(c)).alias(c)
+        for c, rate in null_rate.items()
+    )
+
+
+def generate_people_frame(n_rows, seed=0, name_cardinality=10_000, city_cardinality=len(CITIES),
+                          date_cardinality=3_650, null_rate=0.0):
+    """
+    Generate a frame with the schema of ``evaluation.sample_dataset``.
+
+    Args:
+        n_rows: Number of rows to generate
+        seed: Seed for the random generator, the same seed gives the same frame
+        name_cardinality: Number of distinct names
+        city_cardinality: Number of distinct cities
+        date_cardinality: Number of distinct days in ``joined_date``
+        null_rate: Fraction of nulls per column, either one float or a dict of column to rate
+
+    Returns:
+        pl.DataFrame: Columns name, age, city, salary and joined_date
+    """
+    rng = np.random.default_rng(seed)
+    df = pl.DataFrame({
+        "name": _choice(rng, _vocabulary(FIRST_NAMES, name_cardinality, LAST_NAMES), n_rows),
+        "age": rng.integers(18, 70, n_rows, dtype=np.int64),
+        "city": _choice(rng, _vocabulary(CITIES, city_cardinality), n_rows),
+        "salary": np.round(rng.lognormal(11.3, 0.35, n_rows), -3).astype(np.int64),
+        "joined_date": _date_strings(rng, n_rows, date_cardinality),
+    })
+    return _apply_nulls(rng, df, null_rate)
+
+
+def generate_customers_frame(n_rows, seed=0, first_id=1001, name_cardinality=10_000,
+                             city_cardinality=len(CITIES), date_cardinality=1_095, null_rate=0.0):
+    """
+    Generate a frame with the schema of ``load_sample_data``.
+
+    Args:
+        n_rows: Number of rows to generate
+        seed: Seed for the random generator, the same seed gives the same frame
+        first_id: First ``customer_id``, ids are consecutive and never null
+        name_cardinality: Number of distinct customer names
+        city_cardinality: Number of distinct cities
+        date_cardinality: Number of distinct days in ``purchase_date``
+        null_rate: Fraction of nulls per column, either one float or a dict of column to rate
+
+    Returns:
+        pl.DataFrame: Columns customer_id, customer_name, age, city, purchase_amount, purchase_date and is_member
+    """
+    rng = np.random.default_rng(seed)
+    df = pl.DataFrame({
+        "customer_id": np.arange(first_id, first_id + n_rows, dtype=np.int64),
+        "customer_name": _choice(rng, _vocabulary(FIRST_NAMES, name_cardinality, LAST_NAMES), n_rows),
+        "age": rng.integers(18, 80, n_rows, dtype=np.int64),
+        "city": _choice(rng, _vocabulary(CITIES, city_cardinality), n_rows),
+        "purchase_amount": np.round(rng.gamma(2.0, 80.0, n_rows), 2),
+        "purchase_date": _date_strings(rng, n_rows, date_cardinality),
+        "is_member": rng.random(n_rows) < 0.6,
+    })
+    return _apply_nulls(rng, df, null_rate, exclude=("customer_id",))
+
+
+SCHEMAS = {
+    "people": generate_people_frame,
+    "customers": generate_customers_frame,
+}
+
+
+def write_parquet(path, n_rows, schema="people", chunk_size=1_000_000, seed=0, **options):
+    """
+    Generate ``n_rows`` rows and write them to a single Parquet file chunk by chunk.
+
+    Every chunk becomes one row group, so memory use is bounded by ``chunk_size``
+    regardless of ``n_rows``.
+
+    Args:
+        path: Output file
+        n_rows: Total number of rows
+        schema: Either "people" or "customers"
+        chunk_size: Rows generated and written per chunk
+        seed: Base seed, chunk ``i`` uses ``seed + i``
+        **options: Passed on to the frame generator (cardinalities, null_rate)
+    """
+    import pyarrow.parquet as pq
+
+    generate = SCHEMAS[schema]
+    writer = None
+    try:
+        for i, offset in enumerate(range(0, n_rows, chunk_size)):
+            size = min(chunk_size, n_rows - offset)
+            if schema == "customers":
+                options["first_id"] = 1001 + offset
+            table = generate(size, seed=seed + i, **options).to_arrow()
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table, row_group_size=size)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic dataset matching the demo schemas to Parquet")
+    parser.add_argument("path", help="Output Parquet file")
+    parser.add_argument("--rows", type=float, default=1e6, help="Number of rows, e.g. 1e8")
+    parser.add_argument("--schema", choices=sorted(SCHEMAS), default="people")
+    parser.add_argument("--chunk-size", type=float, default=1e6)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--name-cardinality", type=int, default=10_000)
+    parser.add_argument("--city-cardinality", type=int, default=len(CITIES))
+    parser.add_argument("--null-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    write_parquet(args.path, int(args.rows), schema=args.schema, chunk_size=int(args.chunk_size), seed=args.seed,
+                  name_cardinality=args.name_cardinality, city_cardinality=args.city_cardinality,
+                  null_rate=args.null_rate)
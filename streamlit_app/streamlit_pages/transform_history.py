@@ -0,0 +1,155 @@
+"""
+Versioned history of the transformations applied in the Data Transformer.
+
+Each step records its formula and what it added instead of a copy of the data.
+Adding a column attaches the new Series to the previous frame, and Polars
+frames share the buffers of their columns, so every version of the data
+exists at the cost of the columns it added. Undo, redo and jumping to a
+version only move a cursor.
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+import polars as pl
+
+from streamlit_pages.session_memory import estimate_size
+
+
+@dataclass(frozen=True)
+class HistoryStep:
+    """
+    One transformation in the history.
+
+    Attributes:
+        action: "Add column" or "Filter rows"
+        formula: The formula that was applied
+        frame: The data after the step, sharing its buffers with the data before
+        column: Name of the added column
+        series: The added column, None for filters
+    """
+    action: str
+    formula: str
+    frame: pl.DataFrame
+    column: Optional[str] = None
+    series: Optional[pl.Series] = None
+
+    def estimated_size(self, seen=None):
+        """Bytes this step adds on top of the previous version, see ``estimate_size`` for ``seen``"""
+        seen = set() if seen is None else seen
+        if self.series is None:
+            return estimate_size(self.frame, seen)
+        # The frame shares every other column with the previous version
+        seen.add(id(self.frame))
+        return estimate_size(self.series, seen)
+
+
+class TransformationHistory:
+    """
+    Linear history of transformations of a DataFrame, with undo and redo.
+
+    Version 0 is the original data, version n the data after the first n steps.
+    Applying a step after an undo drops the steps that could have been redone.
+
+    Attributes:
+        base: The original data
+        version: Number of steps applied to get the current data
+        revision: Incremented on every change, to tell whether the history changed
+    """
+
+    def __init__(self, base):
+        self.base = base
+        self.version = 0
+        self.revision = 0
+        self._steps = []
+
+    @property
+    def steps(self):
+        """Every step, including those undone"""
+        return tuple(self._steps)
+
+    @property
+    def current(self):
+        """The data at the current version"""
+        return self._steps[self.version - 1].frame if self.version else self.base
+
+    @property
+    def can_undo(self):
+        return self.version > 0
+
+    @property
+    def can_redo(self):
+        return self.version < len(self._steps)
+
+    def column_origin(self, name):
+        """
+        The frame in which column ``name`` got the values it has in the current version.
+
+        That is the original data, the step that last wrote the column, or the last
+        filter since, whichever came last. Adding other columns keeps the values.
+        """
+        for step in reversed(self._steps[:self.version]):
+            if step.series is None or step.column == name:
+                return step.frame
+        return self.base
+
+    def _push(self, step):
+        del self._steps[self.version:]
+        self._steps.append(step)
+        self.version += 1
+        self.revision += 1
+        return step.frame
+
+    def add_column(self, formula, column, series):
+        """
+        Record a derived column.
+
+        Args:
+            formula: The formula the column was computed with
+            column: Name of the column, an existing column of that name is replaced
+            series: The computed values
+
+        Returns:
+            pl.DataFrame: The new current data
+        """
+        series = series.alias(column)
+        return self._push(HistoryStep("Add column", formula, self.current.with_columns(series), column, series))
+
+    def filter_rows(self, formula, frame):
+        """
+        Record a filter. The rows kept are new buffers, so the filtered frame is stored as is.
+
+        Args:
+            formula: The filter formula
+            frame: The rows for which it was true
+
+        Returns:
+            pl.DataFrame: The new current data
+        """
+        return self._push(HistoryStep("Filter rows", formula, frame))
+
+    def goto(self, version):
+        """
+        Make ``version`` the current version.
+
+        Raises:
+            ValueError: If there is no such version
+        """
+        if not 0 <= version <= len(self._steps):
+            raise ValueError(f"Version {version} does not exist, the history has {len(self._steps)} steps")
+        if version != self.version:
+            self.version = version
+            self.revision += 1
+        return self.current
+
+    def undo(self):
+        """Go back one step, if there is one"""
+        return self.goto(self.version - 1) if self.can_undo else self.current
+
+    def redo(self):
+        """Go forward one undone step, if there is one"""
+        return self.goto(self.version + 1) if self.can_redo else self.current
+
+    def estimated_size(self, seen=None):
+        """Bytes held by every version together, shared buffers counted once, see ``estimate_size`` for ``seen``"""
+        seen = set() if seen is None else seen
+        return estimate_size(self.base, seen) + sum(step.estimated_size(seen) for step in self._steps)
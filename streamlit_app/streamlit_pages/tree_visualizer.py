@@ -1,342 +1,306 @@
+import hashlib
+from dataclasses import dataclass
+
 import streamlit as st
-import polars as pl
-import uuid
-import copy
 from streamlit_agraph import agraph, Node, Edge, Config
 
-from polars_expr_transformer.process.polars_expr_transformer import build_func, simple_function_to_expr
-from polars_expr_transformer.visualize import generate_visualization
+from polars_expr_transformer.visualize import visualize_function_hierarchy
+
+from streamlit_pages.display import show_dataframe
+from streamlit_pages.evaluation import evaluate, sample_dataset, sample_table
+from streamlit_pages.formula_engine import compile_formula
+from streamlit_pages.instrumentation import timed, increment
+from streamlit_pages.session_memory import mark_cached, touch
+
+PAGE = "tree_visualizer"
+
+
+def _unwrap(obj):
+    """Skip TempFunc and pl.lit wrappers, which are not shown in the tree"""
+    while True:
+        class_name = obj.__class__.__name__
+        if class_name == 'TempFunc' and getattr(obj, 'args', None):
+            obj = obj.args[0]
+        elif (class_name == 'Func' and getattr(obj.func_ref, 'val', None) == 'pl.lit'
+              and len(obj.args) == 1):
+            obj = obj.args[0]
+        else:
+            return obj
+
+
+def _short_label(obj, default):
+    """Readable Polars code of ``obj``, cut to fit in a node"""
+    if not hasattr(obj, 'get_readable_pl_function'):
+        return default
+    readable = obj.get_readable_pl_function()
+    return readable[:22] + "..." if len(readable) > 25 else readable
 
 
-def build_expression_graph(func_obj):
+def build_expression_graph(func_obj, previous=None):
     """
     Build nodes and edges for agraph visualization from a function object.
 
+    Node IDs are hashes of the subtree below the node, so a subtree that did not
+    change between two formulas keeps its IDs, and its place in the hierarchical
+    layout as long as the tree above it is the same. Subtrees found in
+    ``previous`` are reused as they are instead of being built again.
+
     Args:
         func_obj: The function object to visualize
+        previous: Subtrees returned by the previous call, by node ID
 
     Returns:
-        tuple: A tuple of (nodes, edges) lists for agraph
+        tuple: (nodes, edges, subtrees), the lists for agraph and the
+        (nodes, edges) of every subtree by the ID of its top node
     """
+    previous = previous or {}
     nodes = []
     edges = []
-    node_ids = {}  # Keep track of created node IDs to avoid duplicates
+    subtrees = {}
+    node_ids = set()  # Keep track of created node IDs to avoid duplicates
+    keys = {}  # Structural key of every subtree, by id() of its object
+
+    def subtree_key(obj):
+        """Text describing ``obj`` and everything below it, equal for equal subtrees"""
+        obj = _unwrap(obj)
+        if id(obj) in keys:
+            return keys[id(obj)]
+        class_name = obj.__class__.__name__
+        if class_name == "Func":
+            func_name = obj.func_ref.val if hasattr(obj.func_ref, 'val') else str(obj.func_ref)
+            key = f"{func_name}({','.join(subtree_key(arg) for arg in obj.args)})"
+        elif class_name == "IfFunc":
+            branches = [f"{branch_key(c.condition)}:{branch_key(c.val)}" for c in obj.conditions]
+            key = f"if({';'.join(branches)};else:{branch_key(obj.else_val)})"
+        else:
+            key = f"{class_name}:{getattr(obj, 'val_type', '')}:{getattr(obj, 'val', obj)!r}"
+        keys[id(obj)] = key
+        return key
+
+    def branch_key(obj):
+        return subtree_key(obj) if obj else ""
 
     # Function to generate a unique ID for nodes
-    def get_node_id(prefix, name=None):
+    def get_node_id(prefix, key):
+        digest = hashlib.blake2b(f"{prefix}|{key}".encode(), digest_size=8).hexdigest()
         # Make the first node have a consistent ID to ensure it's handled as the root
-        if not nodes:
-            if name:
-                return f"root_{name}"
-            return "root_node"
-
-        # Use the node name if provided
-        if name:
-            # Clean up the name to make it a valid ID (remove spaces, quotes, etc.)
-            clean_name = str(name).replace(' ', '_').replace('"', '').replace("'", "")
-            clean_name = ''.join(c for c in clean_name if c.isalnum() or c == '_')
-            node_id = f"{prefix}_{clean_name}"
-
-            # Add a unique suffix if this ID already exists
-            counter = 1
-            original_id = node_id
-            while node_id in node_ids:
-                node_id = f"{original_id}_{counter}"
-                counter += 1
-
-            node_ids[node_id] = True
-            return node_id
+        node_id = original_id = f"root_{digest}" if not nodes else f"{prefix}_{digest}"
 
-        # Fallback to a shorter random ID
-        node_id = f"{prefix}_{str(uuid.uuid4())[:4]}"
+        # Add a suffix for repeated subtrees, counted in tree order
+        counter = 1
+        while node_id in node_ids:
+            node_id = f"{original_id}_{counter}"
+            counter += 1
         return node_id
 
+    def add_node(node_id, parent_id, edge_label, **node):
+        node_ids.add(node_id)
+        nodes.append(Node(id=node_id, title=node["label"], shape="dot", **node))
+        if parent_id:
+            edges.append(Edge(id=f"{parent_id}->{node_id}",
+                              source=parent_id,
+                              target=node_id,
+                              label=edge_label or ""))
+
+    def reuse(node_id, parent_id, edge_label):
+        """Add the subtree of ``node_id`` from the previous graph, if it does not clash with this one"""
+        subtree_nodes, subtree_edges = previous[node_id]
+        if any(node.id in node_ids for node in subtree_nodes):
+            return False
+        start = len(nodes)
+        node_ids.update(node.id for node in subtree_nodes)
+        nodes.extend(subtree_nodes)
+        if parent_id:
+            edges.append(Edge(id=f"{parent_id}->{node_id}",
+                              source=parent_id,
+                              target=node_id,
+                              label=edge_label or ""))
+        edges_start = len(edges)
+        edges.extend(subtree_edges)
+        subtrees[node_id] = (nodes[start:], edges[edges_start:])
+        return True
+
     # Function to generate structured elements recursively
-    def _build_graph(obj, parent_id=None, edge_label=None):
+    def _build_graph(obj, parent_id=None, edge_label=None, prefix=None, key=None, label=None):
         if obj is None:
             return None
 
-        # Skip TempFunc and unwrap pl.lit wrappers
-        if hasattr(obj, '__class__') and obj.__class__.__name__ == 'TempFunc':
-            if hasattr(obj, 'args') and obj.args:
-                return _build_graph(obj.args[0], parent_id, edge_label)
-            else:
-                node_id = get_node_id("temp")
-                nodes.append(Node(id=node_id,
-                                  label="TempFunc",
-                                  color="#9CA3AF",  # Gray-400
-                                  size=15,
-                                  shape="dot"))
-
-                if parent_id:
-                    edges.append(Edge(source=parent_id,
-                                      target=node_id,
-                                      label=edge_label or ""))
-                return node_id
-
-        # Unwrap pl.lit wrapper objects
-        if (hasattr(obj, '__class__') and obj.__class__.__name__ == 'Func' and
-                hasattr(obj, 'func_ref') and hasattr(obj.func_ref, 'val') and
-                obj.func_ref.val == 'pl.lit' and len(obj.args) == 1):
-            # Check if we're wrapping an expression (as in get_readable_pl_function)
-            if hasattr(obj.args[0], 'get_pl_func') and isinstance(obj.args[0].get_pl_func(), pl.Expr):
-                return _build_graph(obj.args[0], parent_id, edge_label)
+        obj = _unwrap(obj)
+        class_name = obj.__class__.__name__
+
+        if prefix is None:
+            if class_name == "Func":
+                prefix = "func"
+            elif class_name == "IfFunc":
+                prefix = "if"
+            elif class_name == "Classifier":
+                prefix = "value" if getattr(obj, 'val_type', "") in ["number", "string", "boolean"] else "classifier"
             else:
-                # Otherwise, keep the pl.lit wrapper and process its argument
-                return _build_graph(obj.args[0], parent_id, edge_label)
+                prefix = "other"
+        node_id = get_node_id(prefix, key if key is not None else subtree_key(obj))
+        if node_id in previous and reuse(node_id, parent_id, edge_label):
+            increment("subtree_reused", PAGE)
+            return node_id
 
-        if hasattr(obj, '__class__'):
-            class_name = obj.__class__.__name__
-        else:
-            class_name = "Unknown"
+        start, edges_start = len(nodes), len(edges) + (1 if parent_id else 0)
+        if label is not None:
+            # Branch node of an if, labelled with the code of the expression below it
+            add_node(node_id, parent_id, edge_label, label=label[0], color=label[1], size=18)
+            _build_graph(obj, node_id)
 
-        if class_name == "Func":
+        elif class_name == "Func":
             func_name = obj.func_ref.val if hasattr(obj.func_ref, 'val') else str(obj.func_ref)
-
-            node_id = get_node_id("func")
-            nodes.append(Node(id=node_id,
-                              label=func_name,
-                              color="#F59E0B",  # Amber-500
-                              size=20,
-                              shape="dot"))
-
-            # Connect to parent if exists
-            if parent_id:
-                edges.append(Edge(source=parent_id,
-                                  target=node_id,
-                                  label=edge_label or ""))
+            add_node(node_id, parent_id, edge_label,
+                     label=func_name,
+                     color="#F59E0B",  # Amber-500
+                     size=20)
 
             # Process arguments
             for i, arg in enumerate(obj.args):
-                arg_label = f"Arg {i + 1}"
-                _build_graph(arg, node_id, arg_label)
-
-            return node_id
+                _build_graph(arg, node_id, f"Arg {i + 1}")
 
         elif class_name == "IfFunc":
-            # Add the if node
-            node_id = get_node_id("if")
-            nodes.append(Node(id=node_id,
-                              label="If",
-                              color="#EC4899",  # Pink-500
-                              size=25,
-                              shape="dot"))
-
-            # Connect to parent if exists
-            if parent_id:
-                edges.append(Edge(source=parent_id,
-                                  target=node_id,
-                                  label=edge_label or ""))
+            add_node(node_id, parent_id, edge_label,
+                     label="If",
+                     color="#EC4899",  # Pink-500
+                     size=25)
 
             # Process conditions
             for i, condition_val in enumerate(obj.conditions):
-                cond_id = get_node_id("cond")
-                nodes.append(Node(id=cond_id,
-                                  label=f"Cond {i + 1}",
-                                  color="#BE185D",  # Pink-800
-                                  size=18,
-                                  shape="dot"))
-
-                edges.append(Edge(source=node_id,
-                                  target=cond_id,
-                                  label=f"Condition: {i + 1}"))
-
-                # Process condition expression
-                if hasattr(condition_val, 'condition') and condition_val.condition:
-                    # Get readable expression if available
-                    expr_label = "Expr"
-                    if hasattr(condition_val.condition, 'get_readable_pl_function'):
-                        readable_expr = condition_val.condition.get_readable_pl_function()
-                        if len(readable_expr) > 25:
-                            expr_label = readable_expr[:22] + "..."
-                        else:
-                            expr_label = readable_expr
-
-                    expr_id = get_node_id("expr")
-                    nodes.append(Node(id=expr_id,
-                                      label=expr_label,
-                                      color="#8B5CF6",  # Violet-500
-                                      size=18,
-                                      shape="dot"))
-
-                    edges.append(Edge(source=cond_id,
-                                      target=expr_id,
-                                      label="When"))
-
-                    _build_graph(condition_val.condition, expr_id)
-
-                # Process 'then' value
-                if hasattr(condition_val, 'val') and condition_val.val:
-                    # Get readable 'then' if available
-                    then_label = "Then"
-                    if hasattr(condition_val.val, 'get_readable_pl_function'):
-                        readable_then = condition_val.val.get_readable_pl_function()
-                        if len(readable_then) > 25:
-                            then_label = readable_then[:22] + "..."
-                        else:
-                            then_label = readable_then
-
-                    then_id = get_node_id("then")
-                    nodes.append(Node(id=then_id,
-                                      label=then_label,
-                                      color="#3B82F6",  # Blue-500
-                                      size=18,
-                                      shape="dot"))
-
-                    edges.append(Edge(source=cond_id,
-                                      target=then_id,
-                                      label="Then"))
-
-                    _build_graph(condition_val.val, then_id)
+                cond_key = f"{i}:{branch_key(condition_val.condition)}:{branch_key(condition_val.val)}"
+                cond_id = get_node_id("cond", cond_key)
+                if cond_id in previous and reuse(cond_id, node_id, f"Condition: {i + 1}"):
+                    continue
+                cond_start, cond_edges_start = len(nodes), len(edges) + 1
+                add_node(cond_id, node_id, f"Condition: {i + 1}",
+                         label=f"Cond {i + 1}",
+                         color="#BE185D",  # Pink-800
+                         size=18)
+
+                if condition_val.condition:
+                    _build_graph(condition_val.condition, cond_id, "When", prefix="expr",
+                                 key=subtree_key(condition_val.condition),
+                                 label=(_short_label(condition_val.condition, "Expr"), "#8B5CF6"))  # Violet-500
+                if condition_val.val:
+                    _build_graph(condition_val.val, cond_id, "Then", prefix="then",
+                                 key=subtree_key(condition_val.val),
+                                 label=(_short_label(condition_val.val, "Then"), "#3B82F6"))  # Blue-500
+                subtrees[cond_id] = (nodes[cond_start:], edges[cond_edges_start:])
 
             # Process 'else' value
             if obj.else_val:
-                # Get readable 'else' if available
-                else_label = "Else"
-                if hasattr(obj.else_val, 'get_readable_pl_function'):
-                    readable_else = obj.else_val.get_readable_pl_function()
-                    if len(readable_else) > 25:
-                        else_label = readable_else[:22] + "..."
-                    else:
-                        else_label = readable_else
-
-                else_id = get_node_id("else")
-                nodes.append(Node(id=else_id,
-                                  label=else_label,
-                                  color="#06B6D4",  # Cyan-500
-                                  size=18,
-                                  shape="dot"))
-
-                edges.append(Edge(source=node_id,
-                                  target=else_id,
-                                  label="Else"))
-
-                _build_graph(obj.else_val, else_id)
-
-            return node_id
+                _build_graph(obj.else_val, node_id, "Else", prefix="else",
+                             key=subtree_key(obj.else_val),
+                             label=(_short_label(obj.else_val, "Else"), "#06B6D4"))  # Cyan-500
 
         elif class_name == "Classifier":
             val = obj.val if hasattr(obj, 'val') else str(obj)
-            val_type = obj.val_type if hasattr(obj, 'val_type') else ""
-
-            # Format value display based on type
-            if val_type == "string":
-                display_val = f'"{val}"'
-            else:
-                display_val = str(val)
-
-            # Determine node color and characteristics based on classifier type
-            if val_type in ["number", "string", "boolean"]:
-                node_id = get_node_id("value")
-                nodes.append(Node(id=node_id,
-                                  label=display_val,
-                                  color="#10B981",  # Emerald-500
-                                  size=15,
-                                  shape="dot"))
+            if prefix == "value":
+                # Format value display based on type
+                add_node(node_id, parent_id, edge_label,
+                         label=f'"{val}"' if obj.val_type == "string" else str(val),
+                         color="#10B981",  # Emerald-500
+                         size=15)
             else:
-                node_id = get_node_id("classifier")
-                nodes.append(Node(id=node_id,
-                                  label=str(val),
-                                  color="#6366F1",  # Indigo-500
-                                  size=15,
-                                  shape="dot"))
-
-            # Connect to parent if exists
-            if parent_id:
-                edges.append(Edge(source=parent_id,
-                                  target=node_id,
-                                  label=edge_label or ""))
-
-            return node_id
+                add_node(node_id, parent_id, edge_label,
+                         label=str(val),
+                         color="#6366F1",  # Indigo-500
+                         size=15)
 
         else:
             # Handle other types
-            display_val = obj.val if hasattr(obj, 'val') else str(obj)
-
-            node_id = get_node_id("other")
-            nodes.append(Node(id=node_id,
-                              label=str(display_val),
-                              color="#6B7280",  # Gray-500
-                              size=15,
-                              shape="dot"))
+            add_node(node_id, parent_id, edge_label,
+                     label=str(obj.val if hasattr(obj, 'val') else obj),
+                     color="#6B7280",  # Gray-500
+                     size=15)
 
-            # Connect to parent if exists
-            if parent_id:
-                edges.append(Edge(source=parent_id,
-                                  target=node_id,
-                                  label=edge_label or ""))
-
-            return node_id
+        subtrees[node_id] = (nodes[start:], edges[edges_start:])
+        return node_id
 
     # Start the recursive build
     _build_graph(func_obj)
 
-    return nodes, edges
+    return nodes, edges, subtrees
+
 
+@dataclass
+class GraphDiff:
+    """
+    Node IDs of a graph compared with the previous one.
 
-def visualize_expression(expr):
+    Attributes:
+        added: Nodes that are new
+        removed: Nodes that are gone
+        kept: Nodes that stay, with their position
+    """
+    added: set
+    removed: set
+    kept: set
+
+
+def diff_graphs(previous_nodes, nodes):
+    """
+    Compare the nodes of two graphs built by ``build_expression_graph``.
+
+    Args:
+        previous_nodes: Nodes of the graph shown so far
+        nodes: Nodes of the new graph
+
+    Returns:
+        GraphDiff: The added, removed and kept node IDs
+    """
+    previous_ids = {node.id for node in previous_nodes}
+    ids = {node.id for node in nodes}
+    return GraphDiff(added=ids - previous_ids, removed=previous_ids - ids, kept=ids & previous_ids)
+
+
+def visualize_expression(expr, previous=None):
     """
     Visualize the given expression tree using streamlit-agraph
 
     Args:
         expr: String expression to visualize
+        previous: Subtrees of the graph shown so far, reused where unchanged
 
     Returns:
-        tuple: (nodes, edges) for the graph, text_visualization
+        tuple: (nodes, edges, subtrees) for the graph, text_visualization
     """
     try:
-        # Build the function object from the expression
-        func_obj = build_func(expr)
-
-        # Fixing check to use pl.Expr instead of pl.expr.Expr for better compatibility
-        if hasattr(func_obj, 'args') and func_obj.args and hasattr(func_obj.args[0], 'get_pl_func'):
-            pl_func = func_obj.args[0].get_pl_func()
-            if isinstance(pl_func, pl.Expr):  # Changed from pl.expr.Expr to pl.Expr
-                func_obj = func_obj.args[0]
+        # Parsed and validated once per formula, a formula that failed before fails from the cache
+        func_obj = compile_formula(expr, page=PAGE).func
 
-        # Access the inner function object if wrapped in TempFunc
-        if hasattr(func_obj, '__class__') and func_obj.__class__.__name__ == 'TempFunc' and func_obj.args:
+        # Skip the pl.lit wrapper around an expression, like generate_visualization does
+        if getattr(func_obj, 'args', None) and func_obj.args[0].__class__.__name__ in ("Func", "IfFunc"):
             func_obj = func_obj.args[0]
 
-        # Validate by getting the Polars function
-        func_obj.get_pl_func()
-
         # Build the nodes and edges for the visualization
-        nodes, edges = build_expression_graph(func_obj)
+        with timed("build_graph", PAGE):
+            nodes, edges, subtrees = build_expression_graph(func_obj, previous)
 
-        # Generate the text visualization
-        text_viz = generate_visualization(expr)
+        # Generate the text visualization from the same tree
+        with timed("text_visualization", PAGE):
+            text_viz = visualize_function_hierarchy(func_obj)
 
-        return nodes, edges, text_viz
+        return nodes, edges, subtrees, text_viz
     except Exception as e:
+        increment("error", PAGE)
         st.error(f"Error visualizing expression: {str(e)}")
-        return [], [], ""
-
-
-def create_sample_dataframe():
-    """Create a sample DataFrame for demonstration purposes"""
-    return pl.DataFrame({
-        "name": ["John Smith", "Jane Doe", "Robert Johnson", "Maria Garcia", "Wei Zhang"],
-        "age": [34, 42, 28, 55, 39],
-        "city": ["New York", "San Francisco", "Chicago", "Boston", "Seattle"],
-        "salary": [75000, 95000, 65000, 120000, 85000],
-        "joined_date": ["2020-03-15", "2019-07-22", "2021-01-05", "2018-05-30", "2020-11-11"]
-    })
+        return [], [], {}, ""
 
 
 def apply_expression_to_dataframe(df, expr):
-    """Apply the expression to the DataFrame and return the result"""
+    """
+    Apply the expression to the DataFrame.
+
+    Returns:
+        SharedResult: The result, shared with the other pages evaluating it on ``df``, or None
+    """
     try:
-        # Create a shallow copy of the dataframe to avoid mutable borrowing issues
-        df_copy = df.clone()
-        # Apply the expression to the copy instead of the original
-        expr_obj = simple_function_to_expr(expr)
-        result = df_copy.select(expr_obj.alias("result"))
-
-        # Convert to pandas early to avoid mutable borrowing errors later in streamlit
-        result_pandas = result.to_pandas()
-        return result_pandas
+        # Checked against the schema of the data first, a failing formula never runs on it
+        compiled = compile_formula(expr, page=PAGE, schema=df.schema)
+        return evaluate(df, compiled, page=PAGE)
     except Exception as e:
+        increment("error", PAGE)
         st.error(f"Error applying expression: {str(e)}")
         return None
 
@@ -348,10 +312,6 @@ def show_tree_visualizer_page():
     the expression tree. Enter an expression below and see its tree structure.
     """)
 
-    # Sample DataFrame for demonstration
-    if 'sample_df' not in st.session_state:
-        st.session_state.sample_df = create_sample_dataframe()
-
     # User can enter a custom expression
     custom_expr = st.text_area(
         "Enter your expression:",
@@ -359,50 +319,64 @@ def show_tree_visualizer_page():
         height=100,
         help="Enter a Polars Expression Transformer expression. Use [column_name] for columns."
     )
+    live_update = st.checkbox(
+        "Update while typing",
+        key="tree_live_update",
+        help="Redraw the tree whenever the expression changes. Unchanged parts of the tree stay where they are."
+    )
 
     # Show sample data
     st.subheader("Sample Data")
-    # Convert polars to pandas for safer display
-    sample_df_pandas = st.session_state.sample_df.to_pandas()
-    st.dataframe(sample_df_pandas, use_container_width=True)
-
-    # Visualize button
-    if st.button("Visualize Expression", type="primary"):
+    show_dataframe(sample_table(), page=PAGE, use_container_width=True)
+
+    # Visualize button, or any change of the expression while updating live
+    visualize = st.button("Visualize Expression", type="primary")
+    if live_update and custom_expr != st.session_state.get('custom_expr'):
+        visualize = True
+    if visualize:
+        increment("visualize", PAGE)
         with st.spinner("Processing expression..."):
             # Add error handling around the entire process
             try:
-                # Visualize the expression tree
-                nodes, edges, text_viz = visualize_expression(custom_expr)
+                # Visualize the expression tree, a failing expression leaves the last tree in place
+                nodes, edges, subtrees, text_viz = visualize_expression(
+                    custom_expr, st.session_state.get('custom_subtrees'))
+                st.session_state.custom_expr = custom_expr
                 if nodes:
+                    with timed("diff_graph", PAGE):
+                        st.session_state.graph_diff = diff_graphs(st.session_state.get('custom_nodes', []), nodes)
                     st.session_state.custom_nodes = nodes
                     st.session_state.custom_edges = edges
+                    st.session_state.custom_subtrees = subtrees
                     st.session_state.text_viz = text_viz
+                    mark_cached('custom_nodes', 'custom_edges', 'custom_subtrees', 'text_viz')
 
                     # Try to apply the expression to the sample data
-                    result_df = apply_expression_to_dataframe(st.session_state.sample_df, custom_expr)
-                    if result_df is not None:
-                        st.session_state.custom_result = result_df
+                    result = apply_expression_to_dataframe(sample_dataset(), custom_expr)
+                    if result is not None:
+                        st.session_state.custom_result = result
 
                         # Get the equivalent Polars code
-                        func_obj = build_func(custom_expr)
-                        polars_expr = func_obj.get_readable_pl_function()
+                        polars_expr = compile_formula(custom_expr, readable=True, page=PAGE).readable
                         st.session_state.custom_polars = polars_expr
+                        mark_cached('custom_result', 'custom_polars')
             except Exception as e:
                 st.error(f"An error occurred during visualization: {str(e)}")
 
     # Display results if available
     if 'custom_nodes' in st.session_state and 'custom_edges' in st.session_state:
+        touch('custom_nodes', 'custom_edges', 'custom_subtrees', 'text_viz')
+        touch('custom_result', 'custom_polars')
         col1, col2 = st.columns([1, 2])
 
         with col1:
             if 'custom_result' in st.session_state:
                 st.subheader("Expression Result")
-                # Already converted to pandas in the apply_expression_to_dataframe function
-                st.dataframe(st.session_state.custom_result, use_container_width=True)
+                show_dataframe(st.session_state.custom_result.table, page=PAGE, use_container_width=True)
 
                 if 'custom_polars' in st.session_state:
                     st.code(
-                        f"# Equivalent Polars code\nexpression = {st.session_state.custom_polars}\ndf.select(expression.alias('result'))",
+                        f"# Equivalent Polars code\nexpression = {st.session_state.custom_polars}\ndf.with_columns(expression.alias('result'))",
                         language="python")
 
         with col2:
@@ -443,12 +417,16 @@ def show_tree_visualizer_page():
             with st.expander("Expression Tree", expanded=True):
                 # Use agraph to display the visualization
                 # Wrap in a container with fixed height to prevent large graphs from expanding too much
-                with st.container(height=450):
+                with st.container(height=450), timed("render_graph", PAGE):
                     return_value = agraph(
                         nodes=st.session_state.custom_nodes,
                         edges=st.session_state.custom_edges,
                         config=config
                     )
+                if 'graph_diff' in st.session_state:
+                    diff = st.session_state.graph_diff
+                    st.caption(f"{len(diff.added)} nodes added, {len(diff.removed)} removed, "
+                               f"{len(diff.kept)} unchanged")
 
             # Add an expander for the text visualization
             with st.expander("Text Visualization", expanded=True):
@@ -0,0 +1,241 @@
+"""
+Diagnostics of formulas that cannot be compiled or do not fit the data.
+
+``check_syntax`` reads the formula text once, before it is parsed, and finds the
+usual mistakes with their position: an unclosed text or column reference, a
+stray parenthesis, an ``endif`` without ``if``, an unknown function, a wrong
+number of arguments or an operator without a value after it. It only reports
+what the parser rejects too, which accepts an ``if`` whose ``endif`` is left out.
+
+``check_schema`` evaluates a built expression on an empty frame of the schema
+it runs on, which finds unknown columns and type mismatches without touching
+the data.
+
+Both return a ``Diagnostic``, which the formula engine caches with the compiled
+formula, so a formula that fails is not parsed or executed again to fail again.
+"""
+import difflib
+import inspect
+import re
+from dataclasses import dataclass, replace
+from typing import Optional
+
+import polars as pl
+from polars_expr_transformer.configs.settings import funcs
+
+# Words of the if syntax, the parser only knows them in lower case
+IF_KEYWORDS = {"if", "then", "else", "elseif", "endif"}
+
+# Words that are not functions, even when a parenthesis follows
+KEYWORDS = IF_KEYWORDS | {"and", "or", "in", "not"}
+
+# Operators that need a value on both sides
+_OPERATOR = re.compile(r"==|!=|<=|>=|[-+*/%<>=&|]")
+
+_WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+# Errors Polars raises when a function gets a column of the wrong type
+_DTYPE_ERRORS = (pl.exceptions.SchemaError, pl.exceptions.InvalidOperationError, pl.exceptions.ComputeError)
+
+
+@dataclass(frozen=True)
+class Diagnostic:
+    """
+    Why a formula cannot be used.
+
+    Attributes:
+        kind: "parse_error", "unknown_function", "unknown_column" or "dtype_mismatch"
+        message: Explanation for the user, with the position when known
+        position: Offset in the formula the problem starts at, or None
+        name: The unknown function or column, or None
+    """
+    kind: str
+    message: str
+    position: Optional[int] = None
+    name: Optional[str] = None
+
+
+class FormulaError(ValueError):
+    """Raised for a formula with a ``Diagnostic``, ``str()`` gives its message"""
+
+    def __init__(self, diagnostic):
+        super().__init__(diagnostic.message)
+        self.diagnostic = diagnostic
+
+
+def _at(formula, position):
+    """Position in words, " at line 2, column 5" or " at column 5\""""
+    line = formula.count("\n", 0, position)
+    column = position - (formula.rfind("\n", 0, position) + 1)
+    return f" at line {line + 1}, column {column + 1}" if "\n" in formula else f" at column {column + 1}"
+
+
+def _diagnostic(kind, message, formula, position=None, name=None):
+    if position is not None:
+        message += _at(formula, position)
+    return Diagnostic(kind=kind, message=message, position=position, name=name)
+
+
+def _arity(name):
+    """(fewest, most) arguments of the function ``name``, most is None when unlimited, or None if unknown"""
+    try:
+        parameters = inspect.signature(funcs[name]).parameters.values()
+    except (TypeError, ValueError):
+        return None
+    positional = [p for p in parameters if p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD)]
+    fewest = sum(1 for p in positional if p.default is p.empty)
+    unlimited = any(p.kind == p.VAR_POSITIONAL for p in parameters)
+    return fewest, None if unlimited else len(positional)
+
+
+def _unknown_function(formula, name, position):
+    diagnostic = _diagnostic("unknown_function", f"Unknown function '{name}'", formula, position, name)
+    close = difflib.get_close_matches(name.lower(), [f for f in funcs if not f.startswith(("_", "pl."))], n=1)
+    if close:
+        return replace(diagnostic, message=f"{diagnostic.message}, did you mean '{close[0]}'?")
+    return diagnostic
+
+
+def _next_token(formula, i):
+    """Position of the next character that is not blank or part of a comment, or len(formula)"""
+    while i < len(formula):
+        if formula.startswith("//", i):
+            end = formula.find("\n", i)
+            i = len(formula) if end == -1 else end
+        elif formula[i].isspace():
+            i += 1
+        else:
+            return i
+    return i
+
+
+def check_syntax(formula):
+    """
+    Find the mistakes in the text of a formula the parser would fail on.
+
+    Args:
+        formula: The formula, without its partition clause
+
+    Returns:
+        Optional[Diagnostic]: The first mistake found, or None
+    """
+    # Open parentheses as [position, function name or None, commas seen, value since the last comma]
+    calls = []
+    ifs = []
+    i = _next_token(formula, 0)
+    if i == len(formula):
+        return _diagnostic("parse_error", "The formula is empty", formula)
+
+    while i < len(formula):
+        char = formula[i]
+        if calls and not char.isspace() and char not in ",)":
+            calls[-1][3] = True
+
+        if formula.startswith("//", i):
+            i = _next_token(formula, i)
+            continue
+        if char in "'\"":
+            end = formula.find(char, i + 1)
+            if end == -1:
+                return _diagnostic("parse_error", "Text is not closed", formula, i)
+            i = end + 1
+            continue
+        if char == "[":
+            end = formula.find("]", i + 1)
+            if end == -1:
+                return _diagnostic("parse_error", "Column reference is not closed", formula, i)
+            i = end + 1
+            continue
+        if char == "]":
+            return _diagnostic("parse_error", "Unexpected ']'", formula, i)
+
+        if char == "(":
+            calls.append([i, None, 0, False])
+        elif char == "," and calls:
+            calls[-1][2] += 1
+            calls[-1][3] = False
+        elif char == ")":
+            if not calls:
+                return _diagnostic("parse_error", "Unexpected ')'", formula, i)
+            position, name, arguments, value = calls.pop()
+            if name is not None:
+                arguments += value
+                arity = _arity(name)
+                if arity is not None and (arguments < arity[0] or (arity[1] is not None and arguments > arity[1])):
+                    expected = (str(arity[0]) if arity[0] == arity[1] else
+                                f"at least {arity[0]}" if arity[1] is None else f"{arity[0]} to {arity[1]}")
+                    plural = "" if expected == "1" else "s"
+                    return _diagnostic("parse_error", f"{name}() takes {expected} argument{plural}, not {arguments}",
+                                       formula, position, name)
+
+        word = _WORD.match(formula, i) if char.isalpha() or char == "_" else None
+        if word is not None and (i == 0 or not (formula[i - 1].isalnum() or formula[i - 1] in "_.")):
+            name = word.group()
+            after = _next_token(formula, word.end())
+            if name.lower() in IF_KEYWORDS and name != name.lower():
+                return _diagnostic("parse_error", f"Write '{name.lower()}' in lower case", formula, i)
+            if name == "if":
+                ifs.append(i)
+            elif name == "endif":
+                if not ifs:
+                    return _diagnostic("parse_error", "'endif' without 'if'", formula, i)
+                ifs.pop()
+            elif name in IF_KEYWORDS and not ifs:
+                return _diagnostic("parse_error", f"'{name}' outside of an if", formula, i)
+            elif after < len(formula) and formula[after] == "(" and name.lower() not in KEYWORDS:
+                if name not in funcs:
+                    return _unknown_function(formula, name, i)
+                calls.append([i, name, 0, False])
+                i = after + 1
+                continue
+            i = word.end()
+            continue
+
+        operator = _OPERATOR.match(formula, i)
+        if operator is not None:
+            after = _next_token(formula, operator.end())
+            if after == len(formula) or formula[after] in "),":
+                return _diagnostic("parse_error", f"Missing a value after '{operator.group()}'", formula, i)
+            i = operator.end()
+            continue
+        i += 1
+
+    # The parser closes the parentheses and ifs left open at the end itself
+    return None
+
+
+def parse_failure(formula, error):
+    """Diagnostic of a formula ``check_syntax`` passed but the parser failed on"""
+    return Diagnostic(kind="parse_error", message=f"The formula could not be parsed: {error}")
+
+
+def check_schema(formula, expr, schema):
+    """
+    Evaluate ``expr`` on an empty frame with the columns it reads from ``schema``.
+
+    Args:
+        formula: The formula ``expr`` was built from, to locate unknown columns
+        expr: The Polars expression
+        schema: Schema of the frame the expression runs on
+
+    Returns:
+        tuple: (the type the expression returns, or None, and a Diagnostic, or None)
+    """
+    columns = expr.meta.root_names()
+    missing = [name for name in columns if name not in schema]
+    if missing:
+        name = missing[0]
+        position = formula.find(f"[{name}]")
+        diagnostic = _diagnostic("unknown_column", f"Unknown column '{name}'", formula,
+                                 position if position != -1 else None, name)
+        close = difflib.get_close_matches(name, list(schema), n=1)
+        if close:
+            diagnostic = replace(diagnostic, message=f"{diagnostic.message}, did you mean '{close[0]}'?")
+        return None, diagnostic
+    try:
+        dtype = pl.DataFrame(schema={name: schema[name] for name in columns}).select(expr).dtypes[0]
+    except pl.exceptions.ColumnNotFoundError as e:
+        return None, Diagnostic(kind="unknown_column", message=f"Unknown column: {str(e).splitlines()[0]}")
+    except _DTYPE_ERRORS as e:
+        return None, Diagnostic(kind="dtype_mismatch", message=str(e).splitlines()[0])
+    return dtype, None
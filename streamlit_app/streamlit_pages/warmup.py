@@ -0,0 +1,143 @@
+"""
+Warm-up of the formula engine, run once per server process in a background thread.
+
+Warming up imports Polars and every module of ``streamlit_pages``, builds the
+function catalog index and the static documentation, compiles every formula
+shipped with the app into the formula engine cache, for the schemas of the data
+the pages run it on, and runs each on the first rows of that data. Enable it with
+``EXPR_DEMO_WARMUP=1``, or start the server through this module so the warm-up
+begins before the first session connects:
+
+    cd streamlit_app && python -m streamlit_pages.warmup [streamlit run options]
+"""
+import importlib
+import logging
+import os
+import pkgutil
+import sys
+import threading
+import time
+
+from streamlit_pages.instrumentation import timed, increment
+
+WARMUP_ENV = "EXPR_DEMO_WARMUP"
+
+# Rows of the page data the corpus formulas are run on
+WARMUP_ROWS = 8
+
+logger = logging.getLogger(__name__)
+
+# streamlit-agraph registers its component on import, which only works from a script run
+SCRIPT_RUN_MODULES = {"tree_visualizer", "warmup"}
+
+_lock = threading.Lock()
+_thread = None
+_status = {"state": "not started"}
+
+
+def warmup_enabled():
+    """Whether ``EXPR_DEMO_WARMUP`` asks for a warm-up"""
+    return os.environ.get(WARMUP_ENV, "").lower() in ("1", "true", "yes", "on")
+
+
+def get_warmup_status():
+    """
+    Progress of the warm-up of this process.
+
+    Returns:
+        dict: The state ("not started", "running", "done" or "failed"), the number of
+        formulas compiled, executed and failed, and the duration in seconds once finished
+    """
+    with _lock:
+        return dict(_status)
+
+
+def _update_status(**values):
+    with _lock:
+        _status.update(values)
+
+
+def _package_modules():
+    """Modules of the ``streamlit_pages`` package that can be imported outside a script run"""
+    package = importlib.import_module(__package__)
+    return [f"{__package__}.{info.name}" for info in pkgutil.iter_modules(package.__path__)
+            if info.name not in SCRIPT_RUN_MODULES]
+
+
+def run_warmup():
+    """Warm up the process in the calling thread"""
+    start = time.perf_counter()
+    _update_status(state="running", compiled=0, executed=0, failed=0)
+    try:
+        with timed("warmup_imports", "warmup"):
+            for module_name in _package_modules():
+                importlib.import_module(module_name)
+            # Imported here so that importing this module from main.py stays cheap
+            from streamlit_pages.data_transform import load_sample_data
+            from streamlit_pages.documentation import compile_docs_page
+            from streamlit_pages.evaluation import sample_dataset
+            from streamlit_pages.formula_corpus import iter_corpus_formulas
+            from streamlit_pages.formula_engine import compile_formula
+            from streamlit_pages.function_catalog import get_function_index
+
+        with timed("warmup_static", "warmup"):
+            get_function_index()
+            compile_docs_page()
+
+        # The pages compile for the schema of their data, which checks and adapts the expression to it
+        frames = [sample_dataset().head(WARMUP_ROWS), load_sample_data().head(WARMUP_ROWS)]
+        compiled = executed = failed = 0
+        with timed("warmup_corpus", "warmup"):
+            for record in iter_corpus_formulas():
+                try:
+                    expr = compile_formula(record["formula"], readable=True, page="warmup").expr
+                    compiled += 1
+                    # Documentation snippets may use columns of neither page's data
+                    columns = set(expr.meta.root_names())
+                    for frame in frames:
+                        if columns <= set(frame.columns):
+                            checked = compile_formula(record["formula"], page="warmup", schema=frame.schema)
+                            frame.select(checked.expr.alias("result"))
+                            executed += 1
+                except Exception as e:
+                    failed += 1
+                    logger.warning("Warm-up of %r failed: %s", record["formula"], e)
+                _update_status(compiled=compiled, executed=executed, failed=failed)
+    except Exception as e:
+        increment("warmup_failed", "warmup")
+        _update_status(state="failed", error=str(e), seconds=time.perf_counter() - start)
+        logger.exception("Warm-up failed")
+        return
+
+    seconds = time.perf_counter() - start
+    _update_status(state="done", seconds=seconds)
+    logger.info("Warm-up done in %.2f s: %d formulas compiled, %d executed, %d failed",
+                seconds, compiled, executed, failed)
+
+
+def start_warmup():
+    """
+    Start the warm-up in a background thread, once per process.
+
+    Returns:
+        threading.Thread: The warm-up thread
+    """
+    global _thread
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(target=run_warmup, name="warmup", daemon=True)
+            _thread.start()
+        return _thread
+
+
+if __name__ == "__main__":
+    # Start the warm-up, then the Streamlit server in this same process
+    from streamlit.web import cli as stcli
+
+    # Go through the package module, which is the one main.py and the diagnostics panel see
+    from streamlit_pages import warmup
+
+    warmup.start_warmup()
+    main_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+    sys.argv = ["streamlit", "run", main_path] + sys.argv[1:]
+    sys.exit(stcli.main())
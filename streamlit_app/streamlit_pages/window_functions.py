@@ -0,0 +1,239 @@
+"""
+Aggregate and window functions added to the formula language.
+
+On their own they aggregate over every row, so ``[salary] / sum([salary])`` is
+each salary's share of the total. Followed by a partition clause they are
+computed per group with Polars ``.over()``, so
+``[salary] / sum([salary]) over [city]`` is the share within the city.
+
+Only the window function calls get ``.over()``, the row-wise rest of the formula
+is the same in every partition. Polars then broadcasts one value per group
+instead of splitting and scattering back every operand.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+import polars as pl
+from polars_expr_transformer.configs.settings import funcs
+
+# Partition columns of the formula being built, set by ``partitioned``
+_partition_by = ContextVar("partition_by", default=())
+
+
+@contextmanager
+def partitioned(columns):
+    """Build the window functions called inside the block over ``columns``"""
+    token = _partition_by.set(tuple(columns))
+    try:
+        yield
+    finally:
+        _partition_by.reset(token)
+
+
+def _over(expr):
+    partition_by = _partition_by.get()
+    return expr.over(list(partition_by)) if partition_by else expr
+
+
+def sum(value: Any) -> pl.Expr:
+    """
+    Adds up a value over all rows, or over each partition with "over [column]".
+
+    For example, [salary] / sum([salary]) over [city] is the share of each salary within its city.
+
+    Parameters:
+    - value: The value to add up
+
+    Returns:
+    - The total
+    """
+    return _over(value.sum())
+
+
+def mean(value: Any) -> pl.Expr:
+    """
+    Calculates the average of a value over all rows, or over each partition with "over [column]".
+
+    For example, [salary] - mean([salary]) over [city] is the difference with the city average.
+
+    Parameters:
+    - value: The value to average
+
+    Returns:
+    - The average
+    """
+    return _over(value.mean())
+
+
+def median(value: Any) -> pl.Expr:
+    """
+    Calculates the median of a value over all rows, or over each partition with "over [column]".
+
+    For example, median([age]) over [city] would return the median age of each city.
+
+    Parameters:
+    - value: The value to take the median of
+
+    Returns:
+    - The median
+    """
+    return _over(value.median())
+
+
+def smallest(value: Any) -> pl.Expr:
+    """
+    Gets the smallest value over all rows, or over each partition with "over [column]".
+
+    For example, smallest([joined_date]) over [city] would return the first join date of each city.
+
+    Parameters:
+    - value: The value to take the minimum of
+
+    Returns:
+    - The smallest value
+    """
+    return _over(value.min())
+
+
+def largest(value: Any) -> pl.Expr:
+    """
+    Gets the largest value over all rows, or over each partition with "over [column]".
+
+    For example, [salary] = largest([salary]) over [city] is true for the top earner of each city.
+
+    Parameters:
+    - value: The value to take the maximum of
+
+    Returns:
+    - The largest value
+    """
+    return _over(value.max())
+
+
+def count(value: Any) -> pl.Expr:
+    """
+    Counts the non-empty values over all rows, or over each partition with "over [column]".
+
+    For example, count([name]) over [city] would return the number of people in each city.
+
+    Parameters:
+    - value: The value to count
+
+    Returns:
+    - The number of non-empty values
+    """
+    return _over(value.count())
+
+
+def n_unique(value: Any) -> pl.Expr:
+    """
+    Counts the distinct values over all rows, or over each partition with "over [column]".
+
+    For example, n_unique([city]) would return the number of different cities.
+
+    Parameters:
+    - value: The value to count
+
+    Returns:
+    - The number of distinct values
+    """
+    return _over(value.n_unique())
+
+
+def rank(value: Any) -> pl.Expr:
+    """
+    Ranks a value from smallest to largest, equal values share the lowest rank.
+
+    For example, rank([salary]) over [city] would return 1 for the lowest salary of each city.
+
+    Parameters:
+    - value: The value to rank
+
+    Returns:
+    - The rank, starting at 1
+    """
+    return _over(value.rank("min"))
+
+
+def cum_sum(value: Any) -> pl.Expr:
+    """
+    Calculates the running total of a value, in row order.
+
+    For example, cum_sum([salary]) over [city] would return the running total of salaries per city.
+
+    Parameters:
+    - value: The value to add up
+
+    Returns:
+    - The running total
+    """
+    return _over(value.cum_sum())
+
+
+def row_number() -> pl.Expr:
+    """
+    Numbers the rows, in row order.
+
+    For example, row_number() over [city] would number the people of each city 1, 2, 3 and so on.
+
+    Returns:
+    - The row number, starting at 1
+    """
+    return _over(pl.int_range(1, pl.len() + 1))
+
+
+def lag(value: Any, offset: int) -> pl.Expr:
+    """
+    Gets the value of an earlier row.
+
+    For example, lag([salary], 1) over [city] would return the salary of the previous person in the same city.
+
+    Parameters:
+    - value: The value to look up
+    - offset: How many rows back
+
+    Returns:
+    - The earlier value, or empty for the first rows
+    """
+    return _over(value.shift(offset))
+
+
+def lead(value: Any, offset: int) -> pl.Expr:
+    """
+    Gets the value of a later row.
+
+    For example, lead([salary], 1) over [city] would return the salary of the next person in the same city.
+
+    Parameters:
+    - value: The value to look up
+    - offset: How many rows ahead
+
+    Returns:
+    - The later value, or empty for the last rows
+    """
+    return _over(value.shift(-offset))
+
+
+# The tokenizer splits on "in", "and" and "or" anywhere in a word, so names
+# like min or count_distinct cannot be parsed and smallest or n_unique are used
+window_functions = {
+    "sum": sum,
+    "mean": mean,
+    "median": median,
+    "smallest": smallest,
+    "largest": largest,
+    "count": count,
+    "n_unique": n_unique,
+    "rank": rank,
+    "cum_sum": cum_sum,
+    "row_number": row_number,
+    "lag": lag,
+    "lead": lead,
+}
+
+
+def register_window_functions():
+    """Make the functions available to ``build_func``, which looks every function name up in ``funcs``"""
+    for name, func in window_functions.items():
+        funcs.setdefault(name, func)
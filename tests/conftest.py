@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The app imports its modules as ``streamlit_pages.*`` from the streamlit_app folder
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "streamlit_app"))
@@ -0,0 +1,82 @@
+import importlib.util
+import json
+
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+
+from streamlit_pages.codegen import CSE_PREFIX, generate_module
+from streamlit_pages.formula_engine import compile_formula
+
+RECIPE = [
+    ("Add column", "[salary] * 1.1", "raised"),
+    ("Add column", "if [age] > 40 then 'Senior' else 'Junior' endif", "band"),
+    ("Add column", "uppercase([name])", "upper"),
+    ("Add column", "string_similarity([name], 'Anna', 'jaro')", "similarity"),
+    # Repeated within one with_columns, becomes a helper column
+    ("Add column", "([salary] + [age]) * 2", "double"),
+    ("Add column", "([salary] + [age]) * 3", "triple"),
+    ("Filter rows", "[raised] > 50000", None),
+    ("Add column", "[raised] / sum([raised]) over [city]", "share"),
+]
+
+
+@pytest.fixture
+def frame():
+    return pl.DataFrame({
+        "name": ["Anna", "Bob", "Annie", None, "Carl", "Dora"],
+        "city": ["Paris", "Oslo", "Paris", "Oslo", "Rome", "Paris"],
+        "age": [30, 45, 28, 61, 52, 39],
+        "salary": [52000, 81000, 40000, 95000, 61000, 47000],
+    })
+
+
+def expected_result(frame, recipe):
+    """The recipe applied one formula at a time, as the Data Transformer does"""
+    for action, formula, column in recipe:
+        expr = compile_formula(formula).expr
+        frame = frame.with_columns(expr.alias(column)) if action == "Add column" else frame.filter(expr)
+    return frame
+
+
+def load_module(path):
+    spec = importlib.util.spec_from_file_location("pipeline", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_generated_module_matches_the_formulas(frame, tmp_path):
+    source = tmp_path / "data.parquet"
+    frame.write_parquet(source)
+    path = tmp_path / "pipeline.py"
+    path.write_text(generate_module(RECIPE, str(source)))
+
+    result = load_module(path).run()
+
+    assert CSE_PREFIX in path.read_text()
+    assert not any(column.startswith(CSE_PREFIX) for column in result.columns)
+    assert_frame_equal(result, expected_result(frame, RECIPE), check_row_order=False)
+
+
+def test_output_columns_drop_unused_steps(frame, tmp_path):
+    source = tmp_path / "data.csv"
+    frame.write_csv(source)
+    module = generate_module(RECIPE, str(source), output_columns=["name", "band"])
+    path = tmp_path / "pipeline.py"
+    path.write_text(module)
+
+    result = load_module(path).run()
+
+    assert "string_similarity" in module and "pl_jaro" not in module
+    assert_frame_equal(result, expected_result(frame, RECIPE).select("name", "band"), check_row_order=False)
+
+
+def test_plugin_library_is_found_where_the_module_runs(tmp_path):
+    module = generate_module([("Add column", "string_similarity([name], 'Anna', 'jaro')", "similarity")],
+                             str(tmp_path / "data.parquet"), schema={"name": pl.String})
+
+    plugin = json.loads(compile_formula("string_similarity([name], 'Anna', 'jaro')").expr.meta.serialize(
+        format="json"))["Function"]["function"]["FfiPlugin"]
+    assert plugin["lib"] not in module
+    assert "polars_ds:" in module
@@ -0,0 +1,103 @@
+import polars as pl
+import pytest
+from polars.testing import assert_series_equal
+from polars_expr_transformer.process.polars_expr_transformer import build_func
+
+from streamlit_pages.dictionary_encoding import (
+    MAX_CATEGORIES, MAX_CATEGORY_RATIO, encode_low_cardinality, on_dictionary
+)
+
+
+@pytest.fixture
+def frame():
+    return pl.DataFrame({
+        "name": ["Anna", "Bob", "Cleo", "Dan", "Eve", "Finn", "Gus", "Hana"],
+        "city": ["Paris", "Oslo", None, "Paris", "Rome", "Oslo", "Paris", None],
+        "age": [30, 45, 28, 61, 52, 39, 33, 47],
+    })
+
+
+def test_low_cardinality_text_is_encoded(frame):
+    encoded = encode_low_cardinality(frame)
+
+    # Nulls are no category, and stay null
+    assert encoded.schema["city"] == pl.Enum(["Oslo", "Paris", "Rome"])
+    assert encoded.get_column("city").cast(pl.String).to_list() == frame.get_column("city").to_list()
+    assert encoded.schema["name"] == pl.String
+    assert encoded.schema["age"] == pl.Int64
+
+
+def test_category_ratio_limit():
+    height = 10
+    at_limit = int(MAX_CATEGORY_RATIO * height)
+    frame = pl.DataFrame({
+        "at_limit": [f"v{i % at_limit}" for i in range(height)],
+        "over_limit": [f"v{i % (at_limit + 1)}" for i in range(height)],
+    })
+
+    encoded = encode_low_cardinality(frame)
+
+    assert isinstance(encoded.schema["at_limit"], pl.Enum)
+    assert encoded.schema["over_limit"] == pl.String
+
+
+def test_category_count_limit():
+    height = 2 * (MAX_CATEGORIES + 1)
+    frame = pl.DataFrame({
+        "at_limit": [f"v{i % MAX_CATEGORIES}" for i in range(height)],
+        "over_limit": [f"v{i % (MAX_CATEGORIES + 1)}" for i in range(height)],
+    })
+
+    encoded = encode_low_cardinality(frame)
+
+    assert len(encoded.schema["at_limit"].categories) == MAX_CATEGORIES
+    assert encoded.schema["over_limit"] == pl.String
+
+
+def test_empty_frame_is_not_encoded():
+    frame = pl.DataFrame({"city": pl.Series([], dtype=pl.String)})
+    assert encode_low_cardinality(frame).schema == frame.schema
+
+
+@pytest.mark.parametrize("formula, looked_up", [
+    ("contains([city], 'o')", True),
+    ("uppercase([city])", True),
+    ("concat([city], '!')", True),
+    ("length([city])", True),
+    ("left([city], 2) = 'Pa'", True),
+    # Turns null into a value, which the null rows pick separately
+    ("if is_empty([city]) then 'none' else [city] endif", True),
+    # Compared on the codes
+    ("[city] = 'Paris'", False),
+    ("is_empty([city])", False),
+    # Reads another column as well, only the encoded column itself is looked up
+    ("concat([city], [name])", True),
+    ("if [age] > 40 then [city] else 'young' endif", True),
+])
+def test_lookup_matches_the_plain_strings(frame, formula, looked_up):
+    expr = build_func(formula).get_pl_func()
+    encoded = encode_low_cardinality(frame)
+
+    rewritten, used = on_dictionary(expr, encoded.schema)
+
+    assert used == (["city"] if looked_up else [])
+    assert_series_equal(encoded.select(rewritten).to_series(), frame.select(expr).to_series())
+
+
+def test_lookup_after_a_filter(frame):
+    # The categories of the Enum stay when no row has them anymore
+    encoded = encode_low_cardinality(frame).filter(pl.col("age") < 50)
+    expr = build_func("uppercase([city])").get_pl_func()
+
+    rewritten, used = on_dictionary(expr, encoded.schema)
+
+    assert used == ["city"]
+    assert_series_equal(encoded.select(rewritten).to_series(),
+                        frame.filter(pl.col("age") < 50).select(expr).to_series())
+
+
+def test_plain_schema_keeps_the_expression(frame):
+    expr = build_func("uppercase([city])").get_pl_func()
+    rewritten, used = on_dictionary(expr, frame.schema)
+    assert rewritten is expr
+    assert used == []
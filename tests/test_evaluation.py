@@ -0,0 +1,162 @@
+import gc
+import threading
+
+import polars as pl
+import pytest
+
+from streamlit_pages import evaluation
+from streamlit_pages.evaluation import (
+    RESULT_CACHE_ENV, clear_result_cache, evaluate, evaluate_many, get_result_cache_budget, get_result_cache_usage
+)
+from streamlit_pages.formula_engine import compile_formula
+from streamlit_pages.instrumentation import get_counters, reset_metrics
+
+PAGE = "test_evaluation"
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    clear_result_cache()
+    reset_metrics()
+    yield
+    clear_result_cache()
+    reset_metrics()
+
+
+@pytest.fixture
+def frame():
+    return pl.DataFrame({"a": range(10_000)})
+
+
+def counter(name):
+    return sum(c["value"] for c in get_counters() if c["counter"] == name and c["page"] == PAGE)
+
+
+class CountingPrepare:
+    """A ``prepare`` that counts the formulas evaluated"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, expr, frame):
+        self.calls += 1
+        return expr, frame
+
+
+class WatchedEvent:
+    """Stands in for the event of a pending result, tells when someone waits on it"""
+
+    def __init__(self, event):
+        self.event = event
+        self.waiting = threading.Event()
+
+    def wait(self):
+        self.waiting.set()
+        return self.event.wait()
+
+
+def test_results_are_shared(frame):
+    first, second = evaluate_many(frame, [compile_formula("[a] + 1"), compile_formula("[a] * 2")], page=PAGE)
+
+    assert first.series.to_list()[:3] == [1, 2, 3]
+    assert second.series.to_list()[:3] == [0, 2, 4]
+    assert evaluate(frame, compile_formula("[a] * 2"), page=PAGE) is second
+    assert counter("result_cache_miss") == 2
+    assert counter("result_cache_hit") == 1
+
+
+def test_concurrent_requests_compute_once(frame):
+    compiled = compile_formula("[a] + 1")
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def prepare(expr, source):
+        calls.append(threading.current_thread().name)
+        started.set()
+        release.wait(5)
+        return expr, source
+
+    results = {}
+
+    def run(name):
+        results[name] = evaluate(frame, compiled, page=PAGE, prepare=prepare)
+
+    owner = threading.Thread(target=run, args=("owner",), name="owner")
+    owner.start()
+    assert started.wait(5)
+    key = (id(frame), compiled.formula)
+    watched = evaluation._pending[key] = WatchedEvent(evaluation._pending[key])
+    other = threading.Thread(target=run, args=("other",), name="other")
+    other.start()
+    assert watched.waiting.wait(5)
+    release.set()
+    owner.join(5)
+    other.join(5)
+
+    assert calls == ["owner"]
+    assert results["owner"] is results["other"]
+    assert counter("result_cache_miss") == 1
+    assert counter("result_cache_hit") == 1
+
+
+def test_results_of_a_dropped_frame_are_evicted():
+    # Not the fixture, which pytest keeps alive until the test ends
+    frame = pl.DataFrame({"a": range(10_000)})
+    result = evaluate(frame, compile_formula("[a] + 1"), page=PAGE)
+    assert get_result_cache_usage() == result.series.estimated_size()
+
+    del frame
+    gc.collect()
+
+    assert get_result_cache_usage() == 0
+
+
+def test_result_is_not_shared_with_another_frame(frame):
+    compiled = compile_formula("[a] + 1")
+    result = evaluate(frame, compiled, page=PAGE)
+    assert evaluate(frame.clone(), compiled, page=PAGE) is not result
+
+
+def test_over_budget_evicts_least_recently_used(frame, monkeypatch):
+    size = frame.get_column("a").estimated_size()
+    # Room for two results, not three
+    monkeypatch.setenv(RESULT_CACHE_ENV, str(2.5 * size / 2 ** 20))
+    assert get_result_cache_budget() < 3 * size
+    prepare = CountingPrepare()
+    one, two, three = (compile_formula(f"[a] + {i}") for i in (1, 2, 3))
+
+    evaluate(frame, one, PAGE, prepare)
+    evaluate(frame, two, PAGE, prepare)
+    evaluate(frame, one, PAGE, prepare)
+    evaluate(frame, three, PAGE, prepare)
+    assert prepare.calls == 3
+    assert get_result_cache_usage() <= get_result_cache_budget()
+
+    # two was used least recently, one is still kept
+    evaluate(frame, one, PAGE, prepare)
+    assert prepare.calls == 3
+    evaluate(frame, two, PAGE, prepare)
+    assert prepare.calls == 4
+
+
+def test_result_over_the_whole_budget_is_kept_alone(frame, monkeypatch):
+    monkeypatch.setenv(RESULT_CACHE_ENV, "0.001")
+    prepare = CountingPrepare()
+    compiled = compile_formula("[a] + 1")
+
+    evaluate(frame, compiled, PAGE, prepare)
+    evaluate(frame, compiled, PAGE, prepare)
+
+    assert prepare.calls == 1
+
+
+def test_results_of_the_current_time_are_not_kept(frame):
+    compiled = compile_formula("today()")
+    prepare = CountingPrepare()
+
+    evaluate(frame, compiled, PAGE, prepare)
+    evaluate(frame, compiled, PAGE, prepare)
+
+    assert compiled.volatile
+    assert prepare.calls == 2
+    assert get_result_cache_usage() == 0
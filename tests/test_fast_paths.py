@@ -0,0 +1,98 @@
+import polars as pl
+import pytest
+from polars.testing import assert_series_equal
+from polars_expr_transformer.process.polars_expr_transformer import build_func
+
+from streamlit_pages.fast_paths import MIN_LOOKUP_BRANCHES, MIN_THRESHOLD_BRANCHES, specialize
+
+CITIES = [f"City {i}" for i in range(30)]
+
+
+@pytest.fixture
+def frame():
+    return pl.DataFrame({
+        # Every threshold below, the values around them, null and NaN
+        "salary": [None, float("nan"), -5.0, 0.0, 9.9, 10.0, 10.1, 20.0, 25.0, 30.0, 40.0, 50.0, 75.0],
+        "age": [None, 3, 10, 11, 19, 20, 21, 30, 39, 40, 41, 99, 0],
+        "city": [None, "City 0", "City 1", "City 19", "City 20", "City 29", "Elsewhere", "", "city 0",
+                 "City 5", "City 5", None, "City 18"],
+    })
+
+
+def threshold_ladder(column, op, thresholds):
+    conditions = " elseif ".join(f"[{column}] {op} {t} then 'band {i}'" for i, t in enumerate(thresholds))
+    return f"if {conditions} else 'other' endif"
+
+
+def lookup_ladder(branches, result=str):
+    conditions = " elseif ".join(f"[city] = '{city}' then {result(i)!r}" for i, city in enumerate(CITIES[:branches], 1))
+    return f"if {conditions} else {result(0)!r} endif"
+
+
+def evaluate(frame, formula):
+    """(result of the rewritten expression, result of the plain one, rewrites applied)"""
+    plain = build_func(formula).get_pl_func()
+    rewritten, applied = specialize(plain)
+    return frame.select(rewritten).to_series(), frame.select(plain).to_series(), applied
+
+
+@pytest.mark.parametrize("column", ["salary", "age"])
+@pytest.mark.parametrize("op, thresholds", [
+    (">", [40, 30, 20, 10]),
+    (">=", [40, 30, 20, 10]),
+    ("<", [10, 20, 30, 40]),
+    ("<=", [10, 20, 30, 40]),
+    (">", [50, 40, 30, 20, 10, 0]),
+])
+def test_threshold_ladder_becomes_cut(frame, column, op, thresholds):
+    rewritten, plain, applied = evaluate(frame, threshold_ladder(column, op, thresholds))
+    assert applied == ["threshold_ladder"]
+    assert_series_equal(rewritten, plain, check_names=False)
+
+
+def test_threshold_ladder_falls_through_to_else(frame):
+    rewritten, plain, _ = evaluate(frame, threshold_ladder("age", ">", [400, 300, 200, 100]))
+    assert set(plain.to_list()) == {"other"}
+    assert_series_equal(rewritten, plain, check_names=False)
+
+
+@pytest.mark.parametrize("formula", [
+    # Too few branches
+    threshold_ladder("salary", ">", [30, 20, 10][:MIN_THRESHOLD_BRANCHES - 1]),
+    # Thresholds out of order, or different operators or columns
+    threshold_ladder("salary", ">", [10, 20, 30, 40]),
+    "if [salary] > 40 then 'a' elseif [salary] >= 30 then 'b' elseif [salary] > 20 then 'c' "
+    "elseif [salary] > 10 then 'd' else 'e' endif",
+    "if [salary] > 40 then 'a' elseif [age] > 30 then 'b' elseif [salary] > 20 then 'c' "
+    "elseif [salary] > 10 then 'd' else 'e' endif",
+    # Repeated labels
+    "if [salary] > 40 then 'a' elseif [salary] > 30 then 'b' elseif [salary] > 20 then 'a' "
+    "elseif [salary] > 10 then 'd' else 'e' endif",
+])
+def test_other_ladders_are_kept(frame, formula):
+    rewritten, plain, applied = evaluate(frame, formula)
+    assert "threshold_ladder" not in applied
+    assert_series_equal(rewritten, plain, check_names=False)
+
+
+@pytest.mark.parametrize("branches", [MIN_LOOKUP_BRANCHES, len(CITIES)])
+@pytest.mark.parametrize("result", [str, int, float])
+def test_lookup_ladder_becomes_replace_strict(frame, branches, result):
+    rewritten, plain, applied = evaluate(frame, lookup_ladder(branches, result))
+    assert applied == ["lookup_ladder"]
+    # Nulls, unknown texts and a different case fall through to the else value
+    assert plain.to_list().count(result(0)) >= 5
+    assert_series_equal(rewritten, plain, check_names=False)
+
+
+def test_short_lookup_ladder_is_kept(frame):
+    rewritten, plain, applied = evaluate(frame, lookup_ladder(MIN_LOOKUP_BRANCHES - 1))
+    assert applied == []
+    assert_series_equal(rewritten, plain, check_names=False)
+
+
+def test_lookup_ladder_with_repeated_keys_is_kept(frame):
+    formula = lookup_ladder(MIN_LOOKUP_BRANCHES).replace("'City 1'", "'City 0'", 1)
+    rewritten, plain, applied = evaluate(frame, formula)
+    assert applied == []
+    assert_series_equal(rewritten, plain, check_names=False)
@@ -0,0 +1,104 @@
+import polars as pl
+import pytest
+from polars.testing import assert_series_equal
+from polars_expr_transformer.process.polars_expr_transformer import build_func
+
+from streamlit_pages.instrumentation import get_counters, reset_metrics
+from streamlit_pages.parsed_columns import PARSED_PREFIX, ParsedColumns, use_parsed_columns
+from streamlit_pages.transform_history import TransformationHistory
+
+PAGE = "test_parsed_columns"
+
+
+@pytest.fixture(autouse=True)
+def metrics():
+    reset_metrics()
+    yield
+    reset_metrics()
+
+
+@pytest.fixture
+def history():
+    return TransformationHistory(pl.DataFrame({
+        "name": ["a", "b", "c", "d"],
+        "joined_date": ["2020-01-15", None, "2021-06-30", "2019-12-01"],
+        "age": [30, 45, 28, 61],
+    }))
+
+
+def counter(name):
+    return sum(c["value"] for c in get_counters() if c["counter"] == name and c["page"] == PAGE)
+
+
+def evaluate(formula, history, cache):
+    """(result read from the parsed columns, result of the formula as built)"""
+    expr = build_func(formula).get_pl_func()
+    rewritten, frame = use_parsed_columns(expr, history.current, history, cache, page=PAGE)
+    return frame.select(rewritten).to_series(), history.current.select(expr).to_series()
+
+
+def test_parse_is_shared_by_formulas_on_the_same_version(history):
+    cache = ParsedColumns()
+
+    for formula in ("year(to_date([joined_date]))", "month(to_date([joined_date]))"):
+        result, expected = evaluate(formula, history, cache)
+        assert_series_equal(result, expected, check_names=False)
+
+    assert counter("parsed_column_miss") == 1
+    assert counter("parsed_column_hit") == 1
+
+
+def test_adding_another_column_keeps_the_parse(history):
+    cache = ParsedColumns()
+    evaluate("year(to_date([joined_date]))", history, cache)
+    history.add_column("[age] * 2", "double", history.current.get_column("age") * 2)
+
+    result, expected = evaluate("day(to_date([joined_date]))", history, cache)
+
+    assert_series_equal(result, expected, check_names=False)
+    assert counter("parsed_column_miss") == 1
+
+
+def test_filter_parses_again(history):
+    cache = ParsedColumns()
+    evaluate("year(to_date([joined_date]))", history, cache)
+    history.filter_rows("[age] > 29", history.current.filter(pl.col("age") > 29))
+
+    result, expected = evaluate("year(to_date([joined_date]))", history, cache)
+
+    assert len(result) == 3
+    assert_series_equal(result, expected, check_names=False)
+    assert counter("parsed_column_miss") == 2
+
+
+def test_overwritten_column_parses_again(history):
+    cache = ParsedColumns()
+    evaluate("year(to_date([joined_date]))", history, cache)
+    shifted = pl.Series(["2000-02-02", "2001-03-03", None, "2002-04-04"])
+    history.add_column("'shifted'", "joined_date", shifted)
+
+    result, expected = evaluate("year(to_date([joined_date]))", history, cache)
+
+    assert result.to_list() == [2000, 2001, None, 2002]
+    assert_series_equal(result, expected, check_names=False)
+    assert counter("parsed_column_miss") == 2
+
+    # One version is kept per parse, going back parses the original values again
+    history.undo()
+    evaluate("year(to_date([joined_date]))", history, cache)
+    assert counter("parsed_column_miss") == 3
+
+
+def test_formula_without_a_parse_is_left_alone(history):
+    expr = build_func("[age] + 1").get_pl_func()
+    rewritten, frame = use_parsed_columns(expr, history.current, history, ParsedColumns(), page=PAGE)
+    assert rewritten is expr
+    assert frame is history.current
+
+
+def test_parsed_columns_are_hidden_from_the_result(history):
+    expr = build_func("year(to_date([joined_date]))").get_pl_func()
+    rewritten, frame = use_parsed_columns(expr, history.current, history, ParsedColumns(), page=PAGE)
+    assert any(name.startswith(PARSED_PREFIX) for name in frame.columns)
+    assert not any(name.startswith(PARSED_PREFIX) for name in history.current.columns)
+    assert PARSED_PREFIX in str(rewritten)
@@ -0,0 +1,101 @@
+import json
+import os
+
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+
+from streamlit_pages.session_snapshot import (
+    SNAPSHOT_DIR_ENV, MANIFEST, save_snapshot, load_snapshot, new_token, prune_snapshots
+)
+from streamlit_pages.transform_history import TransformationHistory
+
+
+@pytest.fixture(autouse=True)
+def snapshot_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv(SNAPSHOT_DIR_ENV, str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def history():
+    base = pl.DataFrame({
+        "name": ["a", "b", "c", "d"],
+        "city": pl.Series(["Paris", "Oslo", "Paris", None], dtype=pl.Enum(["Oslo", "Paris"])),
+        "age": [30, 45, 28, 61],
+    })
+    history = TransformationHistory(base)
+    history.add_column("[age] * 2", "double", base.get_column("age") * 2)
+    history.filter_rows("[age] > 29", history.current.filter(pl.col("age") > 29))
+    history.add_column("[age] + 1", "age", history.current.get_column("age") + 1)
+    return history
+
+
+def test_round_trip(history):
+    token = new_token()
+    history.undo()
+    save_snapshot(history, token)
+
+    restored = load_snapshot(token)
+
+    assert restored is not None
+    assert restored.version == history.version == 2
+    assert [(s.action, s.formula, s.column) for s in restored.steps] == \
+        [(s.action, s.formula, s.column) for s in history.steps]
+    assert_frame_equal(restored.base, history.base)
+    for restored_step, step in zip(restored.steps, history.steps):
+        assert_frame_equal(restored_step.frame, step.frame)
+    assert_frame_equal(restored.current, history.current)
+    restored.redo()
+    history.redo()
+    assert_frame_equal(restored.current, history.current)
+
+
+def test_only_new_steps_are_written(history, snapshot_dir):
+    token = new_token()
+    save_snapshot(history, token)
+    folder = snapshot_dir / token
+    written = {name: os.path.getmtime(folder / name) for name in os.listdir(folder)}
+
+    # A new step after an undo replaces the step that could have been redone
+    history.undo()
+    history.add_column("[age] - 1", "younger", history.current.get_column("age") - 1)
+    save_snapshot(history, token)
+
+    files = set(os.listdir(folder))
+    manifest = json.loads((folder / MANIFEST).read_text())
+    assert files == {"base.arrow", MANIFEST} | {step["file"] for step in manifest["steps"]}
+    for step in manifest["steps"][:2]:
+        assert os.path.getmtime(folder / step["file"]) == written[step["file"]]
+    assert manifest["steps"][2]["file"] not in written
+    assert load_snapshot(token).current.columns == history.current.columns
+
+
+@pytest.mark.parametrize("token", [None, "", "short", "../../etc/passwd", "a" * 65, "token with spaces 123"])
+def test_invalid_token_is_rejected(history, token):
+    assert load_snapshot(token) is None
+    with pytest.raises(ValueError):
+        save_snapshot(history, token)
+
+
+def test_unknown_token_has_no_snapshot():
+    assert load_snapshot(new_token()) is None
+
+
+def test_damaged_snapshot_is_not_restored(history, snapshot_dir):
+    token = new_token()
+    save_snapshot(history, token)
+    manifest = json.loads((snapshot_dir / token / MANIFEST).read_text())
+    os.remove(snapshot_dir / token / manifest["steps"][0]["file"])
+    assert load_snapshot(token) is None
+
+
+def test_prune_deletes_old_snapshots(history, snapshot_dir):
+    old, recent = new_token(), new_token()
+    save_snapshot(history, old)
+    save_snapshot(history, recent)
+    os.utime(snapshot_dir / old / MANIFEST, (0, 0))
+
+    assert prune_snapshots() == 1
+    assert load_snapshot(old) is None
+    assert load_snapshot(recent) is not None
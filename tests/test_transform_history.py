@@ -0,0 +1,130 @@
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+
+from streamlit_pages.transform_history import TransformationHistory
+
+
+@pytest.fixture
+def base():
+    return pl.DataFrame({"name": ["a", "b", "c", "d"], "age": [30, 45, 28, 61]})
+
+
+def double_age(frame):
+    return frame.get_column("age") * 2
+
+
+def test_add_column_appends_a_version(base):
+    history = TransformationHistory(base)
+    current = history.add_column("[age] * 2", "double", double_age(base))
+
+    assert history.version == 1
+    assert history.current is current
+    assert current.columns == ["name", "age", "double"]
+    assert history.steps[0].action == "Add column"
+    assert history.steps[0].series.name == "double"
+    assert_frame_equal(current.select("name", "age"), base)
+
+
+def test_undo_redo_and_goto(base):
+    history = TransformationHistory(base)
+    first = history.add_column("[age] * 2", "double", double_age(base))
+    second = history.filter_rows("[age] > 30", first.filter(pl.col("age") > 30))
+
+    assert history.undo() is first
+    assert history.undo() is base
+    assert not history.can_undo
+    assert history.undo() is base
+    assert history.version == 0
+
+    assert history.redo() is first
+    assert history.redo() is second
+    assert not history.can_redo
+    assert history.redo() is second
+
+    assert history.goto(1) is first
+    assert history.goto(0) is base
+    with pytest.raises(ValueError):
+        history.goto(3)
+    with pytest.raises(ValueError):
+        history.goto(-1)
+
+
+def test_revision_changes_only_when_the_version_does(base):
+    history = TransformationHistory(base)
+    history.add_column("[age] * 2", "double", double_age(base))
+    revision = history.revision
+
+    history.goto(1)
+    assert history.revision == revision
+    history.undo()
+    assert history.revision == revision + 1
+
+
+def test_new_step_after_undo_drops_the_redo_steps(base):
+    history = TransformationHistory(base)
+    first = history.add_column("[age] * 2", "double", double_age(base))
+    history.add_column("[age] + 1", "older", base.get_column("age") + 1)
+    history.undo()
+
+    history.add_column("[age] - 1", "younger", first.get_column("age") - 1)
+
+    assert [step.formula for step in history.steps] == ["[age] * 2", "[age] - 1"]
+    assert history.version == 2
+    assert not history.can_redo
+    assert history.current.columns == ["name", "age", "double", "younger"]
+
+
+def test_add_column_replaces_an_existing_column(base):
+    history = TransformationHistory(base)
+    current = history.add_column("[age] + 1", "age", base.get_column("age") + 1)
+
+    assert current.columns == ["name", "age"]
+    assert current.get_column("age").to_list() == [31, 46, 29, 62]
+
+
+def test_column_origin(base):
+    history = TransformationHistory(base)
+    assert history.column_origin("age") is base
+
+    # Adding another column keeps the values of age
+    history.add_column("[age] * 2", "double", double_age(base))
+    assert history.column_origin("age") is base
+
+    # Writing the column, or filtering, gives it new values
+    written = history.add_column("[age] + 1", "age", history.current.get_column("age") + 1)
+    assert history.column_origin("age") is written
+    assert history.column_origin("name") is base
+
+    filtered = history.filter_rows("[age] > 30", written.filter(pl.col("age") > 30))
+    assert history.column_origin("name") is filtered
+    assert history.column_origin("age") is filtered
+
+    # Only the applied steps count
+    history.goto(1)
+    assert history.column_origin("age") is base
+
+
+def test_estimated_size_counts_shared_buffers_once(base):
+    history = TransformationHistory(base)
+    series = double_age(base)
+    history.add_column("[age] * 2", "double", series)
+    history.add_column("[age] + 1", "older", base.get_column("age") + 1)
+
+    added = sum(step.series.estimated_size() for step in history.steps)
+    assert history.estimated_size() == base.estimated_size() + added
+    # Every version together holds less than full copies of each
+    assert history.estimated_size() < base.estimated_size() + sum(s.frame.estimated_size() for s in history.steps)
+
+
+def test_estimated_size_of_a_filter_is_its_frame(base):
+    history = TransformationHistory(base)
+    filtered = history.filter_rows("[age] > 30", base.filter(pl.col("age") > 30))
+    assert history.estimated_size() == base.estimated_size() + filtered.estimated_size()
+
+
+def test_estimated_size_skips_frames_counted_already(base):
+    history = TransformationHistory(base)
+    history.add_column("[age] * 2", "double", double_age(base))
+    seen = {id(base)}
+    assert history.estimated_size(seen) == history.steps[0].series.estimated_size()
@@ -0,0 +1,31 @@
+import pytest
+
+from streamlit_pages.formula_corpus import iter_corpus_formulas
+from streamlit_pages.formula_engine import split_partition_clause
+from streamlit_pages.validation import check_syntax
+
+# Accepted by the parser, which closes an if left open at the end
+WITHOUT_ENDIF = [
+    "if [age] > 40 then 'Senior' else 'Junior'",
+    "if [age] > 40 then 'Senior' elseif [age] > 20 then 'Mid' else 'Junior'",
+]
+
+
+@pytest.mark.parametrize("formula", [record["formula"] for record in iter_corpus_formulas()] + WITHOUT_ENDIF)
+def test_formulas_the_parser_accepts_pass(formula):
+    body, _ = split_partition_clause(formula)
+    assert check_syntax(body) is None
+
+
+@pytest.mark.parametrize("formula, message", [
+    ("", "The formula is empty"),
+    ("concat([name], 'x)", "Text is not closed at column 16"),
+    ("[age + 1", "Column reference is not closed at column 1"),
+    ("[age] + 1)", "Unexpected ')' at column 10"),
+    ("[age] > 40 endif", "'endif' without 'if' at column 12"),
+    ("IF [age] > 40 then 1 else 2 endif", "Write 'if' in lower case at column 1"),
+    ("[age] +", "Missing a value after '+' at column 7"),
+    ("uppercase([name], 1)", "uppercase() takes 1 argument, not 2 at column 1"),
+])
+def test_mistakes_are_located(formula, message):
+    assert check_syntax(formula).message == message
@@ -0,0 +1,86 @@
+import polars as pl
+import pytest
+from polars.testing import assert_series_equal
+
+from streamlit_pages.formula_engine import compile_formula, split_partition_clause
+
+
+@pytest.mark.parametrize("formula, expected", [
+    ("[salary] / sum([salary]) over [city]", ("[salary] / sum([salary])", ("city",))),
+    ("sum([salary]) over [city], [team]", ("sum([salary])", ("city", "team"))),
+    ("sum([salary])\nover\n[city]", ("sum([salary])", ("city",))),
+    ("[turnover] over [city]", ("[turnover]", ("city",))),
+    ("sum([salary]) OVER [city]", ("sum([salary])", ("city",))),
+    ("sum([salary])", ("sum([salary])", ())),
+])
+def test_split_partition_clause(formula, expected):
+    assert split_partition_clause(formula) == expected
+
+
+@pytest.mark.parametrize("formula", [
+    # Quoted or bracketed, the over is part of a value
+    "concat([name], ' over [city]')",
+    'concat([name], " over [city]")',
+    "[over] + 1",
+    "[price over] * 2",
+    "sum([salary] over [city])",
+    "if [age] > 40 then 'over [city]' else 'under' endif",
+    # No column list after the over
+    "sum([salary]) over",
+    "sum([salary]) over ",
+    "sum([salary]) over [city] + 1",
+    "sum([salary]) over city",
+    # Nothing before the over
+    "over [city]",
+])
+def test_split_partition_clause_without_clause(formula):
+    assert split_partition_clause(formula) == (formula, ())
+
+
+@pytest.fixture
+def frame():
+    return pl.DataFrame({
+        "city": ["Boston", "Chicago", "Boston", "Seattle", "Chicago", "Boston", "Seattle", "Boston"],
+        "salary": [75000, 95000, 65000, 120000, 85000, 65000, 99000, 110000],
+    })
+
+
+def evaluate(frame, formula):
+    expr = compile_formula(formula).expr
+    return frame.with_columns(expr.alias("result")).get_column("result")
+
+
+def per_group(frame, expr):
+    """``expr`` computed per city with group_by().agg() and joined back to the rows"""
+    rows = frame.with_row_index("row")
+    grouped = rows.group_by("city").agg(pl.col("row"), expr.alias("result"))
+    if grouped.schema["result"] == pl.List:
+        grouped = grouped.explode("row", "result")
+    else:
+        grouped = grouped.explode("row")
+    return rows.join(grouped.drop("city"), on="row", how="left").sort("row").get_column("result")
+
+
+AGGREGATIONS = {
+    "sum": pl.col("salary").sum(),
+    "mean": pl.col("salary").mean(),
+    "rank": pl.col("salary").rank("min"),
+    "cum_sum": pl.col("salary").cum_sum(),
+}
+
+
+@pytest.mark.parametrize("function", list(AGGREGATIONS))
+def test_over_all_rows(frame, function):
+    expected = frame.with_columns(AGGREGATIONS[function].alias("result")).get_column("result")
+    assert_series_equal(evaluate(frame, f"{function}([salary])"), expected)
+
+
+@pytest.mark.parametrize("function", list(AGGREGATIONS))
+def test_over_partition(frame, function):
+    expected = per_group(frame, AGGREGATIONS[function])
+    assert_series_equal(evaluate(frame, f"{function}([salary]) over [city]"), expected)
+
+
+def test_row_wise_rest_of_formula(frame):
+    expected = frame.get_column("salary") / per_group(frame, pl.col("salary").sum())
+    assert_series_equal(evaluate(frame, "[salary] / sum([salary]) over [city]"), expected.alias("result"))